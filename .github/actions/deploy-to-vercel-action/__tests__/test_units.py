@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import hashlib
 import io
 import json
+import stat
+import sys
 from pathlib import Path
 from types import SimpleNamespace
 import urllib.error
@@ -113,37 +116,41 @@ def test_io_utils_log_helpers(capsys: pytest.CaptureFixture) -> None:
     assert "::warning::warn" in out
 
 
-def test_utils_exec_cmd_success(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_utils_exec_cmd_streams_lines_and_returns_stdout(capsys: pytest.CaptureFixture) -> None:
     utils = load_module("utils.py", "deploy_to_vercel_utils")
+    seen: list[str] = []
 
-    class Result:
-        returncode = 0
-        stdout = "ok\n"
-        stderr = ""
+    script = "import sys; print('Inspect: https://vercel.com/x', file=sys.stderr); print('https://d.vercel.app')"
+    output = utils.exec_cmd(sys.executable, ["-c", script], cwd=None, on_line=seen.append)
 
-    def fake_run(*_args, **_kwargs):
-        return Result()
+    assert output == "https://d.vercel.app"
+    assert sorted(seen) == ["Inspect: https://vercel.com/x", "https://d.vercel.app"]
+    # CLI output is debug-only; callers report progress through on_line.
+    assert "::debug::Inspect: https://vercel.com/x" in capsys.readouterr().out
 
-    monkeypatch.setattr(utils.subprocess, "run", fake_run)
 
-    assert utils.exec_cmd("echo", ["hi"], cwd=None) == "ok"
+def test_utils_exec_cmd_failure_uses_stderr() -> None:
+    utils = load_module("utils.py", "deploy_to_vercel_utils_2")
 
+    script = "import sys; print('nope', file=sys.stderr); sys.exit(1)"
+    with pytest.raises(RuntimeError, match="nope"):
+        utils.exec_cmd(sys.executable, ["-c", script], cwd=None)
 
-def test_utils_exec_cmd_failure_uses_stderr(monkeypatch: pytest.MonkeyPatch) -> None:
-    utils = load_module("utils.py", "deploy_to_vercel_utils_2")
 
-    class Result:
-        returncode = 1
-        stdout = ""
-        stderr = "nope\n"
+def test_utils_exec_cmd_enforces_idle_and_total_timeouts() -> None:
+    utils = load_module("utils.py", "deploy_to_vercel_utils_4")
 
-    def fake_run(*_args, **_kwargs):
-        return Result()
+    with pytest.raises(RuntimeError, match="no output for 0.3s"):
+        utils.exec_cmd(sys.executable, ["-c", "import time; time.sleep(30)"], cwd=None, idle_timeout=0.3)
 
-    monkeypatch.setattr(utils.subprocess, "run", fake_run)
+    chatty = "import time\nwhile True:\n    print('uploading', flush=True)\n    time.sleep(0.05)"
+    with pytest.raises(RuntimeError, match="timed out after 0.4s"):
+        utils.exec_cmd(sys.executable, ["-c", chatty], cwd=None, idle_timeout=5, total_timeout=0.4)
 
-    with pytest.raises(RuntimeError, match="nope"):
-        utils.exec_cmd("vercel", ["--bad"], cwd=None)
+    # A process that closes its output but keeps running is still held to the total budget.
+    detached = "import os, time\nos.close(1)\nos.close(2)\ntime.sleep(30)"
+    with pytest.raises(RuntimeError, match="timed out after 0.5s"):
+        utils.exec_cmd(sys.executable, ["-c", detached], cwd=None, total_timeout=0.5)
 
 
 def test_utils_parse_deployment_host_raises_on_empty_netloc() -> None:
@@ -358,37 +365,17 @@ def test_github_client_delete_existing_comment(monkeypatch: pytest.MonkeyPatch)
 
 def test_github_api_request_success_and_http_error(monkeypatch: pytest.MonkeyPatch) -> None:
     github_client = load_module("github_client.py", "deploy_to_vercel_github_api")
+    shared = sys.modules["github_api"]
+    responses = [shared.RawResponse(200, {}, b"{\"ok\": true}"), shared.RawResponse(401, {}, b"{\"message\": \"bad\"}")]
 
-    class FakeResponse:
-        def __init__(self, body: bytes) -> None:
-            self._body = body
+    def fake_send(_self, method: str, url: str, headers: dict[str, str], body: bytes | None, timeout: float):
+        assert (method, url, timeout) == ("GET", "https://api.github.com/x", 30)
+        assert headers["Authorization"] == "Bearer t"
+        return responses.pop(0)
 
-        def read(self) -> bytes:
-            return self._body
-
-        def __enter__(self):
-            return self
-
-        def __exit__(self, _exc_type, _exc, _tb):
-            return False
-
-    def fake_urlopen_ok(_req, timeout: int):
-        assert timeout == 30
-        return FakeResponse(b"{\"ok\": true}")
-
-    monkeypatch.setattr(github_client.urllib.request, "urlopen", fake_urlopen_ok)
+    monkeypatch.setattr(shared.PooledTransport, "send", fake_send)
     assert github_client.github_api_request(token="t", method="GET", url="https://api.github.com/x") == {"ok": True}
 
-    def fake_urlopen_fail(_req, timeout: int):
-        raise urllib.error.HTTPError(
-            url="https://api.github.com/x",
-            code=401,
-            msg="no",
-            hdrs=None,
-            fp=io.BytesIO(b"{\"message\": \"bad\"}"),
-        )
-
-    monkeypatch.setattr(github_client.urllib.request, "urlopen", fake_urlopen_fail)
     with pytest.raises(RuntimeError, match=r"\(401\)"):
         github_client.github_api_request(token="t", method="GET", url="https://api.github.com/x")
 
@@ -463,15 +450,21 @@ def test_vercel_api_request_success_and_http_error(monkeypatch: pytest.MonkeyPat
         vercel_client.vercel_api_request(token="t", url="https://api.vercel.com/x")
 
 
-def test_vercel_client_deploy_builds_args(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_vercel_client_deploy_builds_args(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture) -> None:
     vercel_client = load_module("vercel_client.py", "deploy_to_vercel_vercel_client")
 
     seen: dict[str, object] = {}
 
-    def fake_exec_cmd(command: str, args: list[str], cwd):
+    def fake_exec_cmd(command: str, args: list[str], cwd, *, on_line, idle_timeout: float, total_timeout: float):
         seen["command"] = command
         seen["args"] = args
         seen["cwd"] = cwd
+        seen["timeouts"] = (idle_timeout, total_timeout)
+        on_line("Uploading [====] (2.0MB/2.0MB)")
+        on_line("Inspect: https://vercel.com/org/proj/abc")
+        on_line("Production: https://my-deploy.vercel.app [3s]")
+        seen["host_before_exit"] = client.deployment_host
+        on_line("Completing...")
         return "Ready! https://my-deploy.vercel.app"
 
     monkeypatch.setattr(vercel_client, "exec_cmd", fake_exec_cmd)
@@ -483,6 +476,9 @@ def test_vercel_client_deploy_builds_args(monkeypatch: pytest.MonkeyPatch) -> No
         vercel_scope="scope",
         production=True,
         working_directory="/tmp",
+        deploy_idle_timeout=300,
+        deploy_timeout=1800,
+        deploy_method="cli",
         user="webstackdev",
         repository="astro.webstackbuilders.com",
         ref="main",
@@ -492,6 +488,13 @@ def test_vercel_client_deploy_builds_args(monkeypatch: pytest.MonkeyPatch) -> No
     client = vercel_client.VercelClient(ctx)
     host = client.deploy({"authorName": "A", "authorLogin": "B", "commitMessage": "line1\nline2"})
     assert host == "my-deploy.vercel.app"
+    assert seen["timeouts"] == (300, 1800)
+    assert seen["host_before_exit"] == "my-deploy.vercel.app"
+    out = capsys.readouterr().out
+    assert "Deployment URL: https://my-deploy.vercel.app" in out
+    assert "Vercel CLI upload finished after " in out and "Vercel CLI build finished after " in out
+    assert "Uploading [====]" not in out
+    assert "Vercel CLI phases: upload " in out and ", build " in out and ", ready " in out
 
     args = seen["args"]
     assert "--prod" in args
@@ -502,12 +505,96 @@ def test_vercel_client_deploy_builds_args(monkeypatch: pytest.MonkeyPatch) -> No
     assert any("githubCommitMessage=line1" in item for item in args)
 
 
+def test_vercel_files_keeps_symlinked_function_directories(tmp_path: Path) -> None:
+    vercel_files = load_module("vercel_files.py", "deploy_to_vercel_vercel_files")
+    functions = tmp_path / ".vercel" / "output" / "functions" / "api"
+    (functions / "search.func").mkdir(parents=True)
+    (functions / "search.func" / ".vc-config.json").write_text('{"runtime": "nodejs20.x"}', encoding="utf-8")
+    (functions / "search.func" / "index.js").write_text("export default () => {}", encoding="utf-8")
+    # `vercel build` shares identical functions by symlinking their .func directories.
+    (functions / "suggest.func").symlink_to("search.func", target_is_directory=True)
+
+    files = {output_file.name: output_file for output_file in vercel_files.collect_output_files(tmp_path)}
+
+    assert sorted(files) == [
+        ".vercel/output/functions/api/search.func/.vc-config.json",
+        ".vercel/output/functions/api/search.func/index.js",
+        ".vercel/output/functions/api/suggest.func",
+    ]
+    link = files[".vercel/output/functions/api/suggest.func"]
+    assert stat.S_ISLNK(link.mode)
+    assert link.read_bytes() == b"search.func"
+    assert link.sha == hashlib.sha1(b"search.func").hexdigest()
+    assert link.manifest_entry() == {"file": link.name, "sha": link.sha, "size": 11, "mode": link.mode}
+
+
+def test_vercel_client_deploy_prebuilt_uploads_only_missing_files(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    vercel_client = load_module("vercel_client.py", "deploy_to_vercel_vercel_client_api")
+    output = tmp_path / ".vercel" / "output"
+    (output / "static" / "blog").mkdir(parents=True)
+    (output / "config.json").write_text('{"version": 3}', encoding="utf-8")
+    (output / "static" / "index.html").write_text("<h1>new</h1>", encoding="utf-8")
+    # Same bytes as index.html, so one upload covers both.
+    (output / "static" / "blog" / "index.html").write_text("<h1>new</h1>", encoding="utf-8")
+    new_sha = vercel_client.collect_output_files(tmp_path)[1].sha
+
+    calls: list[tuple[str, str, object]] = []
+    deployments = iter([{"id": "dpl_1", "readyState": "BUILDING", "url": "site-abc.vercel.app"}])
+
+    def fake_api_request(*, token: str, url: str, method: str = "GET", body=None, headers=None, timeout: float = 30):
+        calls.append((method, url, headers))
+        if method == "POST" and "/v13/deployments" in url:
+            if sum(call[0] == "POST" and "/v13/deployments" in call[1] for call in calls) == 1:
+                detail = json.dumps({"error": {"code": "missing_files", "missing": [new_sha]}})
+                raise vercel_client.VercelApiError("missing", status=400, detail=detail)
+            assert sorted(entry["file"] for entry in body["files"]) == [
+                ".vercel/output/config.json",
+                ".vercel/output/static/blog/index.html",
+                ".vercel/output/static/index.html",
+            ]
+            assert body["target"] == "production" and body["meta"]["githubCommitSha"] == "abc"
+            return next(deployments)
+        if method == "POST":
+            assert headers["x-vercel-digest"] == new_sha
+            return {}
+        return {"id": "dpl_1", "readyState": "READY", "url": "site-abc.vercel.app"}
+
+    monkeypatch.setattr(vercel_client, "vercel_api_request", fake_api_request)
+    monkeypatch.setattr(vercel_client, "READY_POLL_SECONDS", 0)
+    ctx = SimpleNamespace(
+        vercel_org_id="team_1",
+        vercel_project_id="prj_1",
+        vercel_token="token",
+        vercel_scope=None,
+        production=True,
+        working_directory=str(tmp_path),
+        deploy_idle_timeout=300,
+        deploy_timeout=1800,
+        user="webstackdev",
+        repository="site",
+        ref="main",
+        sha="abc",
+        deploy_method="api",
+    )
+
+    host = vercel_client.VercelClient(ctx).deploy({"authorName": "A", "authorLogin": "B", "commitMessage": "m"})
+
+    assert host == "site-abc.vercel.app"
+    assert [(method, url.split("?")[0].rsplit("/", 1)[-1]) for method, url, _headers in calls] == [
+        ("POST", "deployments"),
+        ("POST", "files"),
+        ("POST", "deployments"),
+        ("GET", "dpl_1"),
+    ]
+    assert all("teamId=team_1" in url for _method, url, _headers in calls)
+
+
 def test_vercel_client_assign_alias(monkeypatch: pytest.MonkeyPatch) -> None:
     vercel_client = load_module("vercel_client.py", "deploy_to_vercel_vercel_client_2")
 
     calls: list[list[str]] = []
 
-    def fake_exec_cmd(_command: str, args: list[str], _cwd):
+    def fake_exec_cmd(_command: str, args: list[str], _cwd, **_timeouts):
         calls.append(args)
         return "ok"
 
@@ -520,6 +607,8 @@ def test_vercel_client_assign_alias(monkeypatch: pytest.MonkeyPatch) -> None:
         vercel_scope=None,
         production=False,
         working_directory=None,
+        deploy_idle_timeout=300,
+        deploy_timeout=1800,
         user="webstackdev",
         repository="astro.webstackbuilders.com",
         ref="main",
@@ -535,6 +624,47 @@ def test_vercel_client_assign_alias(monkeypatch: pytest.MonkeyPatch) -> None:
     assert calls[0][-1] == "custom.example.com"
 
 
+def test_vercel_client_assign_aliases_retries_and_aggregates_failures(monkeypatch: pytest.MonkeyPatch) -> None:
+    vercel_client = load_module("vercel_client.py", "deploy_to_vercel_vercel_client_3")
+
+    attempts: dict[str, int] = {}
+
+    def fake_exec_cmd(_command: str, args: list[str], _cwd, **_timeouts):
+        alias = args[-1]
+        attempts[alias] = attempts.get(alias, 0) + 1
+        if alias == "broken.example.com" or (alias == "flaky.example.com" and attempts[alias] == 1):
+            raise RuntimeError(f"Error: could not alias {alias}")
+        return "ok"
+
+    monkeypatch.setattr(vercel_client, "exec_cmd", fake_exec_cmd)
+
+    ctx = SimpleNamespace(
+        vercel_org_id="org",
+        vercel_project_id="proj",
+        vercel_token="token",
+        vercel_scope=None,
+        production=True,
+        working_directory=None,
+        deploy_idle_timeout=300,
+        deploy_timeout=1800,
+    )
+    client = vercel_client.VercelClient(ctx)
+    client.deployment_host = "my-deploy.vercel.app"
+    slept: list[float] = []
+
+    results = client.assign_aliases(["https://a.example.com", "https://flaky.example.com"], sleep=slept.append)
+    assert [(result.alias, result.attempts, result.error) for result in results] == [
+        ("https://a.example.com", 1, None),
+        ("https://flaky.example.com", 2, None),
+    ]
+    assert slept == [2.0]
+
+    with pytest.raises(RuntimeError, match=r"Failed to assign 1 of 2 alias\(es\): https://broken.example.com: Error") as excinfo:
+        client.assign_aliases(["https://a.example.com", "https://broken.example.com"], sleep=slept.append)
+    assert "a.example.com:" not in str(excinfo.value)
+    assert attempts["broken.example.com"] == 3
+
+
 def test_vercel_client_init_sets_env(monkeypatch: pytest.MonkeyPatch) -> None:
     vercel_client = load_module("vercel_client.py", "deploy_to_vercel_vercel")
 
@@ -545,6 +675,8 @@ def test_vercel_client_init_sets_env(monkeypatch: pytest.MonkeyPatch) -> None:
         vercel_scope=None,
         production=False,
         working_directory=None,
+        deploy_idle_timeout=300,
+        deploy_timeout=1800,
         user="webstackdev",
         repository="astro.webstackbuilders.com",
         ref="main",
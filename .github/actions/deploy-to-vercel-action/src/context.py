@@ -27,6 +27,9 @@ class Context:
     vercel_scope: str | None
     github_deployment_env: str | None
     working_directory: str | None
+    deploy_method: str
+    deploy_idle_timeout: float
+    deploy_timeout: float
 
     user: str
     repository: str
@@ -58,6 +61,19 @@ def _parse_repository_slug(github_repository: str) -> tuple[str, str]:
     return user, repo
 
 
+def _parse_seconds(name: str, default: float) -> float:
+    value = (get_input(name) or "").strip()
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number of seconds") from exc
+    if seconds <= 0:
+        raise ValueError(f"{name} must be greater than zero")
+    return seconds
+
+
 def _require_input(name: str) -> str:
     value = get_input(name)
     if not value:
@@ -131,6 +147,11 @@ def build_context() -> Context:
     vercel_scope = (get_input("VERCEL_SCOPE") or "").strip() or None
     github_deployment_env = (get_input("GITHUB_DEPLOYMENT_ENV") or "").strip() or None
     working_directory = (get_input("WORKING_DIRECTORY") or "").strip() or None
+    deploy_method = (get_input("DEPLOY_METHOD") or "cli").strip().lower()
+    if deploy_method not in {"cli", "api"}:
+        raise ValueError("DEPLOY_METHOD must be 'cli' or 'api'")
+    deploy_idle_timeout = _parse_seconds("DEPLOY_IDLE_TIMEOUT_SECONDS", 300)
+    deploy_timeout = _parse_seconds("DEPLOY_TIMEOUT_SECONDS", 1800)
 
     run_id = get_env("GITHUB_RUN_ID")
     log_url = f"https://github.com/{user}/{repo}/actions/runs/{run_id}" if run_id else f"https://github.com/{user}/{repo}"
@@ -162,6 +183,9 @@ def build_context() -> Context:
         vercel_scope=vercel_scope,
         github_deployment_env=github_deployment_env,
         working_directory=working_directory,
+        deploy_method=deploy_method,
+        deploy_idle_timeout=deploy_idle_timeout,
+        deploy_timeout=deploy_timeout,
         user=user,
         repository=repo,
         branch=branch,
@@ -1,13 +1,26 @@
 from __future__ import annotations
 
-import json
+import sys
 import textwrap
-import urllib.error
-import urllib.request
+from pathlib import Path
 from typing import Any
 
 from context import Context
 
+# Shared helpers live in .github/actions/shared; a composite action only has its own src/ on sys.path.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "shared"))
+
+from github_api import GitHubApi  # noqa: E402  pylint: disable=wrong-import-position
+
+_GITHUB_APIS: dict[str, GitHubApi] = {}
+
+
+def github_api(token: str) -> GitHubApi:
+    """One pooled client per token, so every call in the deploy shares connections and ETags."""
+    if token not in _GITHUB_APIS:
+        _GITHUB_APIS[token] = GitHubApi(token, user_agent="webstackbuilders-deploy-to-vercel-action")
+    return _GITHUB_APIS[token]
+
 
 def github_api_request(
     *,
@@ -16,38 +29,19 @@ def github_api_request(
     url: str,
     body: dict[str, Any] | None = None,
 ) -> Any:
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {token}",
-        "X-GitHub-Api-Version": "2022-11-28",
-        "User-Agent": "webstackbuilders-deploy-to-vercel-action",
-    }
-
-    data: bytes | None = None
-    if body is not None:
-        data = json.dumps(body).encode("utf-8")
-        headers["Content-Type"] = "application/json"
-
-    req = urllib.request.Request(url, method=method.upper(), headers=headers, data=data)
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            raw = resp.read().decode("utf-8")
-            if not raw:
-                return None
-            return json.loads(raw)
-    except urllib.error.HTTPError as exc:
-        detail = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"GitHub API {method} {url} failed ({exc.code}): {detail}") from exc
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"GitHub API {method} {url} failed: {exc}") from exc
+    response = github_api(token).request(method, url, body=body)
+    return response.json() if response.body else None
 
 
 class GitHubClient:
     def __init__(self, ctx: Context) -> None:
         self.ctx = ctx
-        self.base = "https://api.github.com"
+        self.base = github_api(ctx.github_token).base_url
         self.deployment_id: int | None = None
 
+    def metrics_summary(self) -> str:
+        return github_api(self.ctx.github_token).metrics_summary()
+
     def create_deployment(self) -> dict[str, Any]:
         url = f"{self.base}/repos/{self.ctx.user}/{self.ctx.repository}/deployments"
         environment = self.ctx.github_deployment_env or ("Production" if self.ctx.production else "Preview")
@@ -82,8 +76,7 @@ class GitHubClient:
         if not self.ctx.pr_number:
             return []
         url = f"{self.base}/repos/{self.ctx.user}/{self.ctx.repository}/issues/{self.ctx.pr_number}/comments"
-        data = github_api_request(token=self.ctx.github_token, method="GET", url=url)
-        return list(data or [])
+        return list(github_api(self.ctx.github_token).paginate(url, {"per_page": 100}))
 
     def delete_comment(self, comment_id: int) -> None:
         url = f"{self.base}/repos/{self.ctx.user}/{self.ctx.repository}/issues/comments/{comment_id}"
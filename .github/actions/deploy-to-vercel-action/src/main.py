@@ -208,8 +208,7 @@ def run() -> None:
             if (not ctx.is_pr) and ctx.alias_domains:
                 log_info("Assigning custom domains to Vercel deployment")
 
-            for alias in result.aliases_to_assign:
-                vercel.assign_alias(alias)
+            vercel.assign_aliases(result.aliases_to_assign)
 
             deployment_urls = result.deployment_urls
             preview_url = result.preview_url
@@ -240,6 +239,7 @@ def run() -> None:
             set_output("DEPLOYMENT_CREATED", "true")
             set_output("COMMENT_CREATED", "true" if comment_created else "false")
 
+            log_info(github.metrics_summary())
             log_info("Done")
         except Exception as exc:
             # Mirror JS behavior: mark deployment as failure if possible.
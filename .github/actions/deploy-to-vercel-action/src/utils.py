@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import os
+import queue
 import re
 import subprocess
+import threading
+import time
 import urllib.parse
+from collections.abc import Callable
+from typing import IO
 
 from io_utils import log_debug
 
@@ -22,32 +27,96 @@ def remove_schema(url: str) -> str:
     return re.sub(r"^https?://", "", url, flags=re.IGNORECASE)
 
 
-def exec_cmd(command: str, args: list[str], cwd: str | None) -> str:
+def _pump(stream: IO[str], name: str, lines: queue.Queue[tuple[str, str | None]]) -> None:
+    for line in stream:
+        lines.put((name, line.rstrip("\n")))
+    lines.put((name, None))
+
+
+def _wait(process: subprocess.Popen[str], command: str, started: float, total_timeout: float | None) -> int:
+    # Closed streams do not mean the process has exited; it only gets what is left of the budget.
+    remaining = None if total_timeout is None else max(started + total_timeout - time.monotonic(), 0)
+    try:
+        return process.wait(timeout=remaining)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"Command timed out after {total_timeout:g}s: {command}") from None
+
+
+def exec_cmd(
+    command: str,
+    args: list[str],
+    cwd: str | None,
+    *,
+    on_line: Callable[[str], None] | None = None,
+    idle_timeout: float | None = None,
+    total_timeout: float | None = None,
+) -> str:
+    """Run `command`, forwarding stdout/stderr lines to the debug log as they arrive; returns stdout.
+
+    `on_line` sees every line as it is read, e.g. to report progress. The process is killed when it
+    prints nothing for `idle_timeout` seconds or runs longer than `total_timeout` seconds.
+    """
     cwd_value = cwd.strip() if cwd else ""
     log_debug(f"EXEC: {command} {' '.join(args)} (cwd={cwd_value or '.'})")
 
-    result = subprocess.run(
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
         [command, *args],
         cwd=cwd_value or None,
-        check=False,
         text=True,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         env=os.environ.copy(),
     )
-
-    if result.stdout:
-        for line in result.stdout.splitlines():
-            log_debug(line)
-
-    if result.stderr:
-        for line in result.stderr.splitlines():
+    lines: queue.Queue[tuple[str, str | None]] = queue.Queue()
+    captured: dict[str, list[str]] = {"stdout": [], "stderr": []}
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, "stdout", lines), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, "stderr", lines), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    started = time.monotonic()
+    last_output = started
+    open_streams = len(readers)
+    try:
+        while open_streams:
+            now = time.monotonic()
+            waits = [1.0]
+            if idle_timeout is not None:
+                waits.append(last_output + idle_timeout - now)
+            if total_timeout is not None:
+                waits.append(started + total_timeout - now)
+            try:
+                name, line = lines.get(timeout=max(min(waits), 0))
+            except queue.Empty:
+                now = time.monotonic()
+                if total_timeout is not None and now - started >= total_timeout:
+                    raise RuntimeError(f"Command timed out after {total_timeout:g}s: {command}") from None
+                if idle_timeout is not None and now - last_output >= idle_timeout:
+                    raise RuntimeError(f"Command produced no output for {idle_timeout:g}s: {command}") from None
+                continue
+
+            if line is None:
+                open_streams -= 1
+                continue
+            last_output = time.monotonic()
+            captured[name].append(line)
             log_debug(line)
-
-    if result.returncode != 0:
-        raise RuntimeError((result.stderr or result.stdout or "").strip() or f"Command failed: {command}")
-
-    return (result.stdout or "").strip()
+            if on_line is not None:
+                on_line(line)
+        returncode = _wait(process, command, started, total_timeout)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    stdout = "\n".join(captured["stdout"])
+    stderr = "\n".join(captured["stderr"])
+    if returncode != 0:
+        raise RuntimeError((stderr or stdout or "").strip() or f"Command failed: {command}")
+
+    return stdout.strip()
 
 
 def parse_deployment_host(cli_output: str) -> str:
@@ -2,31 +2,141 @@ from __future__ import annotations
 
 import json
 import os
+import time
 import urllib.error
 import urllib.parse
 import urllib.request
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any
 
 from context import Context
-from io_utils import log_info
+from io_utils import log_info, log_warning
 from utils import exec_cmd, parse_deployment_host, remove_schema
+from vercel_files import OutputFile, collect_output_files, files_to_upload
 
 
-def vercel_api_request(*, token: str, url: str) -> Any:
-    headers = {
+VERCEL_API_URL = "https://api.vercel.com"
+
+
+class VercelApiError(RuntimeError):
+    def __init__(self, message: str, *, status: int | None = None, detail: str = "") -> None:
+        super().__init__(message)
+        self.status = status
+        self.detail = detail
+
+    def missing_files(self) -> list[str]:
+        """Digests listed in a `missing_files` error from the create-deployment endpoint."""
+        try:
+            error = (json.loads(self.detail) or {}).get("error") or {}
+        except ValueError:
+            return []
+        if error.get("code") != "missing_files":
+            return []
+        return [str(sha) for sha in error.get("missing") or []]
+
+
+def vercel_api_request(
+    *,
+    token: str,
+    url: str,
+    method: str = "GET",
+    body: Any = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 30,
+) -> Any:
+    request_headers = {
         "Authorization": f"Bearer {token}",
         "User-Agent": "webstackbuilders-deploy-to-vercel-action",
+        **(headers or {}),
     }
-    req = urllib.request.Request(url, method="GET", headers=headers)
+    data = None
+    if isinstance(body, bytes):
+        data = body
+    elif body is not None:
+        data = json.dumps(body).encode("utf-8")
+        request_headers["Content-Type"] = "application/json"
+
+    req = urllib.request.Request(url, data=data, method=method, headers=request_headers)
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
             raw = resp.read().decode("utf-8")
             return json.loads(raw) if raw else None
     except urllib.error.HTTPError as exc:
         detail = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"Vercel API GET {url} failed ({exc.code}): {detail}") from exc
+        raise VercelApiError(f"Vercel API {method} {url} failed ({exc.code}): {detail}", status=exc.code, detail=detail) from exc
     except urllib.error.URLError as exc:
-        raise RuntimeError(f"Vercel API GET {url} failed: {exc}") from exc
+        raise VercelApiError(f"Vercel API {method} {url} failed: {exc}") from exc
+
+
+# Each alias is its own `vercel alias set` process; a few at a time keeps clear of Vercel's API rate limits.
+ALIAS_CONCURRENCY = 4
+ALIAS_ATTEMPTS = 3
+ALIAS_RETRY_DELAY_SECONDS = 2.0
+UPLOAD_CONCURRENCY = 8
+UPLOAD_ATTEMPTS = 3
+UPLOAD_TIMEOUT_SECONDS = 120
+READY_POLL_SECONDS = 3.0
+READY_STATES = frozenset({"READY"})
+FAILED_STATES = frozenset({"ERROR", "CANCELED"})
+
+
+@dataclass(frozen=True)
+class AliasResult:
+    alias: str
+    attempts: int
+    elapsed_seconds: float
+    error: str | None = None
+
+
+@dataclass
+class CliDeployProgress:
+    """Follows `vercel deploy` output: the deployment URL as soon as it is printed, and when each phase ended.
+
+    The CLI prints `Inspect: <url>` once the upload is done and the deployment is created,
+    `Completing` once the build has finished, and exits when the deployment is ready.
+    """
+
+    clock: Callable[[], float] = time.monotonic
+    started: float = 0.0
+    host: str | None = None
+    marks: dict[str, float] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.started = self.clock()
+
+    def on_line(self, line: str) -> None:
+        lowered = line.lower()
+        if self.host is None and "inspect" not in lowered and "://" in line:
+            try:
+                self.host = parse_deployment_host(line)
+                log_info(f"Deployment URL: https://{self.host}")
+            except RuntimeError:
+                pass
+        if "upload" not in self.marks and ("inspect" in lowered or self.host is not None):
+            self._mark("upload")
+        if "build" not in self.marks and "completing" in lowered:
+            if "upload" not in self.marks:
+                self._mark("upload")
+            self._mark("build")
+
+    def _mark(self, phase: str) -> None:
+        # The CLI's own output only reaches the debug log; phase changes are the visible progress.
+        self.marks[phase] = self.clock()
+        log_info(f"Vercel CLI {phase} finished after {self.marks[phase] - self.started:.1f}s")
+
+    def finish(self) -> dict[str, float]:
+        """Seconds spent uploading, building, and finishing until the deployment was ready."""
+        end = self.clock()
+        upload_end = self.marks.get("upload", end)
+        build_end = self.marks.get("build", end)
+        return {
+            "upload": upload_end - self.started,
+            "build": build_end - upload_end,
+            "ready": end - build_end,
+        }
 
 
 class VercelClient:
@@ -38,7 +148,28 @@ class VercelClient:
         os.environ["VERCEL_ORG_ID"] = ctx.vercel_org_id
         os.environ["VERCEL_PROJECT_ID"] = ctx.vercel_project_id
 
+    def commit_metadata(self, commit: dict[str, str] | None) -> dict[str, str]:
+        if commit is None:
+            return {}
+        commit_message = commit.get("commitMessage", "")
+        commit_message = commit_message.splitlines()[0] if commit_message else ""
+        return {
+            "githubCommitAuthorName": commit.get("authorName", ""),
+            "githubCommitAuthorLogin": commit.get("authorLogin", ""),
+            "githubCommitMessage": commit_message,
+            "githubCommitOrg": self.ctx.user,
+            "githubCommitRepo": self.ctx.repository,
+            "githubCommitRef": self.ctx.ref,
+            "githubCommitSha": self.ctx.sha,
+            "githubOrg": self.ctx.user,
+            "githubRepo": self.ctx.repository,
+            "githubDeployment": "1",
+        }
+
     def deploy(self, commit: dict[str, str] | None) -> str:
+        if self.ctx.deploy_method == "api":
+            return self.deploy_prebuilt(commit)
+
         args: list[str] = [f"--token={self.ctx.vercel_token}"]
 
         if self.ctx.vercel_scope:
@@ -53,31 +184,147 @@ class VercelClient:
         args.append("--force")
         args.append("--archive=tgz")
 
-        if commit is not None:
-            commit_message = commit.get("commitMessage", "")
-            commit_message = commit_message.splitlines()[0] if commit_message else ""
-
-            metadata = [
-                f"githubCommitAuthorName={commit.get('authorName', '')}",
-                f"githubCommitAuthorLogin={commit.get('authorLogin', '')}",
-                f"githubCommitMessage={commit_message}",
-                f"githubCommitOrg={self.ctx.user}",
-                f"githubCommitRepo={self.ctx.repository}",
-                f"githubCommitRef={self.ctx.ref}",
-                f"githubCommitSha={self.ctx.sha}",
-                f"githubOrg={self.ctx.user}",
-                f"githubRepo={self.ctx.repository}",
-                "githubDeployment=1",
-            ]
-            for item in metadata:
-                args.extend(["--meta", item])
+        for name, value in self.commit_metadata(commit).items():
+            args.extend(["--meta", f"{name}={value}"])
 
         log_info("Starting deploy with Vercel CLI")
-        output = exec_cmd("vercel", args, self.ctx.working_directory)
+        progress = CliDeployProgress()
+
+        def on_line(line: str) -> None:
+            progress.on_line(line)
+            # Known before the CLI exits, so a later timeout still reports which deployment hung.
+            if progress.host and not self.deployment_host:
+                self.deployment_host = progress.host
+
+        output = exec_cmd(
+            "vercel",
+            args,
+            self.ctx.working_directory,
+            on_line=on_line,
+            idle_timeout=self.ctx.deploy_idle_timeout,
+            total_timeout=self.ctx.deploy_timeout,
+        )
+        phases = progress.finish()
+        log_info("Vercel CLI phases: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in phases.items()))
         host = parse_deployment_host(output)
         self.deployment_host = host
         return host
 
+    def api_url(self, path: str, **params: str) -> str:
+        # VERCEL_ORG_ID is a team id for team projects and the user id for personal ones.
+        if self.ctx.vercel_org_id.startswith("team_"):
+            params["teamId"] = self.ctx.vercel_org_id
+        elif self.ctx.vercel_scope:
+            params["slug"] = self.ctx.vercel_scope
+        query = urllib.parse.urlencode(params)
+        return f"{VERCEL_API_URL}{path}{f'?{query}' if query else ''}"
+
+    def upload_file(self, output_file: OutputFile, *, sleep: Callable[[float], None] = time.sleep) -> None:
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            try:
+                vercel_api_request(
+                    token=self.ctx.vercel_token,
+                    url=self.api_url("/v2/files"),
+                    method="POST",
+                    body=output_file.read_bytes(),
+                    headers={
+                        "Content-Type": "application/octet-stream",
+                        "Content-Length": str(output_file.size),
+                        "x-vercel-digest": output_file.sha,
+                    },
+                    timeout=UPLOAD_TIMEOUT_SECONDS,
+                )
+                return
+            except VercelApiError as exc:
+                retryable = exc.status is None or exc.status == 429 or exc.status >= 500
+                if not retryable or attempt == UPLOAD_ATTEMPTS:
+                    raise
+                log_warning(f"Uploading {output_file.name} failed (attempt {attempt}/{UPLOAD_ATTEMPTS}): {exc}")
+                sleep(2.0 * 2 ** (attempt - 1))
+
+    def upload_files(self, files: list[OutputFile], *, sleep: Callable[[float], None] = time.sleep) -> None:
+        if not files:
+            return
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_CONCURRENCY, len(files))) as pool:
+            # list() re-raises the first upload error.
+            list(pool.map(lambda output_file: self.upload_file(output_file, sleep=sleep), files))
+
+    def create_deployment(self, files: list[OutputFile], commit: dict[str, str] | None) -> dict[str, Any]:
+        body: dict[str, Any] = {
+            "name": self.ctx.repository,
+            "project": self.ctx.vercel_project_id,
+            "files": [output_file.manifest_entry() for output_file in files],
+            "meta": self.commit_metadata(commit),
+        }
+        if self.ctx.production:
+            body["target"] = "production"
+        return vercel_api_request(
+            token=self.ctx.vercel_token,
+            url=self.api_url("/v13/deployments", forceNew="1", skipAutoDetectionConfirmation="1"),
+            method="POST",
+            body=body,
+        ) or {}
+
+    def wait_until_ready(
+        self,
+        deployment: dict[str, Any],
+        *,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> dict[str, Any]:
+        deadline = clock() + self.ctx.deploy_timeout
+        while True:
+            state = str(deployment.get("readyState") or "")
+            if state in READY_STATES:
+                return deployment
+            if state in FAILED_STATES:
+                raise RuntimeError(f"Vercel deployment {deployment.get('id')} finished in state {state}")
+            if clock() >= deadline:
+                raise RuntimeError(f"Vercel deployment {deployment.get('id')} was not ready after {self.ctx.deploy_timeout:.0f}s ({state})")
+            sleep(READY_POLL_SECONDS)
+            deployment = vercel_api_request(
+                token=self.ctx.vercel_token,
+                url=self.api_url(f"/v13/deployments/{urllib.parse.quote(str(deployment.get('id') or ''))}"),
+            ) or {}
+
+    def deploy_prebuilt(
+        self,
+        commit: dict[str, str] | None,
+        *,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> str:
+        """Deploy .vercel/output through the REST API, uploading only files Vercel does not already have.
+
+        Creating the deployment from the manifest doubles as the "which hashes are missing" query:
+        Vercel answers with a `missing_files` error listing the digests it still needs.
+        """
+        log_info("Starting deploy with Vercel REST API")
+        files = collect_output_files(Path(self.ctx.working_directory or "."))
+        total_bytes = sum(output_file.size for output_file in files)
+        log_info(f"Hashed {len(files)} prebuilt output files ({total_bytes / 1_000_000:.1f} MB)")
+
+        try:
+            deployment = self.create_deployment(files, commit)
+        except VercelApiError as exc:
+            missing = exc.missing_files()
+            if not missing:
+                raise
+            uploads = files_to_upload(files, missing)
+            upload_bytes = sum(output_file.size for output_file in uploads)
+            started = time.perf_counter()
+            log_info(f"Uploading {len(uploads)} new file(s) ({upload_bytes / 1_000_000:.1f} MB); the rest are already on Vercel")
+            self.upload_files(uploads, sleep=sleep)
+            log_info(f"Upload finished in {time.perf_counter() - started:.1f}s")
+            deployment = self.create_deployment(files, commit)
+
+        deployment = self.wait_until_ready(deployment, sleep=sleep, clock=clock)
+        host = str(deployment.get("url") or "").strip()
+        if not host:
+            raise RuntimeError("Could not parse deploymentUrl")
+        self.deployment_host = remove_schema(host)
+        return self.deployment_host
+
     def assign_alias(self, alias_url: str) -> str:
         if not self.deployment_host:
             raise ValueError("No deployment url to alias")
@@ -91,7 +338,59 @@ class VercelClient:
         ]
         if self.ctx.vercel_scope:
             args.append(f"--scope={self.ctx.vercel_scope}")
-        return exec_cmd("vercel", args, self.ctx.working_directory)
+        return exec_cmd(
+            "vercel",
+            args,
+            self.ctx.working_directory,
+            idle_timeout=self.ctx.deploy_idle_timeout,
+            total_timeout=self.ctx.deploy_timeout,
+        )
+
+    def assign_alias_with_retry(
+        self,
+        alias_url: str,
+        *,
+        attempts: int = ALIAS_ATTEMPTS,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> AliasResult:
+        started = time.perf_counter()
+        error = ""
+        for attempt in range(1, attempts + 1):
+            try:
+                self.assign_alias(alias_url)
+                return AliasResult(alias_url, attempt, time.perf_counter() - started)
+            except RuntimeError as exc:
+                error = str(exc)
+                if attempt < attempts:
+                    log_warning(f"Assigning alias {alias_url} failed (attempt {attempt}/{attempts}): {error}")
+                    sleep(ALIAS_RETRY_DELAY_SECONDS * 2 ** (attempt - 1))
+        return AliasResult(alias_url, attempts, time.perf_counter() - started, error)
+
+    def assign_aliases(
+        self,
+        aliases: list[str],
+        *,
+        max_workers: int = ALIAS_CONCURRENCY,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> list[AliasResult]:
+        """Assign every alias, a few at a time, and raise once with every alias that still failed after retries."""
+        if not aliases:
+            return []
+        if not self.deployment_host:
+            raise ValueError("No deployment url to alias")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(aliases)))) as pool:
+            results = list(pool.map(lambda alias: self.assign_alias_with_retry(alias, sleep=sleep), aliases))
+
+        for result in results:
+            status = "failed" if result.error else "assigned"
+            log_info(f"Alias {result.alias} {status} in {result.elapsed_seconds:.1f}s ({result.attempts} attempt(s))")
+
+        failures = [result for result in results if result.error]
+        if failures:
+            details = "; ".join(f"{result.alias}: {result.error}" for result in failures)
+            raise RuntimeError(f"Failed to assign {len(failures)} of {len(results)} alias(es): {details}")
+        return results
 
     def get_deployment(self) -> dict[str, Any]:
         if not self.deployment_host:
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+# `vercel build` writes the Build Output API directory here; prebuilt deployments upload only this tree.
+OUTPUT_DIR = Path(".vercel") / "output"
+HASH_CHUNK_BYTES = 1024 * 1024
+HASH_CONCURRENCY = 8
+
+
+@dataclass(frozen=True)
+class OutputFile:
+    path: Path
+    # Name in the deployment manifest: POSIX path relative to the project root, e.g. .vercel/output/config.json.
+    name: str
+    sha: str
+    size: int
+    # From lstat, so symlinks keep their link mode and Vercel recreates them as links.
+    mode: int
+    symlink_target: str | None = None
+
+    def read_bytes(self) -> bytes:
+        """Upload body: a symlink is sent as its target path, like the Vercel CLI does."""
+        if self.symlink_target is not None:
+            return self.symlink_target.encode("utf-8")
+        return self.path.read_bytes()
+
+    def manifest_entry(self) -> dict[str, object]:
+        return {"file": self.name, "sha": self.sha, "size": self.size, "mode": self.mode}
+
+
+def sha1_file(path: Path) -> str:
+    # Vercel addresses uploaded files by their SHA-1 digest.
+    digest = hashlib.sha1()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _output_file(project_root: Path, path: Path) -> OutputFile:
+    stat = path.lstat()
+    name = path.relative_to(project_root).as_posix()
+    if path.is_symlink():
+        # Shared functions are often symlinked .func directories; rglob would skip them silently.
+        target = os.readlink(path)
+        data = target.encode("utf-8")
+        return OutputFile(path, name, hashlib.sha1(data).hexdigest(), len(data), stat.st_mode, target)
+    return OutputFile(path=path, name=name, sha=sha1_file(path), size=stat.st_size, mode=stat.st_mode)
+
+
+def walk_output(output_dir: Path) -> list[Path]:
+    """Regular files and symlinks (to files or directories) under `output_dir`, without following links."""
+    paths: list[Path] = []
+    for root, dirnames, filenames in os.walk(output_dir, followlinks=False):
+        base = Path(root)
+        paths.extend(base / name for name in dirnames if (base / name).is_symlink())
+        paths.extend(base / name for name in filenames)
+    return sorted(paths)
+
+
+def collect_output_files(project_root: Path) -> list[OutputFile]:
+    output_dir = project_root / OUTPUT_DIR
+    if not output_dir.is_dir():
+        raise RuntimeError(f"Prebuilt output not found at {output_dir}; run `vercel build` first")
+
+    with ThreadPoolExecutor(max_workers=HASH_CONCURRENCY) as pool:
+        return list(pool.map(lambda path: _output_file(project_root, path), walk_output(output_dir)))
+
+
+def files_to_upload(files: list[OutputFile], missing_shas: list[str]) -> list[OutputFile]:
+    """One file per missing digest; identical files share a digest and are uploaded once."""
+    missing = set(missing_shas)
+    selected: dict[str, OutputFile] = {}
+    for output_file in files:
+        if output_file.sha in missing and output_file.sha not in selected:
+            selected[output_file.sha] = output_file
+    return list(selected.values())
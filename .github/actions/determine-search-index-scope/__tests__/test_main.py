@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import json
+import sys
 from pathlib import Path
 from types import ModuleType
+from urllib.parse import parse_qsl
 
 import pytest
 
@@ -22,14 +25,29 @@ def load_action_module() -> ModuleType:
 
 
 class FakeResponse:
-    def __init__(self, *, status_code: int, json_data: object) -> None:
+    def __init__(self, *, status_code: int, json_data: object, headers: dict[str, str] | None = None) -> None:
         self.status_code = status_code
         self._json_data = json_data
+        self.headers = headers or {}
         self.text = ""
 
     def json(self) -> object:
         return self._json_data
 
+def use_fake_github(monkeypatch: pytest.MonkeyPatch, fake_get) -> None:
+    """Answer the shared GitHub client's requests with `fake_get(url, headers, params, timeout)`."""
+    shared = sys.modules["github_api"]
+
+    def send(_self, method: str, url: str, headers: dict[str, str], body: bytes | None, timeout: float):
+        assert method == "GET" and body is None
+        base, _, query = url.partition("?")
+        response = fake_get(base, headers=headers, params=dict(parse_qsl(query)) or None, timeout=timeout)
+        content = b"" if response.json() is None else json.dumps(response.json()).encode("utf-8")
+        return shared.RawResponse(response.status_code, {k.lower(): v for k, v in response.headers.items()}, content)
+
+    monkeypatch.setattr(shared.PooledTransport, "send", send)
+
+
 
 def test_indexes_all_when_no_previous_success(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
     module = load_action_module()
@@ -45,7 +63,7 @@ def test_indexes_all_when_no_previous_success(tmp_path: Path, monkeypatch: pytes
         assert url.endswith("/actions/workflows/deployment-production.yml/runs")
         return FakeResponse(status_code=200, json_data={"workflow_runs": [{"id": 123, "conclusion": "failure"}]})
 
-    monkeypatch.setattr(module.requests, "get", fake_get)
+    use_fake_github(monkeypatch, fake_get)
 
     outputs: dict[str, str] = {}
     monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
@@ -75,7 +93,7 @@ def test_skips_when_no_content_changes(monkeypatch: pytest.MonkeyPatch) -> None:
         assert url.endswith("/compare/oldsha...newsha")
         return FakeResponse(status_code=200, json_data={"files": [{"filename": "README.md"}]})
 
-    monkeypatch.setattr(module.requests, "get", fake_get)
+    use_fake_github(monkeypatch, fake_get)
 
     outputs: dict[str, str] = {}
     monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
@@ -101,9 +119,9 @@ def test_only_articles_changed(monkeypatch: pytest.MonkeyPatch) -> None:
         if url.endswith("/actions/workflows/deployment-production.yml/runs"):
             return FakeResponse(status_code=200, json_data={"workflow_runs": [{"id": 123, "conclusion": "success", "head_sha": "oldsha"}]})
         assert url.endswith("/compare/oldsha...newsha")
-        return FakeResponse(status_code=200, json_data={"files": [{"filename": "src/content/articles/a.md"}]})
+        return FakeResponse(status_code=200, json_data={"files": [{"filename": "src/content/articles/a/index.mdx"}]})
 
-    monkeypatch.setattr(module.requests, "get", fake_get)
+    use_fake_github(monkeypatch, fake_get)
 
     outputs: dict[str, str] = {}
     monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
@@ -115,15 +133,32 @@ def test_only_articles_changed(monkeypatch: pytest.MonkeyPatch) -> None:
     assert outputs["crawl_articles"] == "true"
     assert outputs["crawl_services"] == "false"
     assert outputs["crawl_case_studies"] == "false"
+    assert outputs["page_paths"] == '["/articles/a"]'
+    assert outputs["page_files"] == "src/content/articles/a/index.mdx"
 
 
-def test_other_content_changed_indexes_all(monkeypatch: pytest.MonkeyPatch) -> None:
+def write_page(root: Path, relative: str, frontmatter: str) -> None:
+    path = root / "src/content" / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"---\n{frontmatter}\n---\n\nBody.\n", encoding="utf-8")
+
+
+def test_shared_content_change_reindexes_referencing_pages(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
     module = load_action_module()
 
+    write_page(tmp_path, "articles/a/index.mdx", 'title: A\nauthor: "kevin-brown"\ntags: ["aws", "terraform"]')
+    write_page(tmp_path, "articles/a/pdf.mdx", 'title: A\nauthor: "kevin-brown"\ntags: ["aws"]')
+    write_page(tmp_path, "articles/b/index.mdx", 'title: B\nauthor: "kevin-brown"\ntags: ["terraform"]')
+    write_page(tmp_path, "case-studies/c/index.mdx", 'title: C\nclient: "braze"')
+    write_page(tmp_path, "services/d/index.md", "title: D")
+
     monkeypatch.setenv("GITHUB_REPOSITORY", "webstackdev/astro.webstackbuilders.com")
+    monkeypatch.setenv("GITHUB_WORKSPACE", str(tmp_path))
+    monkeypatch.setenv("RUNNER_TEMP", str(tmp_path / "tmp"))
     monkeypatch.setenv("INPUT_TOKEN", "ghs_xxx")
     monkeypatch.setenv("INPUT_CURRENT_RUN_ID", "999")
     monkeypatch.setenv("INPUT_HEAD_SHA", "newsha")
+    monkeypatch.setenv("INPUT_CHANGE_SOURCE", "api")
 
     def fake_get(url: str, headers: dict[str, str], params: dict[str, object] | None = None, timeout: int = 30) -> FakeResponse:
         if url.endswith("/actions/workflows/deployment-production.yml/runs"):
@@ -133,13 +168,15 @@ def test_other_content_changed_indexes_all(monkeypatch: pytest.MonkeyPatch) -> N
             status_code=200,
             json_data={
                 "files": [
-                    {"filename": "src/content/authors/x.md"},
-                    {"filename": "src/content/articles/a.md"},
+                    {"filename": "src/content/tags/aws/index.mdx"},
+                    {"filename": "src/content/clients/braze.mdx"},
+                    {"filename": "src/content/testimonials/acme/index.mdx"},
+                    {"filename": "src/content/themes.json"},
                 ]
             },
         )
 
-    monkeypatch.setattr(module.requests, "get", fake_get)
+    use_fake_github(monkeypatch, fake_get)
 
     outputs: dict[str, str] = {}
     monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
@@ -149,5 +186,87 @@ def test_other_content_changed_indexes_all(monkeypatch: pytest.MonkeyPatch) -> N
 
     assert outputs["should_index"] == "true"
     assert outputs["crawl_articles"] == "true"
-    assert outputs["crawl_services"] == "true"
+    assert outputs["crawl_services"] == "false"
     assert outputs["crawl_case_studies"] == "true"
+    assert json.loads(outputs["page_paths"]) == ["/articles/a", "/case-studies/c", "/deep-dive/a"]
+    assert outputs["page_files"] == (
+        "src/content/articles/a/index.mdx src/content/case-studies/c/index.mdx src/content/articles/a/pdf.mdx"
+    )
+
+    scope = json.loads(Path(outputs["scope_file"]).read_text(encoding="utf-8"))
+    assert scope["pages"][0] == {"path": "/articles/a", "file": "src/content/articles/a/index.mdx", "reasons": ["tags/aws"]}
+    assert scope["dependencies"]["authors/kevin-brown"] == ["/articles/a", "/articles/b", "/deep-dive/a"]
+    assert scope["dependencies"]["tags/terraform"] == ["/articles/a", "/articles/b"]
+    assert scope["dependencies"]["clients/braze"] == ["/case-studies/c"]
+
+
+def test_renames_count_both_collections(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_action_module()
+
+    monkeypatch.setenv("GITHUB_REPOSITORY", "webstackdev/astro.webstackbuilders.com")
+    monkeypatch.setenv("INPUT_TOKEN", "ghs_xxx")
+    monkeypatch.setenv("INPUT_CURRENT_RUN_ID", "999")
+    monkeypatch.setenv("INPUT_HEAD_SHA", "newsha")
+    monkeypatch.setenv("INPUT_CHANGE_SOURCE", "git")
+
+    deploy_changes = sys.modules["deploy_changes"]
+    monkeypatch.setattr(module, "find_previous_successful_run_sha", lambda *_args, **_kwargs: "oldsha")
+    monkeypatch.setattr(
+        deploy_changes,
+        "list_changes_from_git",
+        lambda **_kwargs: deploy_changes.parse_name_status(
+            "R100\0src/content/articles/moved/index.mdx\0src/content/case-studies/moved/index.mdx\0"
+        ),
+    )
+
+    outputs: dict[str, str] = {}
+    monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
+    monkeypatch.setattr(module.core, "set_failed", lambda m: (_ for _ in ()).throw(AssertionError(m)))
+
+    module.run()
+
+    assert outputs["crawl_articles"] == "true"
+    assert outputs["crawl_services"] == "false"
+    assert outputs["crawl_case_studies"] == "true"
+    assert outputs["page_paths"] == '["/case-studies/moved"]'
+
+
+def test_writes_deploy_diff_for_downstream_actions(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_action_module()
+
+    monkeypatch.setenv("GITHUB_REPOSITORY", "webstackdev/astro.webstackbuilders.com")
+    monkeypatch.setenv("INPUT_TOKEN", "ghs_xxx")
+    monkeypatch.setenv("INPUT_CURRENT_RUN_ID", "999")
+    monkeypatch.setenv("INPUT_HEAD_SHA", "newsha")
+    monkeypatch.setenv("INPUT_CHANGE_SOURCE", "api")
+    monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+
+    def fake_get(url: str, headers: dict[str, str], params: dict[str, object] | None = None, timeout: int = 30) -> FakeResponse:
+        if url.endswith("/actions/workflows/deployment-production.yml/runs"):
+            return FakeResponse(status_code=200, json_data={"workflow_runs": [{"id": 123, "conclusion": "success", "head_sha": "oldsha"}]})
+        return FakeResponse(
+            status_code=200,
+            json_data={"files": [{"filename": "src/content/articles/a/index.mdx", "status": "removed"}]},
+        )
+
+    use_fake_github(monkeypatch, fake_get)
+
+    outputs: dict[str, str] = {}
+    monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
+    monkeypatch.setattr(module.core, "set_failed", lambda m: (_ for _ in ()).throw(AssertionError(m)))
+
+    module.run()
+
+    diff_file = tmp_path / "search-deploy-diff.json"
+    assert outputs["diff_file"] == str(diff_file)
+    assert outputs["base_sha"] == "oldsha"
+    assert json.loads(diff_file.read_text(encoding="utf-8")) == {
+        "base_sha": "oldsha",
+        "head_sha": "newsha",
+        "changes": [{"status": "removed", "filename": "src/content/articles/a/index.mdx", "previous_filename": ""}],
+    }
+    # Removed pages are left to prune-upstash-search, so nothing is re-indexed.
+    assert outputs["should_index"] == "true"
+    assert outputs["crawl_articles"] == "true"
+    assert outputs["page_files"] == ""
+    assert json.loads((tmp_path / "search-page-scope.json").read_text(encoding="utf-8"))["removed"] == ["/articles/a"]
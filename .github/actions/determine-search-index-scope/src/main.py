@@ -1,12 +1,27 @@
 from __future__ import annotations
 
+import json
 import os
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
 from typing import Any, Final
 
-import requests
+import yaml
 from actions_toolkit import core
 
-GITHUB_API_BASE: Final[str] = "https://api.github.com"
+# Shared helpers live in .github/actions/shared; a composite action only has its own src/ on sys.path.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "shared"))
+
+from github_api import GitHubApi  # noqa: E402  pylint: disable=wrong-import-position
+from deploy_changes import (  # noqa: E402  pylint: disable=wrong-import-position
+    FileChange,
+    RunCache,
+    find_previous_successful_run_sha,
+    list_changes,
+    write_deploy_diff,
+)
 
 
 def get_required_env(name: str) -> str:
@@ -34,93 +49,197 @@ def parse_github_repo() -> tuple[str, str]:
     return owner, name
 
 
-def github_get_json(
-    *,
-    token: str,
-    path: str,
-    params: dict[str, Any] | None = None,
-) -> Any:
-    url = f"{GITHUB_API_BASE}{path}"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {token}",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
+_GITHUB_APIS: dict[str, GitHubApi] = {}
 
-    response = requests.get(url, headers=headers, params=params, timeout=30)
-    if response.status_code < 200 or response.status_code >= 300:
-        raise ValueError(f"GitHub API request failed ({response.status_code}) for {path}: {response.text}")
-    return response.json()
-
-
-def find_previous_successful_run_sha(
-    *,
-    token: str,
-    owner: str,
-    repo: str,
-    workflow_file: str,
-    base_branch: str,
-    current_run_id: str,
-) -> str | None:
-    data = github_get_json(
-        token=token,
-        path=f"/repos/{owner}/{repo}/actions/workflows/{workflow_file}/runs",
-        params={
-            "branch": base_branch,
-            "status": "completed",
-            "per_page": 10,
-        },
-    )
-
-    runs = (data or {}).get("workflow_runs") or []
-    for workflow_run in runs:
-        run_id = str((workflow_run or {}).get("id") or "").strip()
-        if run_id and run_id == current_run_id:
-            continue
-        if (workflow_run or {}).get("conclusion") != "success":
-            continue
-        head_sha = str((workflow_run or {}).get("head_sha") or "").strip()
-        if head_sha:
-            return head_sha
 
-    return None
+def github_api(token: str) -> GitHubApi:
+    """One pooled client per token, so every call in the step shares connections and ETags."""
+    if token not in _GITHUB_APIS:
+        _GITHUB_APIS[token] = GitHubApi(token, user_agent="webstackbuilders-determine-search-index-scope")
+    return _GITHUB_APIS[token]
+
+
+def log_github_metrics() -> None:
+    for api in _GITHUB_APIS.values():
+        core.info(api.metrics_summary())
+
+
+# Written once per run so prune-upstash-search can reuse the diff without calling GitHub again.
+DIFF_FILE_NAME: Final[str] = "search-deploy-diff.json"
+
+
+def resolve_diff_file(path: str) -> Path | None:
+    if path:
+        return Path(path)
+    runner_temp = (os.environ.get("RUNNER_TEMP") or "").strip()
+    return Path(runner_temp) / DIFF_FILE_NAME if runner_temp else None
+
 
+def publish_deploy_diff(path: Path | None, *, base_sha: str | None, head_sha: str, changes: list[FileChange]) -> None:
+    core.set_output("base_sha", base_sha or "")
+    if path is None:
+        core.set_output("diff_file", "")
+        return
+    write_deploy_diff(path, base_sha=base_sha, head_sha=head_sha, changes=changes)
+    core.set_output("diff_file", str(path))
+    core.info(f"Wrote {len(changes)} changed files to {path}.")
 
-def determine_crawl_scope(*, changed_files: list[str], content_root: str) -> tuple[bool, bool, bool, bool]:
-    normalized_root = content_root
-    if not normalized_root.endswith("/"):
-        normalized_root = f"{normalized_root}/"
 
-    content_files = [file for file in changed_files if file.startswith(normalized_root)]
-    should_index = len(content_files) > 0
+# Mirrors COLLECTIONS in scripts/search-index.py: (source dir, page file name, URL prefix).
+PAGE_SOURCES: Final[tuple[tuple[str, str, str], ...]] = (
+    ("articles", "index.mdx", "/articles"),
+    ("articles", "pdf.mdx", "/deep-dive"),
+    ("case-studies", "index.mdx", "/case-studies"),
+    ("services", "index.md", "/services"),
+)
+# Frontmatter fields that reference shared entries (see src/content.config.ts), keyed to their collection.
+REFERENCE_FIELDS: Final[dict[str, str]] = {"author": "authors", "tags": "tags", "client": "clients"}
+SHARED_COLLECTIONS: Final[tuple[str, ...]] = ("authors", "clients", "tags", "testimonials")
+SCOPE_FILE_NAME: Final[str] = "search-page-scope.json"
+FRONTMATTER_RE: Final[re.Pattern[str]] = re.compile(r"\A---\s*\n(.*?)\n---\s*(?:\n|\Z)", re.DOTALL)
 
-    if not should_index:
-        return False, False, False, False
 
-    articles_prefix = f"{normalized_root}articles/"
-    services_prefix = f"{normalized_root}services/"
-    case_studies_prefix = f"{normalized_root}case-studies/"
+@dataclass(slots=True)
+class PageScope:
+    # URL path -> repo-relative source file, for pages that must be re-indexed.
+    pages: dict[str, str] = field(default_factory=dict)
+    # URL path -> why it is in scope ("changed" or the shared entry that references it).
+    reasons: dict[str, list[str]] = field(default_factory=dict)
+    # URL paths whose source file was removed; prune-upstash-search deletes these.
+    removed: set[str] = field(default_factory=set)
+    # Shared entry ("authors/kevin-brown") -> URL paths of the pages that reference it.
+    dependencies: dict[str, list[str]] = field(default_factory=dict)
 
-    articles_changed = any(file.startswith(articles_prefix) for file in content_files)
-    services_changed = any(file.startswith(services_prefix) for file in content_files)
-    case_studies_changed = any(file.startswith(case_studies_prefix) for file in content_files)
+    def add(self, url_path: str, source_file: str, reason: str) -> None:
+        self.pages[url_path] = source_file
+        reasons = self.reasons.setdefault(url_path, [])
+        if reason not in reasons:
+            reasons.append(reason)
 
-    other_content_changed = any(
-        not file.startswith(articles_prefix)
-        and not file.startswith(services_prefix)
-        and not file.startswith(case_studies_prefix)
-        for file in content_files
-    )
 
-    only_articles_changed = articles_changed and not services_changed and not case_studies_changed and not other_content_changed
+def normalize_content_root(content_root: str) -> str:
+    return content_root if content_root.endswith("/") else f"{content_root}/"
 
-    if only_articles_changed:
-        return True, True, False, False
 
-    if other_content_changed:
-        return True, True, True, True
+def page_url_for_file(relative: str) -> str | None:
+    """URL path of a page file given relative to the content root, or None when it is not an indexed page."""
+    parts = PurePosixPath(relative).parts
+    for source_dir, file_name, url_prefix in PAGE_SOURCES:
+        if len(parts) >= 3 and parts[0] == source_dir and parts[-1] == file_name:
+            return f"{url_prefix}/{'/'.join(parts[1:-1])}"
+    return None
+
+
+def shared_entry_for_file(relative: str) -> str | None:
+    """Shared entry id for any file of a shared collection: authors/x.mdx and tags/x/cover.png both belong to x."""
+    parts = PurePosixPath(relative).parts
+    if len(parts) < 2 or parts[0] not in SHARED_COLLECTIONS:
+        return None
+    entry = PurePosixPath(parts[1]).stem if len(parts) == 2 else parts[1]
+    return f"{parts[0]}/{entry}"
 
-    return True, articles_changed, services_changed, case_studies_changed
+
+def read_frontmatter(path: Path) -> dict[str, Any]:
+    try:
+        match = FRONTMATTER_RE.match(path.read_text(encoding="utf-8"))
+        frontmatter = yaml.safe_load(match.group(1)) if match else {}
+    except (OSError, UnicodeDecodeError, yaml.YAMLError):
+        return {}
+    return frontmatter if isinstance(frontmatter, dict) else {}
+
+
+def referenced_entries(frontmatter: dict[str, Any]) -> list[str]:
+    entries: list[str] = []
+    for field_name, collection in REFERENCE_FIELDS.items():
+        value = frontmatter.get(field_name)
+        values = value if isinstance(value, list) else [value]
+        entries.extend(f"{collection}/{item.strip()}" for item in values if isinstance(item, str) and item.strip())
+    return entries
+
+
+def build_dependency_map(*, workspace: Path, content_root: str) -> tuple[dict[str, list[str]], dict[str, str]]:
+    """Scan the checked-out pages and return (shared entry -> page URL paths, page URL path -> source file)."""
+    normalized_root = normalize_content_root(content_root)
+    content_dir = workspace / normalized_root
+    dependencies: dict[str, set[str]] = {}
+    page_files: dict[str, str] = {}
+
+    for source_dir, file_name, _url_prefix in PAGE_SOURCES:
+        for path in sorted((content_dir / source_dir).glob(f"**/{file_name}")):
+            relative = path.relative_to(content_dir).as_posix()
+            url_path = page_url_for_file(relative)
+            if url_path is None:
+                continue
+            page_files[url_path] = f"{normalized_root}{relative}"
+            for entry in referenced_entries(read_frontmatter(path)):
+                dependencies.setdefault(entry, set()).add(url_path)
+
+    return {entry: sorted(paths) for entry, paths in sorted(dependencies.items())}, page_files
+
+
+def determine_page_scope(*, changes: list[FileChange], content_root: str, workspace: Path) -> PageScope:
+    normalized_root = normalize_content_root(content_root)
+    dependencies, page_files = build_dependency_map(workspace=workspace, content_root=content_root)
+    scope = PageScope(dependencies=dependencies)
+
+    for change in changes:
+        sides = [(change.filename, change.status == "removed")]
+        if change.previous_filename:
+            sides.append((change.previous_filename, True))
+        for filename, removed in sides:
+            if not filename.startswith(normalized_root):
+                continue
+            relative = filename[len(normalized_root):]
+
+            url_path = page_url_for_file(relative)
+            if url_path is not None:
+                if removed:
+                    scope.removed.add(url_path)
+                else:
+                    scope.add(url_path, filename, "changed")
+                continue
+
+            entry = shared_entry_for_file(relative)
+            for dependent in dependencies.get(entry or "", []):
+                scope.add(dependent, page_files[dependent], entry or "")
+
+    # A page that moved to a path that still exists is re-indexed, not pruned.
+    scope.removed -= scope.pages.keys()
+    return scope
+
+
+def determine_crawl_scope(scope: PageScope) -> tuple[bool, bool, bool, bool]:
+    """(should_index, articles, services, case_studies) for the pages to re-index or prune."""
+    url_paths = set(scope.pages) | scope.removed
+    crawl_articles = any(path.startswith(("/articles/", "/deep-dive/")) for path in url_paths)
+    crawl_services = any(path.startswith("/services/") for path in url_paths)
+    crawl_case_studies = any(path.startswith("/case-studies/") for path in url_paths)
+    return bool(url_paths), crawl_articles, crawl_services, crawl_case_studies
+
+
+def resolve_scope_file(path: str) -> Path | None:
+    if path:
+        return Path(path)
+    runner_temp = (os.environ.get("RUNNER_TEMP") or "").strip()
+    return Path(runner_temp) / SCOPE_FILE_NAME if runner_temp else None
+
+
+def publish_page_scope(path: Path | None, scope: PageScope) -> None:
+    url_paths = sorted(scope.pages)
+    core.set_output("page_paths", json.dumps(url_paths))
+    core.set_output("page_files", " ".join(scope.pages[url_path] for url_path in url_paths))
+    if path is None:
+        core.set_output("scope_file", "")
+        return
+
+    payload = {
+        "pages": [{"path": url_path, "file": scope.pages[url_path], "reasons": scope.reasons[url_path]} for url_path in url_paths],
+        "removed": sorted(scope.removed),
+        "dependencies": scope.dependencies,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    core.set_output("scope_file", str(path))
 
 
 def run() -> None:
@@ -131,20 +250,33 @@ def run() -> None:
         current_run_id = get_input("current_run_id")
         head_sha = get_input("head_sha")
         content_root = get_input("content_root", "src/content/")
+        change_source = get_input("change_source", "auto")
+        diff_file = resolve_diff_file(get_input("diff_file", ""))
+        scope_file = resolve_scope_file(get_input("scope_file", ""))
+        workspace = Path(os.environ.get("GITHUB_WORKSPACE") or os.getcwd())
 
         owner, repo = parse_github_repo()
 
+        run_cache_file = get_input("run_cache_file", "")
+        run_cache = RunCache.load(Path(run_cache_file) if run_cache_file else None)
         base_sha = find_previous_successful_run_sha(
-            token=token,
+            github_api(token),
             owner=owner,
             repo=repo,
             workflow_file=workflow_file,
             base_branch=base_branch,
             current_run_id=current_run_id,
+            cache=run_cache,
+            log=core.info,
         )
+        run_cache.save()
 
         # If we cannot determine the previous deployed SHA, index everything.
         if not base_sha:
+            publish_deploy_diff(diff_file, base_sha=None, head_sha=head_sha, changes=[])
+            core.set_output("page_paths", "[]")
+            core.set_output("page_files", "")
+            core.set_output("scope_file", "")
             core.set_output("should_index", "true")
             core.set_output("crawl_articles", "true")
             core.set_output("crawl_services", "true")
@@ -152,17 +284,20 @@ def run() -> None:
             core.info("No previous successful deploy run found; indexing all sections.")
             return
 
-        compare = github_get_json(
-            token=token,
-            path=f"/repos/{owner}/{repo}/compare/{base_sha}...{head_sha}",
+        changes = list_changes(
+            github_api(token),
+            source=change_source,
+            owner=owner,
+            repo=repo,
+            base_sha=base_sha,
+            head_sha=head_sha,
+            log=core.info,
         )
+        publish_deploy_diff(diff_file, base_sha=base_sha, head_sha=head_sha, changes=changes)
+        scope = determine_page_scope(changes=changes, content_root=content_root, workspace=workspace)
+        publish_page_scope(scope_file, scope)
 
-        changed_files = [str(file.get("filename")) for file in (compare or {}).get("files") or [] if file.get("filename")]
-
-        should_index, crawl_articles, crawl_services, crawl_case_studies = determine_crawl_scope(
-            changed_files=changed_files,
-            content_root=content_root,
-        )
+        should_index, crawl_articles, crawl_services, crawl_case_studies = determine_crawl_scope(scope)
 
         core.set_output("should_index", "true" if should_index else "false")
         core.set_output("crawl_articles", "true" if crawl_articles else "false")
@@ -180,8 +315,13 @@ def run() -> None:
                 ]
             )
         )
+        core.info(f"Re-indexing {len(scope.pages)} pages; {len(scope.removed)} removed.")
+        for url_path in sorted(scope.pages):
+            core.info(f"  {url_path} ({', '.join(scope.reasons[url_path])})")
     except Exception as exc:  # noqa: BLE001
         core.set_failed(str(exc))
+    finally:
+        log_github_metrics()
 
 
 if __name__ == "__main__":
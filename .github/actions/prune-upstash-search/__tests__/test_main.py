@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import json
+import sys
 from pathlib import Path
-from types import ModuleType
+from types import ModuleType, SimpleNamespace
+from urllib.parse import parse_qsl
 
 import pytest
 
@@ -22,14 +25,29 @@ def load_action_module() -> ModuleType:
 
 
 class FakeResponse:
-    def __init__(self, *, status_code: int, json_data: object) -> None:
+    def __init__(self, *, status_code: int, json_data: object, headers: dict[str, str] | None = None) -> None:
         self.status_code = status_code
         self._json_data = json_data
+        self.headers = headers or {}
         self.text = ""
 
     def json(self) -> object:
         return self._json_data
 
+def use_fake_github(monkeypatch: pytest.MonkeyPatch, fake_get) -> None:
+    """Answer the shared GitHub client's requests with `fake_get(url, headers, params, timeout)`."""
+    shared = sys.modules["github_api"]
+
+    def send(_self, method: str, url: str, headers: dict[str, str], body: bytes | None, timeout: float):
+        assert method == "GET" and body is None
+        base, _, query = url.partition("?")
+        response = fake_get(base, headers=headers, params=dict(parse_qsl(query)) or None, timeout=timeout)
+        content = b"" if response.json() is None else json.dumps(response.json()).encode("utf-8")
+        return shared.RawResponse(response.status_code, {k.lower(): v for k, v in response.headers.items()}, content)
+
+    monkeypatch.setattr(shared.PooledTransport, "send", send)
+
+
 
 def test_content_file_to_url_path_handles_index_and_extensions() -> None:
     module = load_action_module()
@@ -83,14 +101,13 @@ def test_skips_when_no_previous_success(monkeypatch: pytest.MonkeyPatch) -> None
     monkeypatch.setenv("INPUT_UPSTASH_URL", "https://search.upstash.io")
     monkeypatch.setenv("INPUT_UPSTASH_TOKEN", "token")
     monkeypatch.setenv("INPUT_INDEX_NAME", "default")
-    monkeypatch.setenv("INPUT_SITE_ORIGIN", "https://www.webstackbuilders.com")
     monkeypatch.setenv("INPUT_COLLECTION", "articles")
 
     def fake_get(url: str, headers: dict[str, str], params: dict[str, object] | None = None, timeout: int = 30) -> FakeResponse:
         assert url.endswith("/actions/workflows/deployment-production.yml/runs")
         return FakeResponse(status_code=200, json_data={"workflow_runs": [{"id": 123, "conclusion": "failure"}]})
 
-    monkeypatch.setattr(module.requests, "get", fake_get)
+    use_fake_github(monkeypatch, fake_get)
 
     outputs: dict[str, str] = {}
     monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
@@ -113,7 +130,6 @@ def test_deletes_removed_docs(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("INPUT_UPSTASH_URL", "https://search.upstash.io")
     monkeypatch.setenv("INPUT_UPSTASH_TOKEN", "token")
     monkeypatch.setenv("INPUT_INDEX_NAME", "default")
-    monkeypatch.setenv("INPUT_SITE_ORIGIN", "https://www.webstackbuilders.com/")
     monkeypatch.setenv("INPUT_COLLECTION", "articles")
 
     def fake_get(url: str, headers: dict[str, str], params: dict[str, object] | None = None, timeout: int = 30) -> FakeResponse:
@@ -132,11 +148,25 @@ def test_deletes_removed_docs(monkeypatch: pytest.MonkeyPatch) -> None:
             },
         )
 
-    monkeypatch.setattr(module.requests, "get", fake_get)
+    use_fake_github(monkeypatch, fake_get)
 
+    stored_ids = [
+        *(f"/articles/removed-article#chunk-{n}" for n in range(150)),
+        "/articles/removed-article-two#chunk-0",
+        "/articles/kept#chunk-0",
+    ]
+    range_calls: list[tuple[str, str]] = []
     deleted_calls: list[list[str]] = []
 
     class FakeIndex:
+        def range(self, *, cursor: str = "", limit: int = 1, prefix: str | None = None):
+            range_calls.append((cursor, prefix or ""))
+            matching = [doc_id for doc_id in stored_ids if doc_id.startswith(prefix or "")]
+            start = int(cursor or 0)
+            page = matching[start : start + limit]
+            next_cursor = str(start + limit) if start + limit < len(matching) else ""
+            return SimpleNamespace(next_cursor=next_cursor, documents=[SimpleNamespace(id=doc_id) for doc_id in page])
+
         def delete(self, *, ids=None, prefix=None, filter=None):
             assert prefix is None
             assert filter is None
@@ -156,5 +186,96 @@ def test_deletes_removed_docs(monkeypatch: pytest.MonkeyPatch) -> None:
 
     module.run()
 
-    assert outputs["deleted_count"] == "1"
-    assert deleted_calls == [["https://www.webstackbuilders.com/articles/removed-article"]]
+    assert outputs["found_count"] == "150"
+    assert outputs["deleted_count"] == "150"
+    assert range_calls == [("", "/articles/removed-article#chunk-"), ("100", "/articles/removed-article#chunk-")]
+    assert sorted(len(batch) for batch in deleted_calls) == [50, 100]
+    assert "/articles/removed-article-two#chunk-0" not in [doc_id for batch in deleted_calls for doc_id in batch]
+
+
+def test_content_file_to_url_path_maps_pdf_pages_to_deep_dive() -> None:
+    module = load_action_module()
+
+    assert (
+        module.content_file_to_url_path(
+            filename="src/content/articles/some-article/pdf.mdx",
+            content_root="src/content/",
+            collection="articles",
+        )
+        == "/deep-dive/some-article"
+    )
+
+
+def test_prunes_old_side_of_renames_but_not_pages_that_kept_their_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_action_module()
+
+    monkeypatch.setenv("GITHUB_REPOSITORY", "webstackdev/astro.webstackbuilders.com")
+    monkeypatch.setenv("INPUT_GITHUB_TOKEN", "ghs_xxx")
+    monkeypatch.setenv("INPUT_CURRENT_RUN_ID", "999")
+    monkeypatch.setenv("INPUT_HEAD_SHA", "newsha")
+    monkeypatch.setenv("INPUT_UPSTASH_URL", "https://search.upstash.io")
+    monkeypatch.setenv("INPUT_UPSTASH_TOKEN", "token")
+    monkeypatch.setenv("INPUT_COLLECTION", "articles")
+    monkeypatch.setenv("INPUT_CHANGE_SOURCE", "git")
+
+    monkeypatch.setattr(module, "find_previous_successful_run_sha", lambda *_args, **_kwargs: "oldsha")
+    monkeypatch.setattr(
+        sys.modules["deploy_changes"],
+        "list_changes_from_git",
+        lambda **_kwargs: [
+            module.FileChange("renamed", "src/content/articles/new/index.mdx", "src/content/articles/old/index.mdx"),
+            module.FileChange("renamed", "src/content/articles/same/index.mdx", "src/content/articles/same/index.md"),
+        ],
+    )
+
+    pruned: list[list[str]] = []
+    monkeypatch.setattr(module, "Search", lambda url, token: SimpleNamespace(index=lambda name: "index"))
+    monkeypatch.setattr(
+        module,
+        "prune_pages",
+        lambda index, paths: pruned.append(paths) or module.PruneResult(pages=len(paths), found=0, deleted=0),
+    )
+    monkeypatch.setattr(module.core, "set_output", lambda k, v: None)
+    monkeypatch.setattr(module.core, "set_failed", lambda m: (_ for _ in ()).throw(AssertionError(m)))
+
+    module.run()
+
+    assert pruned == [["/articles/old"]]
+
+
+def test_reads_changes_from_deploy_diff_without_calling_github(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_action_module()
+
+    diff_file = tmp_path / "search-deploy-diff.json"
+    diff_file.write_text(
+        json.dumps(
+            {
+                "base_sha": "oldsha",
+                "head_sha": "newsha",
+                "changes": [{"status": "removed", "filename": "src/content/services/gone/index.md", "previous_filename": ""}],
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.delenv("GITHUB_REPOSITORY", raising=False)
+    monkeypatch.setenv("INPUT_DIFF_FILE", str(diff_file))
+    monkeypatch.setenv("INPUT_UPSTASH_URL", "https://search.upstash.io")
+    monkeypatch.setenv("INPUT_UPSTASH_TOKEN", "token")
+    monkeypatch.setenv("INPUT_COLLECTION", "services")
+    use_fake_github(monkeypatch, lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("GitHub called")))
+
+    pruned: list[list[str]] = []
+    monkeypatch.setattr(module, "Search", lambda url, token: SimpleNamespace(index=lambda name: "index"))
+    monkeypatch.setattr(
+        module,
+        "prune_pages",
+        lambda index, paths: pruned.append(paths) or module.PruneResult(pages=len(paths), found=2, deleted=2),
+    )
+    outputs: dict[str, str] = {}
+    monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
+    monkeypatch.setattr(module.core, "set_failed", lambda m: (_ for _ in ()).throw(AssertionError(m)))
+
+    module.run()
+
+    assert pruned == [["/services/gone"]]
+    assert outputs["deleted_count"] == "2"
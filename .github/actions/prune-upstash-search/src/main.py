@@ -1,13 +1,33 @@
 from __future__ import annotations
 
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, Final, Iterable
 
-import requests
 from actions_toolkit import core
 from upstash_search import Search
 
-GITHUB_API_BASE: Final[str] = "https://api.github.com"
+# Shared helpers live in .github/actions/shared; a composite action only has its own src/ on sys.path.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "shared"))
+
+from github_api import GitHubApi  # noqa: E402  pylint: disable=wrong-import-position
+from deploy_changes import (  # noqa: E402  pylint: disable=wrong-import-position
+    FileChange,
+    RunCache,
+    find_previous_successful_run_sha,
+    list_changes,
+    read_deploy_diff,
+    removed_filenames,
+)
+
+# scripts/search-index.py writes one document per section chunk, with ids "{path}#chunk-{n}".
+CHUNK_ID_SEPARATOR: Final[str] = "#chunk-"
+RANGE_PAGE_SIZE: Final[int] = 100
+DELETE_BATCH_SIZE: Final[int] = 100
+MAX_CONCURRENCY: Final[int] = 4
 
 
 def get_required_env(name: str) -> str:
@@ -35,63 +55,55 @@ def parse_github_repo() -> tuple[str, str]:
     return owner, name
 
 
-def github_get_json(
-    *,
-    token: str,
-    path: str,
-    params: dict[str, Any] | None = None,
-) -> Any:
-    url = f"{GITHUB_API_BASE}{path}"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {token}",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
-
-    response = requests.get(url, headers=headers, params=params, timeout=30)
-    if response.status_code < 200 or response.status_code >= 300:
-        raise ValueError(f"GitHub API request failed ({response.status_code}) for {path}: {response.text}")
-    return response.json()
-
-
-def find_previous_successful_run_sha(
-    *,
-    token: str,
-    owner: str,
-    repo: str,
-    workflow_file: str,
-    base_branch: str,
-    current_run_id: str,
-) -> str | None:
-    data = github_get_json(
-        token=token,
-        path=f"/repos/{owner}/{repo}/actions/workflows/{workflow_file}/runs",
-        params={
-            "branch": base_branch,
-            "status": "completed",
-            "per_page": 10,
-        },
-    )
+_GITHUB_APIS: dict[str, GitHubApi] = {}
 
-    runs = (data or {}).get("workflow_runs") or []
-    for workflow_run in runs:
-        run_id = str((workflow_run or {}).get("id") or "").strip()
-        if run_id and run_id == current_run_id:
-            continue
-        if (workflow_run or {}).get("conclusion") != "success":
-            continue
-        head_sha = str((workflow_run or {}).get("head_sha") or "").strip()
-        if head_sha:
-            return head_sha
 
-    return None
+def github_api(token: str) -> GitHubApi:
+    """One pooled client per token, so every call in the step shares connections and ETags."""
+    if token not in _GITHUB_APIS:
+        _GITHUB_APIS[token] = GitHubApi(token, user_agent="webstackbuilders-prune-upstash-search")
+    return _GITHUB_APIS[token]
 
 
-def normalize_origin(origin: str) -> str:
-    trimmed = origin.strip()
-    if not trimmed:
-        raise ValueError("site_origin is empty")
-    return trimmed[:-1] if trimmed.endswith("/") else trimmed
+def log_github_metrics() -> None:
+    for api in _GITHUB_APIS.values():
+        core.info(api.metrics_summary())
+
+
+def resolve_changes_from_github(*, change_source: str) -> tuple[str | None, list[FileChange]]:
+    github_token = get_input("github_token")
+    workflow_file = get_input("workflow_file", "deployment-production.yml")
+    base_branch = get_input("base_branch", "main")
+    current_run_id = get_input("current_run_id")
+    head_sha = get_input("head_sha")
+    owner, repo = parse_github_repo()
+
+    run_cache_file = get_input("run_cache_file", "")
+    run_cache = RunCache.load(Path(run_cache_file) if run_cache_file else None)
+    base_sha = find_previous_successful_run_sha(
+        github_api(github_token),
+        owner=owner,
+        repo=repo,
+        workflow_file=workflow_file,
+        base_branch=base_branch,
+        current_run_id=current_run_id,
+        cache=run_cache,
+        log=core.info,
+    )
+    run_cache.save()
+    if not base_sha:
+        return None, []
+
+    changes = list_changes(
+        github_api(github_token),
+        source=change_source,
+        owner=owner,
+        repo=repo,
+        base_sha=base_sha,
+        head_sha=head_sha,
+        log=core.info,
+    )
+    return base_sha, changes
 
 
 def normalize_content_root(content_root: str) -> str:
@@ -130,6 +142,10 @@ def content_file_to_url_path(*, filename: str, content_root: str, collection: st
 
     relative = relative.strip("/")
 
+    # articles/<slug>/pdf.mdx is indexed as the deep-dive collection.
+    if collection == "articles" and relative.endswith("/pdf"):
+        return f"/deep-dive/{relative[: -len('/pdf')]}"
+
     if relative:
         return f"/{collection}/{relative}"
     return f"/{collection}"
@@ -140,80 +156,103 @@ def chunked(values: list[str], chunk_size: int) -> Iterable[list[str]]:
         yield values[index : index + chunk_size]
 
 
+@dataclass(slots=True)
+class PruneResult:
+    pages: int
+    found: int
+    deleted: int
+
+
+def chunk_id_prefix(url_path: str) -> str:
+    return f"{url_path}{CHUNK_ID_SEPARATOR}"
+
+
+def find_chunk_ids(index: Any, url_path: str) -> list[str]:
+    """Page through every document id the indexer wrote for `url_path`."""
+    ids: list[str] = []
+    cursor = ""
+    while True:
+        page = index.range(cursor=cursor, limit=RANGE_PAGE_SIZE, prefix=chunk_id_prefix(url_path))
+        ids.extend(str(document.id) for document in page.documents)
+        next_cursor = str(page.next_cursor or "")
+        if not next_cursor or next_cursor == cursor:
+            return ids
+        cursor = next_cursor
+
+
+def prune_pages(index: Any, url_paths: list[str], *, concurrency: int = MAX_CONCURRENCY) -> PruneResult:
+    """Resolve the chunk ids of every removed page, then delete them in concurrent batches."""
+    workers = max(concurrency, 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        found_ids = [chunk_id for ids in executor.map(lambda path: find_chunk_ids(index, path), url_paths) for chunk_id in ids]
+        batches = list(chunked(sorted(set(found_ids)), DELETE_BATCH_SIZE))
+        deleted = sum(int(count) for count in executor.map(lambda batch: index.delete(ids=batch), batches))
+    return PruneResult(pages=len(url_paths), found=len(set(found_ids)), deleted=deleted)
+
+
 def run() -> None:
     try:
-        github_token = get_input("github_token")
-        workflow_file = get_input("workflow_file", "deployment-production.yml")
-        base_branch = get_input("base_branch", "main")
-        current_run_id = get_input("current_run_id")
-        head_sha = get_input("head_sha")
-
         upstash_url = get_input("upstash_url")
         upstash_token = get_input("upstash_token")
         index_name = get_input("index_name", "default")
 
-        site_origin = normalize_origin(get_input("site_origin"))
         collection = get_input("collection")
         content_root = get_input("content_root", "src/content/")
+        change_source = get_input("change_source", "auto")
+        diff_file = get_input("diff_file", "")
 
         if collection not in {"articles", "services", "case-studies"}:
             raise ValueError("collection must be one of: articles, services, case-studies")
 
-        owner, repo = parse_github_repo()
-
-        base_sha = find_previous_successful_run_sha(
-            token=github_token,
-            owner=owner,
-            repo=repo,
-            workflow_file=workflow_file,
-            base_branch=base_branch,
-            current_run_id=current_run_id,
-        )
+        if diff_file:
+            base_sha, changes = read_deploy_diff(Path(diff_file))
+        else:
+            base_sha, changes = resolve_changes_from_github(change_source=change_source)
 
         # If we can't determine the previous deployed SHA, don't delete anything.
         if not base_sha:
+            core.set_output("found_count", "0")
             core.set_output("deleted_count", "0")
             core.info("No previous successful deploy run found; skipping prune.")
             return
 
-        compare = github_get_json(
-            token=github_token,
-            path=f"/repos/{owner}/{repo}/compare/{base_sha}...{head_sha}",
-        )
-
-        removed_files: list[str] = []
-        for file in (compare or {}).get("files") or []:
-            filename = str((file or {}).get("filename") or "").strip()
-            status = str((file or {}).get("status") or "").strip()
-            if not filename or status != "removed":
-                continue
-            removed_files.append(filename)
+        # A page whose source moved but still maps to the same URL (e.g. index.md -> index.mdx)
+        # was just re-indexed under that URL, so it must not be pruned.
+        live_paths = {
+            content_file_to_url_path(filename=change.filename, content_root=content_root, collection=collection)
+            for change in changes
+            if change.status != "removed"
+        }
 
-        removed_doc_ids: list[str] = []
-        for filename in removed_files:
+        removed_paths: list[str] = []
+        for filename in removed_filenames(changes):
             url_path = content_file_to_url_path(filename=filename, content_root=content_root, collection=collection)
-            if not url_path:
-                continue
-            removed_doc_ids.append(f"{site_origin}{url_path}")
+            if url_path and url_path not in live_paths and url_path not in removed_paths:
+                removed_paths.append(url_path)
 
-        if not removed_doc_ids:
+        if not removed_paths:
+            core.set_output("found_count", "0")
             core.set_output("deleted_count", "0")
             core.info("No removed documents to prune.")
             return
 
-        core.info(f"Found {len(removed_doc_ids)} removed URLs to delete from Upstash Search.")
+        core.info(f"Found {len(removed_paths)} removed pages to prune from Upstash Search.")
 
         client = Search(url=upstash_url, token=upstash_token)
-        index = client.index(index_name)
-
-        deleted_total = 0
-        for chunk in chunked(removed_doc_ids, 100):
-            deleted_total += int(index.delete(ids=chunk))
+        result = prune_pages(client.index(index_name), removed_paths)
 
-        core.set_output("deleted_count", str(deleted_total))
-        core.info(f"Deleted {deleted_total} documents from index '{index_name}'.")
+        core.set_output("found_count", str(result.found))
+        core.set_output("deleted_count", str(result.deleted))
+        core.info(
+            f"Deleted {result.deleted} of {result.found} chunk documents found for "
+            f"{result.pages} removed pages from index '{index_name}'."
+        )
+        if result.deleted != result.found:
+            core.warning(f"{result.found - result.deleted} chunk documents were found but not deleted.")
     except Exception as exc:  # noqa: BLE001
         core.set_failed(str(exc))
+    finally:
+        log_github_metrics()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-import io
 import json
+import sys
 from pathlib import Path
-import urllib.error
 
 import pytest
 
@@ -36,57 +35,180 @@ def test_find_success_for_sha() -> None:
     assert module.find_success_for_sha(runs, "ccc") is False
 
 
-def test_fetch_workflow_runs_success(monkeypatch: pytest.MonkeyPatch) -> None:
-    module = load_module()
-
-    class FakeResponse:
-        def __init__(self, payload: dict):
-            self._raw = json.dumps(payload).encode("utf-8")
-
-        def read(self) -> bytes:
-            return self._raw
+def fake_github(monkeypatch: pytest.MonkeyPatch, status: int, pages: list[object]) -> list[str]:
+    """Serve shared GitHub client requests from `pages`, linking each to the next; returns the requested URLs."""
+    shared = sys.modules["github_api"]
+    requested: list[str] = []
 
-        def __enter__(self):
-            return io.BytesIO(self._raw)
+    def send(_self, method: str, url: str, headers: dict[str, str], body: bytes | None, timeout: float):
+        assert method == "GET" and timeout == 30
+        requested.append(url)
+        page = int(url.split("&page=", 1)[1]) if "&page=" in url else 1
+        link = {"link": f'<{url.split("&page=", 1)[0]}&page={page + 1}>; rel="next"'} if page < len(pages) else {}
+        return shared.RawResponse(status, link, json.dumps(pages[page - 1]).encode("utf-8"))
 
-        def __exit__(self, _exc_type, _exc, _tb):
-            return False
+    monkeypatch.setattr(shared.PooledTransport, "send", send)
+    monkeypatch.setattr(shared, "BACKOFF_SECONDS", 0)
+    return requested
 
-    def fake_urlopen(_req, timeout: int):
-        assert timeout == 30
-        return FakeResponse({"workflow_runs": [{"head_sha": "x", "conclusion": "success"}]})
 
-    monkeypatch.setattr(module.urllib.request, "urlopen", fake_urlopen)
-
-    runs = module.fetch_workflow_runs(
+def fetch(module, expected_sha: str = "x"):
+    return module.fetch_workflow_runs(
         api_url="https://api.github.com",
         repository="webstackdev/astro.webstackbuilders.com",
         workflow_file="playwright.yml",
         token="t",
-        per_page=50,
+        per_page=10,
+        expected_sha=expected_sha,
     )
+
+
+def test_fetch_workflow_runs_filters_by_sha_in_one_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_module()
+    requested = fake_github(
+        monkeypatch,
+        200,
+        [{"workflow_runs": [{"head_sha": "x", "conclusion": "success"}]}, {"workflow_runs": [{"head_sha": "x"}]}],
+    )
+
+    runs = fetch(module)
+
     assert runs == [{"head_sha": "x", "conclusion": "success"}]
+    assert requested == [
+        "https://api.github.com/repos/webstackdev/astro.webstackbuilders.com/actions/workflows/playwright.yml/runs"
+        "?head_sha=x&status=completed&per_page=10"
+    ]
 
 
-def test_fetch_workflow_runs_http_error(monkeypatch: pytest.MonkeyPatch) -> None:
+def test_fetch_workflow_runs_pages_only_while_the_sha_is_missing(monkeypatch: pytest.MonkeyPatch) -> None:
     module = load_module()
+    # A server that ignores head_sha lists newer runs for other SHAs first.
+    requested = fake_github(
+        monkeypatch,
+        200,
+        [
+            {"workflow_runs": [{"head_sha": "newer"}]},
+            {"workflow_runs": [{"head_sha": "x", "conclusion": "failure"}, {"head_sha": "x"}]},
+            {"workflow_runs": [{"head_sha": "older"}]},
+        ],
+    )
+
+    runs = fetch(module)
 
-    def fake_urlopen(_req, timeout: int):
-        raise urllib.error.HTTPError(
-            url="https://api.github.com/x",
-            code=500,
-            msg="no",
-            hdrs=None,
-            fp=io.BytesIO(b"boom"),
-        )
+    assert [run["head_sha"] for run in runs] == ["newer", "x"]
+    assert module.find_success_for_sha(runs, "x") is False
+    assert len(requested) == 2
 
-    monkeypatch.setattr(module.urllib.request, "urlopen", fake_urlopen)
+
+def test_fetch_workflow_runs_http_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_module()
+    requested = fake_github(monkeypatch, 500, [{"message": "boom"}])
 
     with pytest.raises(RuntimeError, match=r"\(500\)"):
-        module.fetch_workflow_runs(
-            api_url="https://api.github.com",
-            repository="webstackdev/astro.webstackbuilders.com",
-            workflow_file="playwright.yml",
-            token="t",
-            per_page=50,
-        )
+        fetch(module)
+    # Server errors are retried before giving up.
+    assert len(requested) == 4
+
+
+def test_run_skips_workflows_already_confirmed_in_the_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    module = load_module()
+    requested = fake_github(monkeypatch, 200, [{"workflow_runs": [{"id": 9, "head_sha": "x", "conclusion": "success"}]}])
+    cache_file = tmp_path / "playwright-runs.json"
+    for name, value in {"GITHUB_TOKEN": "t", "EXPECTED_SHA": "x", "CACHE_FILE": str(cache_file)}.items():
+        monkeypatch.setenv(f"INPUT_{name}", value)
+    monkeypatch.setenv("GITHUB_REPOSITORY", "o/r")
+
+    module.run()
+    module.run()
+
+    assert len(requested) == 1
+    assert json.loads(cache_file.read_text(encoding="utf-8"))["successes"] == {"playwright.yml@x": 9}
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def scripted_github(monkeypatch: pytest.MonkeyPatch, script: dict[str, list[list[dict]]]) -> list[str]:
+    """Answer run listings per workflow file from `script`, repeating each workflow's last response."""
+    shared = sys.modules["github_api"]
+    requested: list[str] = []
+
+    def send(_self, method: str, url: str, headers: dict[str, str], body: bytes | None, timeout: float):
+        requested.append(url)
+        assert "head_sha=abc" in url
+        workflow_file = url.split("/workflows/", 1)[1].split("/", 1)[0]
+        responses = script[workflow_file]
+        runs = responses.pop(0) if len(responses) > 1 else responses[0]
+        return shared.RawResponse(200, {}, json.dumps({"workflow_runs": runs}).encode("utf-8"))
+
+    monkeypatch.setattr(shared.PooledTransport, "send", send)
+    return requested
+
+
+def test_wait_for_gates_backs_off_until_every_workflow_succeeds(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_module()
+    running = {"status": "in_progress", "conclusion": None}
+    passed = {"status": "completed", "conclusion": "success"}
+    scripted_github(monkeypatch, {"playwright.yml": [[], [running], [running], [passed]], "lint.yml": [[passed]]})
+    clock = FakeClock()
+
+    statuses = module.wait_for_gates(
+        module.GitHubApi("t", base_url="https://api.github.com"),
+        repository="o/r",
+        workflow_files=["playwright.yml", "lint.yml"],
+        expected_sha="abc",
+        timeout=60,
+        poll_interval=5,
+        max_poll_interval=15,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+    assert {file: status.state for file, status in statuses.items()} == {"playwright.yml": "success", "lint.yml": "success"}
+    assert clock.sleeps == [5, 10, 15]
+
+
+def test_wait_for_gates_stops_at_first_failure_or_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_module()
+    running = {"status": "in_progress", "conclusion": None}
+    failed = {"status": "completed", "conclusion": "failure"}
+    scripted_github(monkeypatch, {"playwright.yml": [[running]], "lint.yml": [[running], [failed]]})
+    api = module.GitHubApi("t", base_url="https://api.github.com")
+
+    clock = FakeClock()
+    statuses = module.wait_for_gates(
+        api, repository="o/r", workflow_files=["playwright.yml", "lint.yml"], expected_sha="abc",
+        timeout=600, poll_interval=5, clock=clock, sleep=clock.sleep,
+    )
+    assert statuses["lint.yml"].state == "failed"
+    assert clock.sleeps == [5]
+
+    clock = FakeClock()
+    statuses = module.wait_for_gates(
+        api, repository="o/r", workflow_files=["playwright.yml"], expected_sha="abc",
+        timeout=12, poll_interval=5, clock=clock, sleep=clock.sleep,
+    )
+    assert statuses["playwright.yml"].state == "pending"
+    assert clock.sleeps == [5, 7]
+
+
+def test_run_in_wait_mode_fails_the_step_when_a_gate_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = load_module()
+    scripted_github(monkeypatch, {"playwright.yml": [[{"status": "completed", "conclusion": "cancelled"}]]})
+    monkeypatch.setenv("INPUT_GITHUB_TOKEN", "t")
+    monkeypatch.setenv("INPUT_EXPECTED_SHA", "abc")
+    monkeypatch.setenv("INPUT_WAIT", "true")
+    monkeypatch.setenv("GITHUB_REPOSITORY", "o/r")
+
+    with pytest.raises(SystemExit):
+        module.run()
@@ -2,10 +2,33 @@ from __future__ import annotations
 
 import json
 import os
+import re
 import sys
-import urllib.error
-import urllib.request
-from typing import Any
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Final
+
+# Shared helpers live in .github/actions/shared; a composite action only has its own src/ on sys.path.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "shared"))
+
+from github_api import GitHubApi  # noqa: E402  pylint: disable=wrong-import-position
+
+USER_AGENT: Final[str] = "webstackbuilders-require-playwright-success"
+DEFAULT_TIMEOUT_SECONDS: Final[float] = 1800
+DEFAULT_POLL_INTERVAL_SECONDS: Final[float] = 15
+DEFAULT_MAX_POLL_INTERVAL_SECONDS: Final[float] = 120
+DEFAULT_PER_PAGE: Final[int] = 10
+# Only reached when the API ignores the head_sha filter and the SHA's run is buried under newer ones.
+MAX_RUN_PAGES: Final[int] = 5
+SUCCESS_CACHE_VERSION: Final[int] = 1
+# Settled gate states; anything else is still waiting.
+SUCCESS: Final[str] = "success"
+FAILED: Final[str] = "failed"
+PENDING: Final[str] = "pending"
+MISSING: Final[str] = "missing"
 
 
 def get_env(name: str, default: str | None = None) -> str:
@@ -37,59 +60,225 @@ def fetch_workflow_runs(
     workflow_file: str,
     token: str,
     per_page: int,
+    expected_sha: str,
+    api: GitHubApi | None = None,
 ) -> list[dict[str, Any]]:
-    url = (
-        f"{api_url}/repos/{repository}/actions/workflows/{workflow_file}/runs"
-        f"?status=completed&per_page={per_page}"
+    """Completed runs of `workflow_file` for `expected_sha`, newest first, as far as the first one.
+
+    GitHub filters by `head_sha` server side, so this is normally a single small page. Further pages
+    are only requested while no run for the SHA has turned up, which happens when an API (older
+    GitHub Enterprise Server) ignores the filter and lists every completed run.
+    """
+    api = api or GitHubApi(token, base_url=api_url, user_agent=USER_AGENT)
+    runs: list[dict[str, Any]] = []
+    for workflow_run in api.paginate(
+        f"/repos/{repository}/actions/workflows/{workflow_file}/runs",
+        {"head_sha": expected_sha, "status": "completed", "per_page": per_page},
+        key="workflow_runs",
+        max_pages=MAX_RUN_PAGES,
+    ):
+        runs.append(workflow_run)
+        if (workflow_run or {}).get("head_sha") == expected_sha:
+            break
+    return runs
+
+
+@dataclass(slots=True)
+class SuccessCache:
+    """Runs already seen succeeding, keyed by `workflow_file@sha`; a success never changes, so it is never re-checked."""
+
+    path: Path | None
+    successes: dict[str, int] = field(default_factory=dict)
+
+    @staticmethod
+    def key(workflow_file: str, expected_sha: str) -> str:
+        return f"{workflow_file}@{expected_sha}"
+
+    @classmethod
+    def load(cls, path: Path | None) -> SuccessCache:
+        if path is None or not path.is_file():
+            return cls(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != SUCCESS_CACHE_VERSION:
+            return cls(path)
+        return cls(path, dict(data.get("successes") or {}))
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f"{self.path.suffix}.tmp")
+        tmp_path.write_text(json.dumps({"version": SUCCESS_CACHE_VERSION, "successes": self.successes}), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+@dataclass(slots=True, frozen=True)
+class GateStatus:
+    workflow_file: str
+    state: str
+    detail: str = ""
+
+
+def parse_workflow_files(value: str) -> list[str]:
+    files: list[str] = []
+    for item in re.split(r"[,\n]", value):
+        item = item.strip()
+        if item and item not in files:
+            files.append(item)
+    return files
+
+
+def parse_float(value: str, default: float) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def gate_status(workflow_file: str, runs: list[dict[str, Any]]) -> GateStatus:
+    """State of the newest run in `runs` (all for one SHA, newest first, as GitHub lists them)."""
+    if not runs:
+        return GateStatus(workflow_file, MISSING, "no run for this SHA yet")
+    latest = runs[0] or {}
+    url = str(latest.get("html_url") or "")
+    if latest.get("status") != "completed":
+        return GateStatus(workflow_file, PENDING, f"{latest.get('status') or 'queued'} {url}".strip())
+    if latest.get("conclusion") == "success":
+        return GateStatus(workflow_file, SUCCESS, url)
+    return GateStatus(workflow_file, FAILED, f"{latest.get('conclusion') or 'unknown'} {url}".strip())
+
+
+def check_gate(api: GitHubApi, *, repository: str, workflow_file: str, expected_sha: str) -> GateStatus:
+    data = api.get_json(
+        f"/repos/{repository}/actions/workflows/{workflow_file}/runs",
+        {"head_sha": expected_sha, "per_page": 100},
     )
+    return gate_status(workflow_file, list((data or {}).get("workflow_runs") or []))
+
+
+def wait_for_gates(
+    api: GitHubApi,
+    *,
+    repository: str,
+    workflow_files: list[str],
+    expected_sha: str,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+    max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL_SECONDS,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> dict[str, GateStatus]:
+    """Poll every workflow concurrently until all succeed, one fails, or `timeout` seconds pass.
+
+    Unchanged polls are ETag revalidations, which GitHub does not count against the rate limit.
+    """
+    deadline = clock() + timeout
+    interval = poll_interval
+    statuses: dict[str, GateStatus] = {}
+    waiting = list(workflow_files)
+
+    with ThreadPoolExecutor(max_workers=max(len(workflow_files), 1)) as pool:
+        while True:
+            checked = pool.map(
+                lambda workflow_file: check_gate(
+                    api, repository=repository, workflow_file=workflow_file, expected_sha=expected_sha
+                ),
+                waiting,
+            )
+            for status in checked:
+                statuses[status.workflow_file] = status
+            waiting = [file for file in waiting if statuses[file].state not in (SUCCESS, FAILED)]
+
+            if not waiting or any(status.state == FAILED for status in statuses.values()):
+                return statuses
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return statuses
+
+            delay = min(interval, remaining)
+            print(f"⏳ Waiting {delay:.0f}s for: {', '.join(f'{file} ({statuses[file].state})' for file in waiting)}")
+            sleep(delay)
+            interval = min(interval * 2, max_poll_interval)
 
-    req = urllib.request.Request(
-        url,
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28",
-            "User-Agent": "webstackbuilders-require-playwright-success",
-        },
+
+def run_wait_mode(*, token: str, api_url: str, repository: str, workflow_files: list[str], expected_sha: str) -> None:
+    api = GitHubApi(token, base_url=api_url, user_agent=USER_AGENT)
+    statuses = wait_for_gates(
+        api,
+        repository=repository,
+        workflow_files=workflow_files,
+        expected_sha=expected_sha,
+        timeout=parse_float(get_env("INPUT_TIMEOUT_SECONDS"), DEFAULT_TIMEOUT_SECONDS),
+        poll_interval=parse_float(get_env("INPUT_POLL_INTERVAL_SECONDS"), DEFAULT_POLL_INTERVAL_SECONDS),
+        max_poll_interval=parse_float(get_env("INPUT_MAX_POLL_INTERVAL_SECONDS"), DEFAULT_MAX_POLL_INTERVAL_SECONDS),
     )
+    print(api.metrics_summary())
 
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            data = json.load(resp)
-    except urllib.error.HTTPError as exc:
-        detail = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"GitHub API GET {url} failed ({exc.code}): {detail}") from exc
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"GitHub API GET {url} failed: {exc}") from exc
+    for workflow_file in workflow_files:
+        status = statuses[workflow_file]
+        icon = "✅" if status.state == SUCCESS else "❌"
+        print(f"{icon} {workflow_file}: {status.state} {status.detail}".rstrip())
+    if all(status.state == SUCCESS for status in statuses.values()):
+        return
 
-    runs = (data or {}).get("workflow_runs") or []
-    return list(runs)
+    print("❌ Required workflows did not all succeed for this SHA; aborting deploy.", file=sys.stderr)
+    raise SystemExit(1)
 
 
 def run() -> None:
     token = get_required_input("github_token")
     expected_sha = get_required_input("expected_sha")
-    workflow_file = get_env("INPUT_WORKFLOW_FILE", "playwright.yml")
+    workflow_files = parse_workflow_files(get_env("INPUT_WORKFLOW_FILE", "playwright.yml"))
 
     try:
-        per_page = int(get_env("INPUT_PER_PAGE", "50"))
+        per_page = int(get_env("INPUT_PER_PAGE", str(DEFAULT_PER_PAGE)))
     except ValueError:
-        per_page = 50
+        per_page = DEFAULT_PER_PAGE
 
     api_url = get_env("GITHUB_API_URL", "https://api.github.com")
     repository = get_env("GITHUB_REPOSITORY")
     if "/" not in repository:
         raise ValueError("GITHUB_REPOSITORY is not in 'owner/repo' format")
 
-    runs = fetch_workflow_runs(
-        api_url=api_url,
-        repository=repository,
-        workflow_file=workflow_file,
-        token=token,
-        per_page=per_page,
-    )
+    if get_env("INPUT_WAIT").lower() in {"1", "true", "yes", "on"}:
+        run_wait_mode(
+            token=token,
+            api_url=api_url,
+            repository=repository,
+            workflow_files=workflow_files,
+            expected_sha=expected_sha,
+        )
+        return
+
+    cache_file = get_env("INPUT_CACHE_FILE")
+    cache = SuccessCache.load(Path(cache_file) if cache_file else None)
+    api = GitHubApi(token, base_url=api_url, user_agent=USER_AGENT)
+    succeeded = True
+    for workflow_file in workflow_files:
+        key = SuccessCache.key(workflow_file, expected_sha)
+        if key in cache.successes:
+            print(f"✅ {workflow_file}: run {cache.successes[key]} already confirmed for this SHA")
+            continue
+        runs = fetch_workflow_runs(
+            api_url=api_url,
+            repository=repository,
+            workflow_file=workflow_file,
+            token=token,
+            per_page=per_page,
+            expected_sha=expected_sha,
+            api=api,
+        )
+        if not find_success_for_sha(runs, expected_sha):
+            succeeded = False
+            break
+        cache.successes[key] = int(runs[-1].get("id") or 0)
+    print(api.metrics_summary())
+    cache.save()
 
-    if find_success_for_sha(runs, expected_sha):
+    if succeeded:
         print("✅ Playwright succeeded for this SHA")
         return
 
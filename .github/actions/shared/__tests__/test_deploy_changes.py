@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+import subprocess
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+from urllib.parse import parse_qsl
+
+import pytest
+
+SHARED_ROOT = Path(__file__).resolve().parents[1]
+
+# (status, headers, JSON payload) for a request's base URL, query params and headers.
+Handler = Callable[[str, dict[str, str], dict[str, str]], tuple[int, dict[str, str], object]]
+
+
+def load_shared_modules() -> tuple[ModuleType, ModuleType]:
+    import importlib.util
+    import sys
+
+    modules = []
+    for name in ("github_api", "deploy_changes"):
+        spec = importlib.util.spec_from_file_location(name, SHARED_ROOT / f"{name}.py")
+        assert spec and spec.loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        modules.append(module)
+    return modules[0], modules[1]
+
+
+class HandlerTransport:
+    def __init__(self, github_api: ModuleType, handler: Handler) -> None:
+        self.github_api = github_api
+        self.handler = handler
+
+    def send(self, method: str, url: str, *, headers: dict[str, str], body: bytes | None, timeout: float):
+        assert method == "GET" and body is None
+        base, _, query = url.partition("?")
+        status, response_headers, payload = self.handler(base, dict(parse_qsl(query)), headers)
+        content = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        return self.github_api.RawResponse(status, {k.lower(): v for k, v in response_headers.items()}, content)
+
+
+def make_api(github_api: ModuleType, handler: Handler):
+    return github_api.GitHubApi("t", base_url="https://api.github.com", transport=HandlerTransport(github_api, handler))
+
+
+def test_previous_success_lookup_pages_past_failed_runs() -> None:
+    github_api, deploy_changes = load_shared_modules()
+    requested_pages: list[str] = []
+
+    def handler(url: str, params: dict[str, str], _headers: dict[str, str]):
+        assert url.endswith("/actions/workflows/deploy.yml/runs")
+        assert params["branch"] == "main" and params["status"] == "success"
+        requested_pages.append(params["page"])
+        if params["page"] == "1":
+            runs = [{"id": 999, "conclusion": "success", "head_sha": "newsha"}]
+            runs += [{"id": n, "conclusion": "failure", "head_sha": f"sha{n}"} for n in range(1, deploy_changes.RUN_PAGE_SIZE)]
+            return 200, {}, {"workflow_runs": runs}
+        return 200, {}, {"workflow_runs": [{"id": 500, "conclusion": "success", "head_sha": "oldsha"}]}
+
+    sha = deploy_changes.find_previous_successful_run_sha(
+        make_api(github_api, handler), owner="o", repo="r", workflow_file="deploy.yml", base_branch="main", current_run_id="999"
+    )
+
+    assert sha == "oldsha"
+    assert requested_pages == ["1", "2"]
+
+
+def test_previous_success_lookup_revalidates_with_etags(tmp_path: Path) -> None:
+    github_api, deploy_changes = load_shared_modules()
+    sent_etags: list[str | None] = []
+
+    def handler(_url: str, _params: dict[str, str], headers: dict[str, str]):
+        sent_etags.append(headers.get("If-None-Match"))
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {}, None
+        runs = [{"id": 123, "conclusion": "success", "head_sha": "oldsha", "name": "Deploy"}]
+        return 200, {"ETag": '"v1"'}, {"workflow_runs": runs}
+
+    cache_path = tmp_path / "runs.json"
+    for _ in range(2):
+        # A fresh client per run, as in separate workflow runs: only the on-disk cache carries the ETag.
+        cache = deploy_changes.RunCache.load(cache_path)
+        sha = deploy_changes.find_previous_successful_run_sha(
+            make_api(github_api, handler),
+            owner="o",
+            repo="r",
+            workflow_file="deploy.yml",
+            base_branch="main",
+            current_run_id="999",
+            cache=cache,
+        )
+        cache.save()
+        assert sha == "oldsha"
+
+    assert sent_etags == [None, '"v1"']
+    saved = json.loads(cache_path.read_text(encoding="utf-8"))
+    assert saved["runs"] == {"123": "oldsha"}
+    assert saved["latest"] == {"o/r/deploy.yml@main": "123"}
+
+
+def test_previous_success_lookup_confirms_cached_sha_by_head_sha() -> None:
+    github_api, deploy_changes = load_shared_modules()
+    logged: list[str] = []
+
+    def handler(_url: str, params: dict[str, str], _headers: dict[str, str]):
+        if params.get("head_sha") == "oldsha":
+            return 200, {}, {"workflow_runs": [{"id": 123, "conclusion": "success", "head_sha": "oldsha"}]}
+        return 200, {}, {"workflow_runs": [{"id": 999, "conclusion": "success", "head_sha": "newsha"}]}
+
+    api = make_api(github_api, handler)
+    cache = deploy_changes.RunCache(runs={"123": "oldsha"}, latest={"o/r/deploy.yml@main": "123"})
+    lookup = {"owner": "o", "repo": "r", "workflow_file": "deploy.yml", "base_branch": "main", "current_run_id": "999"}
+
+    assert deploy_changes.find_previous_successful_run_sha(api, **lookup, cache=cache, log=logged.append) == "oldsha"
+    assert logged == ["Using cached previous deploy oldsha (run 123)."]
+    assert deploy_changes.find_previous_successful_run_sha(api, **lookup) is None
+
+
+def test_parse_name_status_keeps_both_sides_of_renames() -> None:
+    _github_api, deploy_changes = load_shared_modules()
+    file_change = deploy_changes.FileChange
+
+    changes = deploy_changes.parse_name_status(
+        "M\0src/content/articles/a/index.mdx\0"
+        "R087\0src/content/articles/old/index.mdx\0src/content/articles/new/index.mdx\0"
+        "D\0src/content/services/gone/index.md\0"
+    )
+
+    assert changes == [
+        file_change(status="modified", filename="src/content/articles/a/index.mdx"),
+        file_change(
+            status="renamed",
+            filename="src/content/articles/new/index.mdx",
+            previous_filename="src/content/articles/old/index.mdx",
+        ),
+        file_change(status="removed", filename="src/content/services/gone/index.md"),
+    ]
+    assert deploy_changes.removed_filenames(changes) == [
+        "src/content/articles/old/index.mdx",
+        "src/content/services/gone/index.md",
+    ]
+
+
+def test_git_changes_keep_non_ascii_paths_unquoted(tmp_path: Path) -> None:
+    _github_api, deploy_changes = load_shared_modules()
+
+    def git(*args: str) -> str:
+        command = ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args]
+        return subprocess.run(command, cwd=tmp_path, check=True, capture_output=True, text=True).stdout.strip()
+
+    git("init", "-q")
+    article = tmp_path / "src" / "content" / "articles" / "café" / "index.md"
+    article.parent.mkdir(parents=True)
+    article.write_text("---\ntitle: Café\n---\n", encoding="utf-8")
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+    base = git("rev-parse", "HEAD")
+    article.rename(article.with_name("index.mdx"))
+    git("add", "-A")
+    git("commit", "-q", "-m", "rename")
+
+    changes = deploy_changes.list_changes_from_git(base_sha=base, head_sha="HEAD", cwd=str(tmp_path))
+
+    # Without -z, git would print "src/content/articles/caf\303\251/index.md" in quotes.
+    assert changes == [
+        deploy_changes.FileChange(
+            status="renamed",
+            filename="src/content/articles/café/index.mdx",
+            previous_filename="src/content/articles/café/index.md",
+        )
+    ]
+
+
+def test_list_changes_from_api_replays_commits_past_the_compare_cap() -> None:
+    github_api, deploy_changes = load_shared_modules()
+    requested: list[tuple[str, str | None]] = []
+
+    def handler(url: str, params: dict[str, str], _headers: dict[str, str]):
+        requested.append((url.split("/repos/o/r", 1)[1], params.get("page")))
+        if url.endswith("/compare/old...new"):
+            if not params:
+                return 200, {}, {"files": [{"filename": f"f{n}"} for n in range(300)]}
+            if params.get("page") != "2":
+                link = '<https://api.github.com/repos/o/r/compare/old...new?per_page=100&page=2>; rel="next"'
+                return 200, {"Link": link}, {"commits": [{"sha": "c1"}]}
+            return 200, {}, {"commits": [{"sha": "c2"}]}
+        if url.endswith("/commits/c1"):
+            return 200, {}, {"files": [{"filename": "src/content/articles/a/index.mdx", "status": "added"}]}
+        assert url.endswith("/commits/c2")
+        renamed = {
+            "filename": "src/content/articles/b/index.mdx",
+            "previous_filename": "src/content/articles/a/index.mdx",
+            "status": "renamed",
+        }
+        return 200, {}, {"files": [renamed]}
+
+    changes = deploy_changes.list_changes_from_api(make_api(github_api, handler), owner="o", repo="r", base_sha="old", head_sha="new")
+
+    assert deploy_changes.removed_filenames(changes) == ["src/content/articles/a/index.mdx"]
+    assert [change.filename for change in changes] == ["src/content/articles/a/index.mdx", "src/content/articles/b/index.mdx"]
+    assert ("/compare/old...new", "2") in requested
+    assert ("/commits/c2", None) in requested
+
+
+def test_git_change_source_fails_without_history(monkeypatch: pytest.MonkeyPatch) -> None:
+    github_api, deploy_changes = load_shared_modules()
+    monkeypatch.setattr(deploy_changes, "list_changes_from_git", lambda **_kwargs: None)
+    api = make_api(github_api, lambda *_args: pytest.fail("GitHub called"))
+
+    with pytest.raises(ValueError, match="fetch-depth"):
+        deploy_changes.list_changes(api, source="git", owner="o", repo="r", base_sha="a", head_sha="b")
+
+
+def test_deploy_diff_round_trips(tmp_path: Path) -> None:
+    _github_api, deploy_changes = load_shared_modules()
+    changes = [
+        deploy_changes.FileChange("removed", "src/content/services/gone/index.md"),
+        deploy_changes.FileChange("renamed", "src/content/articles/new/index.mdx", "src/content/articles/old/index.mdx"),
+    ]
+    path = tmp_path / "diff" / "search-deploy-diff.json"
+
+    deploy_changes.write_deploy_diff(path, base_sha="old", head_sha="new", changes=changes)
+
+    assert deploy_changes.read_deploy_diff(path) == ("old", changes)
@@ -0,0 +1,325 @@
+"""
+What changed since the last successful deploy, shared by determine-search-index-scope and prune-upstash-search.
+
+- `find_previous_successful_run_sha` pages through successful runs of the deploy workflow (ETag-revalidated
+  through an optional on-disk `RunCache`) and falls back to the last SHA it resolved.
+- `list_changes` diffs that SHA against the deployed head from the local checkout or the GitHub API.
+- `write_deploy_diff` / `read_deploy_diff` hand the result from one action to the next without a second lookup.
+
+Standard library only, like github_api.py; callers pass their own logger (e.g. `core.info`).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Final
+from urllib.parse import urlencode
+
+from github_api import GitHubApi
+
+# Successful runs come back newest first; past MAX_RUN_PAGES pages the cached SHA is the last resort.
+RUN_PAGE_SIZE: Final[int] = 100
+MAX_RUN_PAGES: Final[int] = 10
+RUN_CACHE_VERSION: Final[int] = 1
+# GitHub's compare endpoint returns at most this many files and does not paginate them.
+COMPARE_FILE_LIMIT: Final[int] = 300
+GITHUB_PAGE_SIZE: Final[int] = 100
+GIT_STATUS_NAMES: Final[dict[str, str]] = {
+    "A": "added",
+    "C": "copied",
+    "D": "removed",
+    "M": "modified",
+    "R": "renamed",
+    "T": "changed",
+}
+CHANGE_SOURCES: Final[tuple[str, ...]] = ("auto", "git", "api")
+
+
+@dataclass(slots=True)
+class RunCache:
+    """ETags of run listings plus resolved run -> SHA pairs, persisted between workflow runs (e.g. via actions/cache)."""
+
+    path: Path | None = None
+    etags: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # Successful run id -> head SHA.
+    runs: dict[str, str] = field(default_factory=dict)
+    # "owner/repo/workflow@branch" -> id of the newest successful run resolved for it.
+    latest: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path | None) -> RunCache:
+        if path is None or not path.is_file():
+            return cls(path=path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path=path)
+        if not isinstance(data, dict) or data.get("version") != RUN_CACHE_VERSION:
+            return cls(path=path)
+        return cls(
+            path=path,
+            etags=dict(data.get("etags") or {}),
+            runs=dict(data.get("runs") or {}),
+            latest=dict(data.get("latest") or {}),
+        )
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        payload = {"version": RUN_CACHE_VERSION, "etags": self.etags, "runs": self.runs, "latest": self.latest}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f"{self.path.suffix}.tmp")
+        tmp_path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+def slim_run(workflow_run: dict[str, Any]) -> dict[str, str]:
+    return {
+        "id": str((workflow_run or {}).get("id") or "").strip(),
+        "head_sha": str((workflow_run or {}).get("head_sha") or "").strip(),
+        "conclusion": str((workflow_run or {}).get("conclusion") or "").strip(),
+    }
+
+
+def github_get_runs(api: GitHubApi, *, path: str, params: dict[str, Any], cache: RunCache | None = None) -> list[dict[str, str]]:
+    """List workflow runs, revalidating a cached page with If-None-Match (a 304 costs no rate limit)."""
+    key = f"{path}?{urlencode(sorted(params.items()))}"
+    cached = cache.etags.get(key) if cache is not None else None
+    headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else None
+    response = api.request("GET", path, params=params, headers=headers, allow_statuses=(304,))
+    if response.status == 304 and cached is not None:
+        return list(cached.get("runs") or [])
+
+    runs = [slim_run(workflow_run) for workflow_run in (response.json() or {}).get("workflow_runs") or []]
+    etag = response.headers.get("etag")
+    if cache is not None and etag:
+        cache.etags[key] = {"etag": etag, "runs": runs}
+    return runs
+
+
+def find_previous_successful_run_sha(
+    api: GitHubApi,
+    *,
+    owner: str,
+    repo: str,
+    workflow_file: str,
+    base_branch: str,
+    current_run_id: str,
+    cache: RunCache | None = None,
+    log: Callable[[str], None] = print,
+) -> str | None:
+    path = f"/repos/{owner}/{repo}/actions/workflows/{workflow_file}/runs"
+    cache_key = f"{owner}/{repo}/{workflow_file}@{base_branch}"
+
+    for page in range(1, MAX_RUN_PAGES + 1):
+        runs = github_get_runs(
+            api,
+            path=path,
+            params={
+                "branch": base_branch,
+                "status": "success",
+                "exclude_pull_requests": "true",
+                "per_page": RUN_PAGE_SIZE,
+                "page": page,
+            },
+            cache=cache,
+        )
+        for workflow_run in runs:
+            if workflow_run["id"] == current_run_id or workflow_run["conclusion"] != "success" or not workflow_run["head_sha"]:
+                continue
+            if cache is not None:
+                cache.runs[workflow_run["id"]] = workflow_run["head_sha"]
+                cache.latest[cache_key] = workflow_run["id"]
+            return workflow_run["head_sha"]
+        if len(runs) < RUN_PAGE_SIZE:
+            break
+
+    return confirm_cached_run_sha(
+        api,
+        path=path,
+        base_branch=base_branch,
+        current_run_id=current_run_id,
+        cache=cache,
+        cache_key=cache_key,
+        log=log,
+    )
+
+
+def confirm_cached_run_sha(
+    api: GitHubApi,
+    *,
+    path: str,
+    base_branch: str,
+    current_run_id: str,
+    cache: RunCache | None,
+    cache_key: str,
+    log: Callable[[str], None] = print,
+) -> str | None:
+    """Fall back to the last resolved SHA, but only while GitHub still lists a successful run for it."""
+    run_id = cache.latest.get(cache_key) if cache is not None else None
+    head_sha = cache.runs.get(run_id or "") if cache is not None else None
+    if not run_id or not head_sha or run_id == current_run_id:
+        return None
+
+    runs = github_get_runs(
+        api,
+        path=path,
+        params={"branch": base_branch, "head_sha": head_sha, "status": "success", "per_page": RUN_PAGE_SIZE},
+        cache=cache,
+    )
+    if any(workflow_run["id"] != current_run_id and workflow_run["conclusion"] == "success" for workflow_run in runs):
+        log(f"Using cached previous deploy {head_sha} (run {run_id}).")
+        return head_sha
+    return None
+
+
+@dataclass(slots=True, frozen=True)
+class FileChange:
+    status: str
+    filename: str
+    previous_filename: str = ""
+
+
+def removed_filenames(changes: list[FileChange]) -> list[str]:
+    """Deleted files plus the old side of every rename (a rename is delete-old + index-new)."""
+    removed: list[str] = []
+    for change in changes:
+        if change.status == "removed":
+            removed.append(change.filename)
+        elif change.status == "renamed" and change.previous_filename:
+            removed.append(change.previous_filename)
+    return removed
+
+
+def parse_name_status(output: str) -> list[FileChange]:
+    """Parse `git diff --name-status -z`: `M\0path\0`, or `R100\0old\0new\0` for renames and copies.
+
+    NUL-separated output leaves paths unquoted; without -z git C-quotes non-ASCII names.
+    """
+    fields = output.split("\0")
+    changes: list[FileChange] = []
+    index = 0
+    while index + 1 < len(fields):
+        code, index = fields[index].strip(), index + 1
+        if not code:
+            continue
+        status = GIT_STATUS_NAMES.get(code[0], "modified")
+        if status in {"renamed", "copied"} and index + 1 < len(fields):
+            changes.append(FileChange(status=status, filename=fields[index + 1], previous_filename=fields[index]))
+            index += 2
+        else:
+            changes.append(FileChange(status=status, filename=fields[index]))
+            index += 1
+    return changes
+
+
+def list_changes_from_git(*, base_sha: str, head_sha: str, cwd: str | None = None) -> list[FileChange] | None:
+    """Diff the local checkout like GitHub's compare (merge-base...head); None when either commit is missing."""
+    try:
+        completed = subprocess.run(
+            ["git", "diff", "--name-status", "-M", "-z", "--no-color", f"{base_sha}...{head_sha}"],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=120,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if completed.returncode != 0:
+        return None
+    return parse_name_status(completed.stdout)
+
+
+def file_change_from_api(file: dict[str, Any]) -> FileChange | None:
+    filename = str((file or {}).get("filename") or "").strip()
+    if not filename:
+        return None
+    return FileChange(
+        status=str((file or {}).get("status") or "modified").strip(),
+        filename=filename,
+        previous_filename=str((file or {}).get("previous_filename") or "").strip(),
+    )
+
+
+def list_changes_from_api(api: GitHubApi, *, owner: str, repo: str, base_sha: str, head_sha: str) -> list[FileChange]:
+    """Use compare's file list when it is complete, otherwise replay every commit in the range."""
+    compare_path = f"/repos/{owner}/{repo}/compare/{base_sha}...{head_sha}"
+    compare = api.get_json(compare_path)
+    files = (compare or {}).get("files") or []
+    if len(files) < COMPARE_FILE_LIMIT:
+        return [change for change in map(file_change_from_api, files) if change]
+
+    commit_shas = [
+        str(commit.get("sha"))
+        for commit in api.paginate(compare_path, {"per_page": GITHUB_PAGE_SIZE}, key="commits")
+        if (commit or {}).get("sha")
+    ]
+
+    # Apply commits oldest first so the last change to each path wins.
+    latest: dict[str, FileChange] = {}
+    for sha in commit_shas:
+        commit_files = api.paginate(f"/repos/{owner}/{repo}/commits/{sha}", {"per_page": GITHUB_PAGE_SIZE}, key="files")
+        for change in map(file_change_from_api, commit_files):
+            if change is None:
+                continue
+            if change.previous_filename:
+                # Split renames so a later commit touching either path still resolves cleanly.
+                latest[change.previous_filename] = FileChange(status="removed", filename=change.previous_filename)
+                change = FileChange(status="added", filename=change.filename)
+            latest[change.filename] = change
+    return list(latest.values())
+
+
+def list_changes(
+    api: GitHubApi,
+    *,
+    source: str,
+    owner: str,
+    repo: str,
+    base_sha: str,
+    head_sha: str,
+    log: Callable[[str], None] = print,
+) -> list[FileChange]:
+    if source not in CHANGE_SOURCES:
+        raise ValueError(f"change_source must be one of: {', '.join(CHANGE_SOURCES)}")
+    if source != "api":
+        changes = list_changes_from_git(base_sha=base_sha, head_sha=head_sha, cwd=os.environ.get("GITHUB_WORKSPACE") or None)
+        if changes is not None:
+            log(f"Read {len(changes)} changed files from git diff {base_sha}...{head_sha}.")
+            return changes
+        if source == "git":
+            raise ValueError(f"git diff {base_sha}...{head_sha} failed; is the checkout deep enough (fetch-depth: 0)?")
+    return list_changes_from_api(api, owner=owner, repo=repo, base_sha=base_sha, head_sha=head_sha)
+
+
+def write_deploy_diff(path: Path, *, base_sha: str | None, head_sha: str, changes: list[FileChange]) -> None:
+    payload = {
+        "base_sha": base_sha,
+        "head_sha": head_sha,
+        "changes": [asdict(change) for change in changes],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+def read_deploy_diff(path: Path) -> tuple[str | None, list[FileChange]]:
+    """Load the base SHA and change list written by `write_deploy_diff`."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} is not a deploy diff file")
+    changes = [
+        FileChange(
+            status=str(item.get("status") or "modified"),
+            filename=str(item.get("filename") or ""),
+            previous_filename=str(item.get("previous_filename") or ""),
+        )
+        for item in data.get("changes") or []
+        if isinstance(item, dict) and item.get("filename")
+    ]
+    return (str(data.get("base_sha") or "") or None), changes
@@ -0,0 +1,353 @@
+"""
+Pooled, rate-limit-aware GitHub REST client shared by the composite actions in .github/actions.
+
+Standard library only: the deploy workflows run these actions without installing requirements.txt.
+Actions put this directory on sys.path themselves, since a composite action only sees its own src/.
+
+- One keep-alive connection per host and thread instead of a new TLS handshake per call.
+- Transparent `Link: rel="next"` pagination.
+- In-memory ETag cache for GETs; a 304 revalidation does not count against the rate limit.
+- Primary and secondary rate limits are retried after `Retry-After` / `X-RateLimit-Reset`
+  (up to MAX_RATE_LIMIT_WAIT_SECONDS). 5xx responses and connection errors are retried with exponential
+  backoff for idempotent methods only; a POST or PATCH is only re-sent when it never left this process,
+  so a comment or deployment is never created twice.
+- HTTPS_PROXY / HTTP_PROXY / NO_PROXY are honoured, as urllib does.
+- Every call is timed; `metrics_summary()` gives a one-line report for the job log.
+"""
+
+from __future__ import annotations
+
+import base64
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field, replace
+from typing import Any, Final, Protocol
+from urllib.parse import unquote, urlencode, urlsplit
+
+DEFAULT_API_URL: Final[str] = "https://api.github.com"
+API_VERSION: Final[str] = "2022-11-28"
+DEFAULT_USER_AGENT: Final[str] = "webstackbuilders-actions"
+DEFAULT_TIMEOUT: Final[float] = 30
+MAX_RETRIES: Final[int] = 3
+BACKOFF_SECONDS: Final[float] = 1.0
+# Waiting longer than this for a rate-limit window is worse than failing the step.
+MAX_RATE_LIMIT_WAIT_SECONDS: Final[float] = 60.0
+RETRY_STATUSES: Final[frozenset[int]] = frozenset({500, 502, 503, 504})
+# Safe to send twice. POST/PATCH may already have been applied when the response is lost.
+IDEMPOTENT_METHODS: Final[frozenset[str]] = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+LINK_NEXT_RE: Final[re.Pattern[str]] = re.compile(r'<([^>]+)>\s*;\s*rel="next"')
+
+
+class RequestNotSentError(OSError):
+    """The request failed before it was written to the connection, so GitHub cannot have applied it."""
+
+
+class GitHubApiError(RuntimeError):
+    def __init__(self, message: str, *, status: int | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(slots=True, frozen=True)
+class RawResponse:
+    status: int
+    # Header names are lower-cased.
+    headers: dict[str, str]
+    body: bytes
+
+
+@dataclass(slots=True, frozen=True)
+class GitHubResponse:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    url: str
+    from_cache: bool = False
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+    @property
+    def next_url(self) -> str | None:
+        match = LINK_NEXT_RE.search(self.headers.get("link", ""))
+        return match.group(1) if match else None
+
+
+@dataclass(slots=True, frozen=True)
+class CallMetric:
+    method: str
+    path: str
+    status: int
+    elapsed_ms: float
+    attempts: int
+    from_cache: bool
+    rate_limit_remaining: int | None
+
+
+class Transport(Protocol):
+    def send(self, method: str, url: str, *, headers: dict[str, str], body: bytes | None, timeout: float) -> RawResponse: ...
+
+
+@dataclass(slots=True, frozen=True)
+class PooledConnection:
+    connection: http.client.HTTPConnection
+    # Plain-HTTP proxies are sent the absolute URL and the proxy credentials on every request.
+    via_http_proxy: bool = False
+    proxy_headers: dict[str, str] = field(default_factory=dict)
+
+
+def open_connection(scheme: str, netloc: str, timeout: float) -> PooledConnection:
+    """Connect to `scheme://netloc`, through HTTPS_PROXY / HTTP_PROXY unless NO_PROXY exempts the host."""
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(netloc.split(":", 1)[0]):
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return PooledConnection(connection_class(netloc, timeout=timeout))
+
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    proxy_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    connection = proxy_class(parts.hostname or "", parts.port, timeout=timeout)
+    headers: dict[str, str] = {}
+    if parts.username:
+        credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}".encode("utf-8")
+        headers["Proxy-Authorization"] = f"Basic {base64.b64encode(credentials).decode('ascii')}"
+    if scheme == "https":
+        connection.set_tunnel(netloc, headers=headers)
+        return PooledConnection(connection)
+    return PooledConnection(connection, via_http_proxy=True, proxy_headers=headers)
+
+
+class PooledTransport:
+    """Keeps one keep-alive connection per (scheme, host) and thread."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def _pool(self) -> dict[tuple[str, str], PooledConnection]:
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            pool = self._local.pool = {}
+        return pool
+
+    def send(self, method: str, url: str, *, headers: dict[str, str], body: bytes | None, timeout: float) -> RawResponse:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        pool = self._pool()
+
+        while True:
+            reused = key in pool
+            if not reused:
+                pool[key] = open_connection(parts.scheme, parts.netloc, timeout)
+            pooled = pool[key]
+            target = url if pooled.via_http_proxy else f"{parts.path or '/'}{f'?{parts.query}' if parts.query else ''}"
+            try:
+                pooled.connection.request(method, target, body=body, headers={**headers, **pooled.proxy_headers})
+            except (http.client.HTTPException, OSError) as exc:
+                self._drop(key)
+                # A dropped idle keep-alive connection fails here, before anything reached the server.
+                if reused:
+                    continue
+                raise RequestNotSentError(str(exc)) from exc
+            try:
+                response = pooled.connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                self._drop(key)
+                # The request went out, so it is only replayed when sending it twice is harmless.
+                if reused and method in IDEMPOTENT_METHODS:
+                    continue
+                raise
+            if response.will_close:
+                self._drop(key)
+            return RawResponse(response.status, {name.lower(): value for name, value in response.getheaders()}, data)
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        pooled = self._pool().pop(key, None)
+        if pooled is not None:
+            pooled.connection.close()
+
+    def close(self) -> None:
+        pool = self._pool()
+        for pooled in pool.values():
+            pooled.connection.close()
+        pool.clear()
+
+
+@dataclass(slots=True)
+class GitHubApi:  # pylint: disable=too-many-instance-attributes
+    token: str
+    base_url: str = ""
+    user_agent: str = DEFAULT_USER_AGENT
+    timeout: float = DEFAULT_TIMEOUT
+    max_retries: int = MAX_RETRIES
+    transport: Transport = field(default_factory=PooledTransport)
+    sleep: Callable[[float], None] = time.sleep
+    metrics: list[CallMetric] = field(default_factory=list)
+    _etags: dict[str, tuple[str, GitHubResponse]] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self.base_url = (self.base_url or os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL).rstrip("/")
+
+    def url_for(self, path: str, params: dict[str, Any] | None = None) -> str:
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+        if params:
+            query = urlencode({name: value for name, value in params.items() if value is not None}, doseq=True)
+            url = f"{url}{'&' if '?' in url else '?'}{query}"
+        return url
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        body: Any = None,
+        headers: dict[str, str] | None = None,
+        allow_statuses: tuple[int, ...] = (),
+    ) -> GitHubResponse:
+        method = method.upper()
+        url = self.url_for(path, params)
+        request_headers = {
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {self.token}",
+            "X-GitHub-Api-Version": API_VERSION,
+            "User-Agent": self.user_agent,
+            **(headers or {}),
+        }
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            request_headers["Content-Type"] = "application/json"
+
+        # Callers that manage their own ETags (and handle the 304) bypass the in-memory cache.
+        cached = None
+        if method == "GET" and "If-None-Match" not in request_headers:
+            with self._lock:
+                cached = self._etags.get(url)
+            if cached is not None:
+                request_headers["If-None-Match"] = cached[0]
+
+        started = time.perf_counter()
+        raw, attempts = self._send_with_retries(method, url, request_headers, data)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        response = GitHubResponse(status=raw.status, headers=raw.headers, body=raw.body, url=url)
+        if raw.status == 304 and cached is not None:
+            response = replace(cached[1], from_cache=True)
+        elif method == "GET" and 200 <= raw.status < 300 and raw.headers.get("etag"):
+            with self._lock:
+                self._etags[url] = (raw.headers["etag"], response)
+
+        remaining = raw.headers.get("x-ratelimit-remaining", "")
+        metric = CallMetric(
+            method=method,
+            path=urlsplit(url).path,
+            status=raw.status,
+            elapsed_ms=elapsed_ms,
+            attempts=attempts,
+            from_cache=response.from_cache,
+            rate_limit_remaining=int(remaining) if remaining.isdigit() else None,
+        )
+        with self._lock:
+            self.metrics.append(metric)
+
+        if not 200 <= response.status < 300 and response.status not in allow_statuses:
+            raise GitHubApiError(f"GitHub API {method} {url} failed ({response.status}): {response.text}", status=response.status)
+        return response
+
+    def _send_with_retries(self, method: str, url: str, headers: dict[str, str], data: bytes | None) -> tuple[RawResponse, int]:
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                raw = self.transport.send(method, url, headers=headers, body=data, timeout=self.timeout)
+            except (http.client.HTTPException, OSError) as exc:
+                # A POST/PATCH that may have reached GitHub is not sent again.
+                retryable = method in IDEMPOTENT_METHODS or isinstance(exc, RequestNotSentError)
+                if not retryable or attempts > self.max_retries:
+                    raise GitHubApiError(f"GitHub API {method} {url} failed: {exc}") from exc
+                self.sleep(BACKOFF_SECONDS * 2 ** (attempts - 1))
+                continue
+
+            delay = self.retry_delay(raw, attempts, method)
+            if delay is None:
+                return raw, attempts
+            self.sleep(delay)
+
+    def retry_delay(self, raw: RawResponse, attempts: int, method: str = "GET") -> float | None:
+        """Seconds to wait before retrying `raw`, or None when it should be returned as is.
+
+        Rate-limited requests were rejected unprocessed and are retried for every method; a 5xx may
+        follow a write that was applied, so it is only retried for idempotent methods.
+        """
+        if attempts > self.max_retries:
+            return None
+        if raw.status in RETRY_STATUSES:
+            return BACKOFF_SECONDS * 2 ** (attempts - 1) if method in IDEMPOTENT_METHODS else None
+        if raw.status not in (403, 429):
+            return None
+
+        retry_after = raw.headers.get("retry-after", "")
+        reset = raw.headers.get("x-ratelimit-reset", "")
+        if retry_after.isdigit():
+            delay = float(retry_after)
+        elif raw.headers.get("x-ratelimit-remaining") == "0" and reset.isdigit():
+            delay = max(int(reset) - time.time(), 0) + 1
+        elif raw.status == 429 or b"secondary rate limit" in raw.body.lower():
+            delay = BACKOFF_SECONDS * 2**attempts
+        else:
+            # A plain 403 is a permission error; retrying will not help.
+            return None
+        return delay if delay <= MAX_RATE_LIMIT_WAIT_SECONDS else None
+
+    def get_json(self, path: str, params: dict[str, Any] | None = None) -> Any:
+        return self.request("GET", path, params=params).json()
+
+    def paginate(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        *,
+        key: str | None = None,
+        max_pages: int | None = None,
+    ) -> Iterator[Any]:
+        """Yield items from every page, following Link headers; `key` picks the list out of object responses."""
+        url: str | None = self.url_for(path, params)
+        pages = 0
+        while url:
+            response = self.request("GET", url)
+            data = response.json()
+            items = (data or {}).get(key) if key else data
+            yield from items or []
+            pages += 1
+            if max_pages is not None and pages >= max_pages:
+                return
+            url = response.next_url
+
+    def metrics_summary(self) -> str:
+        with self._lock:
+            metrics = list(self.metrics)
+        if not metrics:
+            return "GitHub API: no calls."
+        total_ms = sum(metric.elapsed_ms for metric in metrics)
+        cached = sum(metric.from_cache for metric in metrics)
+        retries = sum(metric.attempts - 1 for metric in metrics)
+        slowest = max(metrics, key=lambda metric: metric.elapsed_ms)
+        remaining = [metric.rate_limit_remaining for metric in metrics if metric.rate_limit_remaining is not None]
+        summary = (
+            f"GitHub API: {len(metrics)} calls in {total_ms:.0f} ms ({cached} revalidated from cache, {retries} retries); "
+            f"slowest {slowest.method} {slowest.path} {slowest.elapsed_ms:.0f} ms"
+        )
+        if remaining:
+            summary += f"; rate limit remaining {remaining[-1]}"
+        return f"{summary}."
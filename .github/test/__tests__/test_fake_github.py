@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+TEST_ROOT = Path(__file__).resolve().parents[1]
+ACTIONS_ROOT = TEST_ROOT.parent / "actions"
+sys.path.insert(0, str(TEST_ROOT))
+
+from fake_github import FakeGitHub, FakeGitHubServer, FakeGitHubState  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def load_source(relative: str, name: str) -> ModuleType:
+  module_path = ACTIONS_ROOT / relative
+  sys.path.insert(0, str(module_path.parent))
+  spec = importlib.util.spec_from_file_location(name, module_path)
+  assert spec and spec.loader
+  module = importlib.util.module_from_spec(spec)
+  sys.modules[spec.name] = module
+  spec.loader.exec_module(module)
+  return module
+
+
+def workflow_run(run_id: int, head_sha: str, conclusion: str, branch: str = "main") -> dict[str, object]:
+  return {"id": run_id, "head_sha": head_sha, "head_branch": branch, "status": "completed", "conclusion": conclusion}
+
+
+@pytest.fixture
+def github(monkeypatch: pytest.MonkeyPatch):
+  fake = FakeGitHub(FakeGitHubState())
+  with FakeGitHubServer(fake) as server:
+    monkeypatch.setenv("GITHUB_API_URL", server.url)
+    monkeypatch.setenv("GITHUB_REPOSITORY", "webstackdev/site")
+    yield fake
+
+
+def test_search_scope_action_runs_end_to_end(github: FakeGitHub, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+  # The last successful deploy sits behind a page of failures.
+  github.state.workflow_runs["deployment-production.yml"] = (
+    [workflow_run(999, "newsha", "success")]
+    + [workflow_run(900 - n, f"bad{n}", "failure") for n in range(150)]
+    + [workflow_run(10, "oldsha", "success")]
+  )
+  github.state.compares["oldsha...newsha"] = {"files": [{"filename": "src/content/services/web/index.md", "status": "modified"}]}
+
+  module = load_source("determine-search-index-scope/src/main.py", "e2e_determine_search_index_scope")
+  monkeypatch.setenv("GITHUB_WORKSPACE", str(tmp_path))
+  monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+  for name, value in {"TOKEN": "t", "CURRENT_RUN_ID": "999", "HEAD_SHA": "newsha", "CHANGE_SOURCE": "api"}.items():
+    monkeypatch.setenv(f"INPUT_{name}", value)
+  outputs: dict[str, str] = {}
+  monkeypatch.setattr(module.core, "set_output", lambda k, v: outputs.__setitem__(k, v))
+  monkeypatch.setattr(module.core, "set_failed", lambda m: (_ for _ in ()).throw(AssertionError(m)))
+
+  module.run()
+
+  assert outputs["base_sha"] == "oldsha"
+  assert outputs["page_paths"] == '["/services/web"]'
+  assert outputs["crawl_services"] == "true"
+  assert [request.path.rsplit("/", 1)[-1] for request in github.requests] == ["runs", "oldsha...newsha"]
+  assert github.requests[0].query["status"] == "success"
+
+
+def test_require_playwright_success_runs_end_to_end(github: FakeGitHub, monkeypatch: pytest.MonkeyPatch) -> None:
+  github.state.workflow_runs["playwright.yml"] = [workflow_run(5, "abc", "success")]
+  module = load_source("require-playwright-success/src/main.py", "e2e_require_playwright_success")
+  monkeypatch.setenv("INPUT_GITHUB_TOKEN", "t")
+  monkeypatch.setenv("INPUT_EXPECTED_SHA", "abc")
+
+  module.run()
+
+  monkeypatch.setenv("INPUT_EXPECTED_SHA", "missing")
+  with pytest.raises(SystemExit):
+    module.run()
+
+  # Each check is one request filtered by SHA on the server.
+  assert [request.query["head_sha"] for request in github.requests] == ["abc", "missing"]
+
+
+def test_deploy_github_client_round_trips_against_fake(github: FakeGitHub) -> None:
+  github.state.comments[7] = [{"id": n, "body": f"comment {n}"} for n in range(1, 131)]
+  github.state.comments[7].append({"id": 500, "body": "This pull request has been deployed to Vercel."})
+  github.state.commits["main"] = {"commit": {"author": {"name": "Ada"}, "message": "Ship it"}, "author": {"login": "ada"}}
+
+  github_client = load_source("deploy-to-vercel-action/src/github_client.py", "e2e_deploy_github_client")
+  ctx = SimpleNamespace(
+    user="webstackdev",
+    repository="site",
+    pr_number=7,
+    github_token="gh",
+    production=False,
+    github_deployment_env=None,
+    ref="main",
+    log_url="https://example.com/logs",
+  )
+  client = github_client.GitHubClient(ctx)
+
+  deployment = client.create_deployment()
+  client.update_deployment("success", "https://preview.example.com")
+  assert client.delete_existing_comment() == 500
+  comment = client.create_comment("This pull request has been deployed to Vercel.")
+  labels = client.add_labels(["deployed"])
+
+  assert github.state.deployment_statuses[deployment["id"]][0]["state"] == "success"
+  assert comment["html_url"].endswith(f"#issuecomment-{comment['id']}")
+  assert [label["name"] for label in labels] == ["deployed"]
+  assert client.get_commit() == {"authorName": "Ada", "authorLogin": "ada", "commitMessage": "Ship it"}
+  # The 131-comment listing took two pages.
+  assert sum(request.path.endswith("/issues/7/comments") and request.query.get("page") == "2" for request in github.requests) == 1
+
+
+def test_fake_applies_rate_limits_etags_and_latency(monkeypatch: pytest.MonkeyPatch) -> None:
+  shared = load_source("shared/github_api.py", "github_api")
+  fake = FakeGitHub(FakeGitHubState(workflow_runs={"ci.yml": [workflow_run(1, "a", "success")]}), latency=0.05, rate_limit=2)
+
+  with FakeGitHubServer(fake) as server:
+    monkeypatch.setenv("GITHUB_API_URL", server.url)
+    api = shared.GitHubApi("t")
+    first = api.get_json("/repos/o/r/actions/workflows/ci.yml/runs")
+    # The 304 revalidation is free, so the second distinct request still fits the budget of two.
+    second = api.get_json("/repos/o/r/actions/workflows/ci.yml/runs")
+    api.get_json("/repos/o/r/actions/workflows/other.yml/runs")
+    with pytest.raises(shared.GitHubApiError, match=r"\(403\)"):
+      api.get_json("/repos/o/r/actions/workflows/other.yml/runs")
+
+  assert first == second
+  assert [metric.status for metric in api.metrics] == [200, 304, 200, 403]
+  assert [metric.rate_limit_remaining for metric in api.metrics] == [1, 1, 0, 0]
+  assert all(metric.elapsed_ms >= 50 for metric in api.metrics)
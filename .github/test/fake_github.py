@@ -0,0 +1,349 @@
+"""
+Offline stand-in for the GitHub REST endpoints our composite actions call.
+
+Point an action at it with `GITHUB_API_URL` to run its full `run()` entry point without network
+access or a token, e.g. for end-to-end tests or timing the actions under controlled latency:
+
+  python3 .github/test/fake_github.py --port 8765 --state state.json --latency-ms 80
+  GITHUB_API_URL=http://127.0.0.1:8765 GITHUB_REPOSITORY=o/r INPUT_... python3 .github/actions/<action>/src/main.py
+
+Implements workflow runs, compare, commits, deployments and their statuses, issue comments and
+labels. List endpoints paginate with `per_page`/`page` and `Link` headers, GET responses carry
+ETags (a matching If-None-Match gets a 304 that does not use rate limit), every response carries
+`X-RateLimit-*` headers, and a spent budget answers 403 like GitHub's primary rate limit.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Final
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DEFAULT_PER_PAGE: Final[int] = 30
+MAX_PER_PAGE: Final[int] = 100
+# Like GitHub, compare lists at most this many files.
+COMPARE_FILE_LIMIT: Final[int] = 300
+DEFAULT_RATE_LIMIT: Final[int] = 5000
+RATE_LIMIT_WINDOW_SECONDS: Final[int] = 3600
+
+REPO: Final[str] = r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)"
+
+
+@dataclass
+class FakeGitHubState:  # pylint: disable=too-many-instance-attributes
+  # Workflow file name -> runs, newest first (GitHub's order).
+  workflow_runs: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+  # "base...head" -> {"files": [...], "commits": [...]}.
+  compares: dict[str, dict[str, Any]] = field(default_factory=dict)
+  # SHA -> commit payload; its "files" list is paginated.
+  commits: dict[str, dict[str, Any]] = field(default_factory=dict)
+  deployments: list[dict[str, Any]] = field(default_factory=list)
+  deployment_statuses: dict[int, list[dict[str, Any]]] = field(default_factory=dict)
+  # Issue / PR number -> comments and labels.
+  comments: dict[int, list[dict[str, Any]]] = field(default_factory=dict)
+  labels: dict[int, list[dict[str, Any]]] = field(default_factory=dict)
+  next_id: int = 1000
+
+  @classmethod
+  def from_json(cls, data: dict[str, Any]) -> FakeGitHubState:
+    return cls(
+      workflow_runs=dict(data.get("workflow_runs") or {}),
+      compares=dict(data.get("compares") or {}),
+      commits=dict(data.get("commits") or {}),
+      comments={int(number): list(items) for number, items in (data.get("comments") or {}).items()},
+      labels={int(number): list(items) for number, items in (data.get("labels") or {}).items()},
+    )
+
+  def allocate_id(self) -> int:
+    self.next_id += 1
+    return self.next_id
+
+
+@dataclass(frozen=True)
+class RecordedRequest:
+  method: str
+  path: str
+  query: dict[str, str]
+  status: int
+
+
+@dataclass(frozen=True)
+class RouteRequest:
+  params: dict[str, str]
+  query: dict[str, str]
+  body: Any
+  # Absolute URL of the requested path, for building Link headers.
+  link_base: str
+
+
+@dataclass
+class FakeResult:
+  status: int
+  payload: Any = None
+  headers: dict[str, str] = field(default_factory=dict)
+
+
+def run_matches(workflow_run: dict[str, Any], query: dict[str, str]) -> bool:
+  for name in ("branch", "event", "head_sha", "actor"):
+    expected = query.get(name)
+    if not expected:
+      continue
+    key = "head_branch" if name == "branch" else name
+    actual = workflow_run.get(key)
+    if name == "actor":
+      actual = (workflow_run.get("actor") or {}).get("login")
+    if actual != expected:
+      return False
+
+  status = query.get("status")
+  if status in {"queued", "in_progress", "completed", "waiting", "requested", "pending"}:
+    return workflow_run.get("status") == status
+  if status:
+    # Any other status filter is a conclusion (success, failure, cancelled, ...).
+    return workflow_run.get("conclusion") == status
+  return True
+
+
+class FakeGitHub:  # pylint: disable=too-many-instance-attributes
+  """The request router and state; `FakeGitHubServer` exposes it over HTTP."""
+
+  def __init__(
+    self,
+    state: FakeGitHubState | None = None,
+    *,
+    latency: float = 0.0,
+    rate_limit: int = DEFAULT_RATE_LIMIT,
+  ) -> None:
+    self.state = state or FakeGitHubState()
+    self.latency = latency
+    self.rate_limit = rate_limit
+    self.rate_limit_remaining = rate_limit
+    self.rate_limit_reset = int(time.time()) + RATE_LIMIT_WINDOW_SECONDS
+    self.requests: list[RecordedRequest] = []
+    self._lock = threading.Lock()
+    self._routes = [
+      ("GET", re.compile(rf"{REPO}/actions/workflows/(?P<workflow>[^/]+)/runs"), self.list_workflow_runs),
+      ("GET", re.compile(rf"{REPO}/compare/(?P<base>[^/]+)\.\.\.(?P<head>[^/]+)"), self.compare),
+      ("GET", re.compile(rf"{REPO}/commits/(?P<ref>[^/]+)"), self.get_commit),
+      ("POST", re.compile(rf"{REPO}/deployments"), self.create_deployment),
+      ("POST", re.compile(rf"{REPO}/deployments/(?P<deployment_id>\d+)/statuses"), self.create_deployment_status),
+      ("GET", re.compile(rf"{REPO}/issues/(?P<number>\d+)/comments"), self.list_comments),
+      ("POST", re.compile(rf"{REPO}/issues/(?P<number>\d+)/comments"), self.create_comment),
+      ("DELETE", re.compile(rf"{REPO}/issues/comments/(?P<comment_id>\d+)"), self.delete_comment),
+      ("POST", re.compile(rf"{REPO}/issues/(?P<number>\d+)/labels"), self.add_labels),
+    ]
+
+  def rate_limit_headers(self) -> dict[str, str]:
+    return {
+      "X-RateLimit-Limit": str(self.rate_limit),
+      "X-RateLimit-Remaining": str(self.rate_limit_remaining),
+      "X-RateLimit-Reset": str(self.rate_limit_reset),
+      "X-RateLimit-Used": str(self.rate_limit - self.rate_limit_remaining),
+    }
+
+  def handle(self, method: str, target: str, *, headers: dict[str, str], body: Any, base_url: str) -> FakeResult:
+    if self.latency:
+      time.sleep(self.latency)
+
+    parts = urlsplit(target)
+    query = dict(parse_qsl(parts.query))
+    with self._lock:
+      if self.rate_limit_remaining <= 0:
+        result = FakeResult(403, {"message": "API rate limit exceeded for installation."})
+      else:
+        result = self._dispatch(method, parts.path, query, body=body, base_url=base_url)
+        if result.status < 400 and method == "GET":
+          etag = f'"{hashlib.sha1(json.dumps(result.payload, sort_keys=True).encode("utf-8")).hexdigest()}"'
+          result.headers["ETag"] = etag
+          if headers.get("if-none-match") == etag:
+            result = FakeResult(304, None, {"ETag": etag})
+        # Like GitHub, a 304 revalidation is free.
+        if result.status != 304:
+          self.rate_limit_remaining -= 1
+      result.headers.update(self.rate_limit_headers())
+      self.requests.append(RecordedRequest(method, parts.path, query, result.status))
+    return result
+
+  def _dispatch(self, method: str, path: str, query: dict[str, str], *, body: Any, base_url: str) -> FakeResult:
+    for route_method, pattern, handler in self._routes:
+      match = pattern.fullmatch(path)
+      if match and route_method == method:
+        return handler(RouteRequest(match.groupdict(), query, body, f"{base_url}{path}"))
+    return FakeResult(404, {"message": "Not Found"})
+
+  @staticmethod
+  def paginate(items: list[Any], query: dict[str, str], link_base: str) -> tuple[list[Any], dict[str, str]]:
+    per_page = min(max(int(query.get("per_page") or DEFAULT_PER_PAGE), 1), MAX_PER_PAGE)
+    page = max(int(query.get("page") or 1), 1)
+    last_page = max((len(items) + per_page - 1) // per_page, 1)
+    links = []
+    if page < last_page:
+      links.append(f'<{link_base}?{urlencode({**query, "page": page + 1})}>; rel="next"')
+      links.append(f'<{link_base}?{urlencode({**query, "page": last_page})}>; rel="last"')
+    return items[(page - 1) * per_page : page * per_page], ({"Link": ", ".join(links)} if links else {})
+
+  def list_workflow_runs(self, request: RouteRequest) -> FakeResult:
+    runs = [run for run in self.state.workflow_runs.get(request.params["workflow"], []) if run_matches(run, request.query)]
+    page, headers = self.paginate(runs, request.query, request.link_base)
+    return FakeResult(200, {"total_count": len(runs), "workflow_runs": page}, headers)
+
+  def compare(self, request: RouteRequest) -> FakeResult:
+    comparison = self.state.compares.get(f"{request.params['base']}...{request.params['head']}")
+    if comparison is None:
+      return FakeResult(404, {"message": "Not Found"})
+    commits, headers = self.paginate(list(comparison.get("commits") or []), request.query, request.link_base)
+    files = list(comparison.get("files") or [])[:COMPARE_FILE_LIMIT]
+    return FakeResult(200, {"status": "ahead", "commits": commits, "files": files}, headers)
+
+  def get_commit(self, request: RouteRequest) -> FakeResult:
+    commit = self.state.commits.get(request.params["ref"])
+    if commit is None:
+      return FakeResult(422, {"message": f"No commit found for SHA: {request.params['ref']}"})
+    files, headers = self.paginate(list(commit.get("files") or []), request.query, request.link_base)
+    return FakeResult(200, {**commit, "sha": commit.get("sha") or request.params["ref"], "files": files}, headers)
+
+  def create_deployment(self, request: RouteRequest) -> FakeResult:
+    deployment = {"id": self.state.allocate_id(), **(request.body or {})}
+    self.state.deployments.append(deployment)
+    return FakeResult(201, deployment)
+
+  def create_deployment_status(self, request: RouteRequest) -> FakeResult:
+    deployment_id = int(request.params["deployment_id"])
+    if not any(deployment["id"] == deployment_id for deployment in self.state.deployments):
+      return FakeResult(404, {"message": "Not Found"})
+    status = {"id": self.state.allocate_id(), **(request.body or {})}
+    self.state.deployment_statuses.setdefault(deployment_id, []).append(status)
+    return FakeResult(201, status)
+
+  def list_comments(self, request: RouteRequest) -> FakeResult:
+    page, headers = self.paginate(self.state.comments.get(int(request.params["number"]), []), request.query, request.link_base)
+    return FakeResult(200, page, headers)
+
+  def create_comment(self, request: RouteRequest) -> FakeResult:
+    comment_id = self.state.allocate_id()
+    owner, repo, number = request.params["owner"], request.params["repo"], request.params["number"]
+    comment = {
+      "id": comment_id,
+      "body": str((request.body or {}).get("body") or ""),
+      "html_url": f"https://github.com/{owner}/{repo}/pull/{number}#issuecomment-{comment_id}",
+    }
+    self.state.comments.setdefault(int(number), []).append(comment)
+    return FakeResult(201, comment)
+
+  def delete_comment(self, request: RouteRequest) -> FakeResult:
+    comment_id = int(request.params["comment_id"])
+    for comments in self.state.comments.values():
+      for comment in comments:
+        if comment["id"] == comment_id:
+          comments.remove(comment)
+          return FakeResult(204)
+    return FakeResult(404, {"message": "Not Found"})
+
+  def add_labels(self, request: RouteRequest) -> FakeResult:
+    labels = self.state.labels.setdefault(int(request.params["number"]), [])
+    for name in (request.body or {}).get("labels") or []:
+      if not any(label["name"] == name for label in labels):
+        labels.append({"id": self.state.allocate_id(), "name": name})
+    return FakeResult(200, labels)
+
+
+def make_handler(fake: FakeGitHub) -> type[BaseHTTPRequestHandler]:
+  class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive, so clients' connection pooling is exercised too.
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self) -> None:
+      length = int(self.headers.get("Content-Length") or 0)
+      raw = self.rfile.read(length) if length else b""
+      try:
+        body = json.loads(raw) if raw else None
+      except ValueError:
+        body = None
+
+      host, port = self.server.server_address[:2]
+      headers = {name.lower(): value for name, value in self.headers.items()}
+      result = fake.handle(self.command, self.path, headers=headers, body=body, base_url=f"http://{host}:{port}")
+
+      content = b"" if result.payload is None or result.status in (204, 304) else json.dumps(result.payload).encode("utf-8")
+      self.send_response(result.status)
+      for name, value in result.headers.items():
+        self.send_header(name, value)
+      if content:
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+      self.send_header("Content-Length", str(len(content)))
+      self.end_headers()
+      self.wfile.write(content)
+
+    do_GET = do_POST = do_DELETE = do_PATCH = _respond  # noqa: N815 - http.server naming
+
+    def log_message(self, *_args: Any) -> None:
+      pass
+
+  return Handler
+
+
+class FakeGitHubServer:
+  """Serve a `FakeGitHub` on localhost in a background thread; use as a context manager."""
+
+  def __init__(self, fake: FakeGitHub | None = None, *, host: str = "127.0.0.1", port: int = 0) -> None:
+    self.fake = fake or FakeGitHub()
+    self._server = ThreadingHTTPServer((host, port), make_handler(self.fake))
+    self._server.daemon_threads = True
+    self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+  @property
+  def url(self) -> str:
+    host, port = self._server.server_address[:2]
+    return f"http://{host}:{port}"
+
+  def start(self) -> FakeGitHubServer:
+    self._thread.start()
+    return self
+
+  def wait(self) -> None:
+    self._thread.join()
+
+  def stop(self) -> None:
+    self._server.shutdown()
+    self._server.server_close()
+
+  def __enter__(self) -> FakeGitHubServer:
+    return self.start()
+
+  def __exit__(self, *_exc: object) -> None:
+    self.stop()
+
+
+def main(argv: list[str]) -> int:
+  parser = argparse.ArgumentParser(description="Serve a fake GitHub REST API for offline action runs.")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8765)
+  parser.add_argument("--state", type=Path, default=None, help="JSON file with workflow_runs, compares, commits, comments and labels.")
+  parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response.")
+  parser.add_argument("--rate-limit", type=int, default=DEFAULT_RATE_LIMIT, help="Requests allowed before answering 403.")
+  args = parser.parse_args(argv[1:])
+
+  state = FakeGitHubState.from_json(json.loads(args.state.read_text(encoding="utf-8"))) if args.state else FakeGitHubState()
+  fake = FakeGitHub(state, latency=args.latency_ms / 1000, rate_limit=args.rate_limit)
+  server = FakeGitHubServer(fake, host=args.host, port=args.port)
+  print(f"Fake GitHub API listening on {server.url} (GITHUB_API_URL={server.url})", flush=True)
+  try:
+    server.start().wait()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.stop()
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main(sys.argv))
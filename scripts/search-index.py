@@ -12,26 +12,53 @@ Usage:
   python3 scripts/search-index.py --no-drop        # upsert only (incremental)
   python3 scripts/search-index.py --dry-run        # preview without writing
   python3 scripts/search-index.py --collection articles  # single collection
+  python3 scripts/search-index.py --files src/content/articles/foo/index.mdx  # just these pages (implies --no-drop)
+  python3 scripts/search-index.py --budget 5000    # stop + checkpoint at 5 000 docs/day (exit status 3)
+  python3 scripts/search-index.py --resume         # continue from the last checkpoint
+  python3 scripts/search-index.py --target staging --target default --target default@EU  # fan-out
+  python3 scripts/search-index.py --warmup-queries queries.txt  # warm + smoke-test after indexing
+  UPSTASH_CASSETTE_RECORD=run.jsonl python3 scripts/search-index.py  # record Upstash traffic (see upstash_cassette.py)
 """
 from __future__ import annotations
 
 import argparse
+import json
 import os
 import re
 import sys
-from dataclasses import dataclass
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Final
+from typing import Final, TypeVar
 
 import yaml
 from dotenv import load_dotenv
 from upstash_search import Search
+from upstash_search.errors import UpstashError
+
+try:
+  from scripts.search_stats import percentile
+  from scripts.upstash_cassette import cassette_from_env, create_client
+except ModuleNotFoundError:  # run as `python3 scripts/search-index.py`
+  from search_stats import percentile
+  from upstash_cassette import cassette_from_env, create_client
 
 
 DEFAULT_INDEX_NAME: Final[str] = "default"
 
 REPO_ROOT: Final[Path] = Path(__file__).resolve().parents[1]
 CONTENT_ROOT: Final[Path] = Path(__file__).resolve().parents[1] / "src" / "content"
+STATE_DIR: Final[Path] = REPO_ROOT / ".cache" / "search-index"
+USAGE_FILE: Final[Path] = STATE_DIR / "usage.json"
+CHECKPOINT_FILE: Final[Path] = STATE_DIR / "checkpoint.json"
+# Exit status when --budget stopped a target part-way: not a failure, but not finished either.
+EXIT_CHECKPOINTED: Final[int] = 3
+# search_relevancy.py --cache drops cached results recorded before an index's latest generation.
+GENERATION_FILE: Final[Path] = STATE_DIR / "generations.json"
 
 
 @dataclass(slots=True, frozen=True)
@@ -108,6 +135,55 @@ def resolve_upstash_credentials() -> tuple[str, str, str]:
   return url, token, index_name
 
 
+@dataclass(slots=True, frozen=True)
+class SearchTarget:
+  """One index to write to. `credentials` names the env prefix it was resolved from."""
+  index_name: str
+  url: str
+  token: str
+  credentials: str = ""
+
+  @property
+  def label(self) -> str:
+    return f"{self.index_name}@{self.credentials}" if self.credentials else self.index_name
+
+
+def resolve_search_targets(specs: list[str] | None) -> list[SearchTarget]:
+  """Resolve `--target` specs of the form `INDEX` or `INDEX@PREFIX`.
+
+  A bare index name uses the default Upstash credentials. `INDEX@PREFIX` reads
+  `<PREFIX>_UPSTASH_SEARCH_REST_URL` and `<PREFIX>_UPSTASH_SEARCH_REST_TOKEN`, so a
+  second database or region can receive the same chunks. With no specs the
+  single default target from the environment is returned.
+  """
+  url, token, default_index_name = resolve_upstash_credentials()
+  if not specs:
+    return [SearchTarget(index_name=default_index_name, url=url, token=token)]
+
+  targets: list[SearchTarget] = []
+  for spec in specs:
+    index_name, _, prefix = spec.strip().partition("@")
+    index_name = index_name.strip() or default_index_name
+    prefix = prefix.strip().upper()
+
+    if not prefix:
+      target = SearchTarget(index_name=index_name, url=url, token=token)
+    else:
+      target_url = (os.environ.get(f"{prefix}_UPSTASH_SEARCH_REST_URL") or "").strip()
+      target_token = (os.environ.get(f"{prefix}_UPSTASH_SEARCH_REST_TOKEN") or "").strip()
+      if not target_url:
+        raise ValueError(f"Missing {prefix}_UPSTASH_SEARCH_REST_URL for target '{spec}'")
+      if not target_token:
+        raise ValueError(f"Missing {prefix}_UPSTASH_SEARCH_REST_TOKEN for target '{spec}'")
+      target = SearchTarget(index_name=index_name, url=target_url, token=target_token, credentials=prefix)
+
+    if target.label in {existing.label for existing in targets}:
+      raise ValueError(f"Duplicate target '{target.label}'")
+    targets.append(target)
+
+  return targets
+
+
 # ---------------------------------------------------------------------------
 # Frontmatter + body extraction
 # ---------------------------------------------------------------------------
@@ -289,6 +365,40 @@ def slug_from_path(content_file: Path, collection_dir: Path) -> str:
   return str(parent) if str(parent) != "." else relative.stem
 
 
+def load_page(content_file: Path, config: CollectionConfig, raw: str | None = None) -> PageDocument | None:
+  """Build the PageDocument for one content file, or None for drafts and untitled pages.
+
+  `raw` overrides the file contents (e.g. the version staged in git); the path still sets the slug.
+  """
+  collection_dir = CONTENT_ROOT / config.source_dir
+  if raw is None:
+    raw = content_file.read_text(encoding="utf-8")
+  fm, body = parse_frontmatter(raw)
+
+  if fm.get("isDraft"):
+    return None
+
+  title = str(fm.get("title") or "").strip()
+  description = str(fm.get("description") or "").strip()
+
+  if not title:
+    print(f"[search:reindex] Warning: no title in {content_file}, skipping.")
+    return None
+
+  slug = slug_from_path(content_file, collection_dir)
+  url_path = f"{config.url_prefix}/{slug}"
+
+  return PageDocument(
+    id=url_path,
+    path=url_path,
+    title=title,
+    description=description,
+    raw_body=body,
+    collection=config.name,
+    source_path=str(content_file.relative_to(REPO_ROOT)),
+  )
+
+
 def discover_pages(collections: list[str] | None = None) -> list[PageDocument]:
   """Walk content directories and build PageDocument list."""
   target_names = collections or COLLECTION_NAMES
@@ -308,52 +418,325 @@ def discover_pages(collections: list[str] | None = None) -> list[PageDocument]:
       continue
 
     for content_file in sorted(collection_dir.glob(config.glob_pattern)):
-      raw = content_file.read_text(encoding="utf-8")
-      fm, body = parse_frontmatter(raw)
+      page = load_page(content_file, config)
+      if page is not None:
+        pages.append(page)
 
-      if fm.get("isDraft"):
-        continue
+  return pages
 
-      title = str(fm.get("title") or "").strip()
-      description = str(fm.get("description") or "").strip()
 
-      if not title:
-        print(f"[search:reindex] Warning: no title in {content_file}, skipping.")
-        continue
+def collection_for_file(content_file: Path) -> CollectionConfig | None:
+  """Return the collection whose source_dir and glob_pattern would discover `content_file`."""
+  resolved = content_file.resolve()
+  for config in COLLECTIONS:
+    collection_dir = CONTENT_ROOT / config.source_dir
+    # Every glob_pattern is `**/<file name>`, which also matches the directory root.
+    if resolved.is_relative_to(collection_dir) and resolved.name == Path(config.glob_pattern).name:
+      return config
+  return None
+
+
+def discover_pages_from_files(
+  files: list[Path],
+  collections: list[str] | None = None,
+  read_text: Callable[[Path], str] | None = None,
+) -> list[PageDocument]:
+  """Build pages for just the given content files, skipping anything the indexer would not index.
+
+  `read_text` loads a file's contents from somewhere other than the working tree, such as the git index.
+  """
+  target_names = set(collections or COLLECTION_NAMES)
+  pages: list[PageDocument] = []
+  seen: set[Path] = set()
 
-      slug = slug_from_path(content_file, collection_dir)
-      url_path = f"{config.url_prefix}/{slug}"
-
-      pages.append(PageDocument(
-        id=url_path,
-        path=url_path,
-        title=title,
-        description=description,
-        raw_body=body,
-        collection=config.name,
-        source_path=str(content_file.relative_to(REPO_ROOT)),
-      ))
+  for content_file in files:
+    resolved = content_file.resolve()
+    if resolved in seen or (read_text is None and not resolved.is_file()):
+      continue
+    seen.add(resolved)
+
+    config = collection_for_file(resolved)
+    if config is None or config.name not in target_names:
+      continue
+
+    page = load_page(resolved, config, None if read_text is None else read_text(resolved))
+    if page is not None:
+      pages.append(page)
 
   return pages
 
 
+# ---------------------------------------------------------------------------
+# Rate limiting + daily quota accounting
+# ---------------------------------------------------------------------------
+
+DEFAULT_REQUESTS_PER_SECOND: Final[float] = 10.0
+RATE_LIMIT_MAX_RETRIES: Final[int] = 5
+RATE_LIMIT_BACKOFF_SECONDS: Final[float] = 2.0
+
+# The SDK raises UpstashError with the REST error text and does not expose the
+# response headers, so rate-limit and quota responses are recognised by message.
+RATE_LIMIT_ERROR_RE: Final[re.Pattern[str]] = re.compile(
+  r"rate.?limit|too many requests|\b429\b|max concurrent|per second",
+  re.IGNORECASE,
+)
+QUOTA_ERROR_RE: Final[re.Pattern[str]] = re.compile(
+  r"daily|per day|quota|max requests limit|max updates limit",
+  re.IGNORECASE,
+)
+
+T = TypeVar("T")
+
+
+class QuotaExceededError(Exception):
+  """Raised when the next Upstash call would exceed the daily document budget."""
+
+
+def utc_today() -> str:
+  return datetime.now(timezone.utc).date().isoformat()
+
+
+@dataclass(slots=True)
+class TokenBucket:
+  """Classic token bucket: `rate` tokens per second, bursting up to `capacity`. Safe to share between threads."""
+  rate: float
+  capacity: float
+  clock: Callable[[], float] = time.monotonic
+  sleep: Callable[[float], None] = time.sleep
+  tokens: float = field(init=False)
+  updated_at: float = field(init=False)
+  _lock: threading.Lock = field(init=False, default_factory=threading.Lock, repr=False)
+
+  def __post_init__(self) -> None:
+    self.tokens = self.capacity
+    self.updated_at = self.clock()
+
+  def acquire(self, amount: float = 1.0) -> None:
+    while True:
+      with self._lock:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= amount:
+          self.tokens -= amount
+          return
+        wait = (amount - self.tokens) / self.rate
+      # Sleep without the lock so other callers can take tokens that refill meanwhile.
+      self.sleep(wait)
+
+
+@dataclass(slots=True)
+class DailyUsage:
+  """Documents written and requests made against Upstash on one UTC day."""
+  day: str
+  documents: int = 0
+  requests: int = 0
+
+  @classmethod
+  def load(cls, path: Path | None, today: str) -> DailyUsage:
+    if path is None or not path.exists():
+      return cls(day=today)
+    try:
+      data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+      return cls(day=today)
+    if not isinstance(data, dict) or data.get("day") != today:
+      return cls(day=today)
+    return cls(day=today, documents=int(data.get("documents") or 0), requests=int(data.get("requests") or 0))
+
+  def save(self, path: Path | None) -> None:
+    if path is None:
+      return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"day": self.day, "documents": self.documents, "requests": self.requests}) + "\n", encoding="utf-8")
+
+
+class UpstashGovernor:
+  """Throttle every Upstash call and account for it against a persisted daily budget.
+
+  Calls wait on a token bucket before they are sent. Rate-limit errors surfaced by
+  the SDK are retried with exponential backoff; quota errors, or a call that would
+  push the day's document count past `daily_document_budget`, raise
+  QuotaExceededError so the caller can checkpoint and stop.
+
+  A governor is shared by every target that writes to the same Upstash database,
+  so budget reservations are guarded by a lock; the token bucket has its own.
+  """
+
+  def __init__(
+    self,
+    *,
+    requests_per_second: float | None = None,
+    daily_document_budget: int | None = None,
+    usage_path: Path | None = None,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+    today: Callable[[], str] = utc_today,
+  ) -> None:
+    self.bucket = (
+      TokenBucket(rate=requests_per_second, capacity=max(requests_per_second, 1.0), clock=clock, sleep=sleep)
+      if requests_per_second
+      else None
+    )
+    self.daily_document_budget = daily_document_budget
+    self.usage_path = usage_path
+    self.usage = DailyUsage.load(usage_path, today())
+    self._sleep = sleep
+    self._today = today
+    self._lock = threading.Lock()
+
+  def remaining_documents(self) -> int | None:
+    if self.daily_document_budget is None:
+      return None
+    self._roll_day()
+    return max(self.daily_document_budget - self.usage.documents, 0)
+
+  def call(self, fn: Callable[..., T], *args: object, documents: int = 0, **kwargs: object) -> T:
+    with self._lock:
+      self._roll_day()
+      remaining = self.remaining_documents()
+      if remaining is not None and documents > remaining:
+        raise QuotaExceededError(
+          f"Daily budget of {self.daily_document_budget} documents would be exceeded "
+          f"({self.usage.documents} used today, {documents} more requested)."
+        )
+      # Reserve the documents up front so concurrent callers see them.
+      self.usage.documents += documents
+
+    try:
+      result = self._call_with_backoff(fn, *args, **kwargs)
+    except BaseException:
+      with self._lock:
+        self.usage.documents -= documents
+      raise
+
+    with self._lock:
+      self.usage.requests += 1
+      self.usage.save(self.usage_path)
+    return result
+
+  def _call_with_backoff(self, fn: Callable[..., T], *args: object, **kwargs: object) -> T:
+    attempt = 0
+    while True:
+      if self.bucket is not None:
+        self.bucket.acquire()
+      try:
+        return fn(*args, **kwargs)
+      except UpstashError as exc:
+        message = str(exc)
+        if QUOTA_ERROR_RE.search(message):
+          raise QuotaExceededError(f"Upstash reported a quota limit: {message}") from exc
+        if not RATE_LIMIT_ERROR_RE.search(message) or attempt >= RATE_LIMIT_MAX_RETRIES:
+          raise
+        delay = RATE_LIMIT_BACKOFF_SECONDS * (2 ** attempt)
+        attempt += 1
+        print(f"[search:reindex] Rate limited by Upstash ({message}); retrying in {delay:.0f}s.")
+        self._sleep(delay)
+
+  def _roll_day(self) -> None:
+    today = self._today()
+    if self.usage.day != today:
+      self.usage = DailyUsage(day=today)
+
+
+_CHECKPOINT_LOCK: Final[threading.Lock] = threading.Lock()
+
+
+def _read_checkpoints(path: Path) -> dict[str, list[str]]:
+  if not path.exists():
+    return {}
+  try:
+    data = json.loads(path.read_text(encoding="utf-8"))
+  except (OSError, ValueError):
+    return {}
+  targets = data.get("targets") if isinstance(data, dict) else None
+  if not isinstance(targets, dict):
+    return {}
+  return {str(key): [str(chunk_id) for chunk_id in ids or []] for key, ids in targets.items()}
+
+
+def _write_checkpoints(checkpoints: dict[str, list[str]], path: Path) -> None:
+  if not checkpoints:
+    path.unlink(missing_ok=True)
+    return
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_text(json.dumps({"targets": checkpoints}, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def load_checkpoint(target: str, path: Path | None = None) -> set[str]:
+  """Return chunk ids already upserted into `target` by an interrupted run."""
+  with _CHECKPOINT_LOCK:
+    return set(_read_checkpoints(path or CHECKPOINT_FILE).get(target) or [])
+
+
+def save_checkpoint(target: str, completed: list[str], path: Path | None = None) -> None:
+  with _CHECKPOINT_LOCK:
+    checkpoints = _read_checkpoints(path or CHECKPOINT_FILE)
+    checkpoints[target] = completed
+    _write_checkpoints(checkpoints, path or CHECKPOINT_FILE)
+
+
+def clear_checkpoint(target: str, path: Path | None = None) -> None:
+  with _CHECKPOINT_LOCK:
+    checkpoints = _read_checkpoints(path or CHECKPOINT_FILE)
+    checkpoints.pop(target, None)
+    _write_checkpoints(checkpoints, path or CHECKPOINT_FILE)
+
+
+_GENERATION_LOCK: Final[threading.Lock] = threading.Lock()
+
+
+def record_index_generation(target: str, path: Path | None = None) -> str:
+  """Mark `target` (an index label) as rewritten and return the new generation id."""
+  path = path or GENERATION_FILE
+  generation = datetime.now(timezone.utc).isoformat()
+  with _GENERATION_LOCK:
+    try:
+      generations = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    except (OSError, ValueError):
+      generations = {}
+    if not isinstance(generations, dict):
+      generations = {}
+    generations[target] = generation
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(generations, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+  return generation
+
+
 # ---------------------------------------------------------------------------
 # Upstash operations
 # ---------------------------------------------------------------------------
 
-def drop_index(*, upstash_url: str, upstash_token: str, index_name: str) -> None:
-  client = Search(url=upstash_url, token=upstash_token)
-  indexes = client.list_indexes()
+def search_client(url: str, token: str) -> Search:
+  """Build a client, recording or replaying through UPSTASH_CASSETTE_RECORD/_REPLAY when set."""
+  cassette = cassette_from_env()
+  if cassette is None:
+    return Search(url=url, token=token)
+  return create_client(url, token, cassette)
+
+
+def drop_index(
+  *,
+  upstash_url: str,
+  upstash_token: str,
+  index_name: str,
+  governor: UpstashGovernor | None = None,
+) -> None:
+  governor = governor or UpstashGovernor()
+  client = search_client(upstash_url, upstash_token)
+  indexes = governor.call(client.list_indexes)
   if index_name not in indexes:
     print(f"[search:reindex] Index '{index_name}' does not exist; nothing to drop.")
     return
 
   print(f"[search:reindex] Dropping index '{index_name}'...")
-  client.delete_index(index_name)
+  governor.call(client.delete_index, index_name)
   print(f"[search:reindex] Dropped index '{index_name}'.")
 
 
 UPSERT_BATCH_SIZE: Final[int] = 50
+BATCH_MAX_RETRIES: Final[int] = 2
+BATCH_RETRY_DELAY_SECONDS: Final[float] = 1.0
 
 
 def upsert_chunks(
@@ -362,9 +745,23 @@ def upsert_chunks(
   upstash_token: str,
   index_name: str,
   chunks: list[ChunkDocument],
+  governor: UpstashGovernor | None = None,
+  completed: list[str] | None = None,
+  label: str = "",
+  on_retry: Callable[[], None] | None = None,
+  on_batch: Callable[[], None] | None = None,
 ) -> int:
-  """Upsert section chunks into Upstash Search. Returns count of documents upserted."""
-  client = Search(url=upstash_url, token=upstash_token)
+  """Upsert section chunks into Upstash Search. Returns count of documents upserted.
+
+  Ids of upserted chunks are appended to `completed` as each batch lands, then
+  `on_batch` runs (e.g. to save the checkpoint), so an interrupted run leaves an
+  accurate record of what was written. Batches that fail for reasons other than
+  quota are retried up to BATCH_MAX_RETRIES times; upserts are idempotent so a
+  retry never duplicates documents.
+  """
+  governor = governor or UpstashGovernor()
+  prefix = f"[search:reindex] [{label}]" if label else "[search:reindex]"
+  client = search_client(upstash_url, upstash_token)
   index = client.index(index_name)
 
   total = 0
@@ -385,32 +782,318 @@ def upsert_chunks(
       }
       for chunk in batch
     ]
-    index.upsert(documents)
+    for attempt in range(BATCH_MAX_RETRIES + 1):
+      try:
+        governor.call(index.upsert, documents, documents=len(documents))
+        break
+      except QuotaExceededError:
+        raise
+      except Exception as exc:  # noqa: BLE001
+        if attempt >= BATCH_MAX_RETRIES:
+          raise
+        if on_retry is not None:
+          on_retry()
+        print(f"{prefix} Batch {i // UPSERT_BATCH_SIZE + 1} failed ({exc}); retrying.")
+        time.sleep(BATCH_RETRY_DELAY_SECONDS * (attempt + 1))
+    if completed is not None:
+      completed.extend(chunk.id for chunk in batch)
+    if on_batch is not None:
+      on_batch()
     total += len(batch)
-    print(f"[search:reindex] Upserted batch {i // UPSERT_BATCH_SIZE + 1} ({total}/{len(chunks)} chunks)")
+    print(f"{prefix} Upserted batch {i // UPSERT_BATCH_SIZE + 1} ({total}/{len(chunks)} chunks)")
 
   return total
 
 
+# ---------------------------------------------------------------------------
+# Multi-target fan-out
+# ---------------------------------------------------------------------------
+
+@dataclass(slots=True)
+class TargetResult:
+  target: SearchTarget
+  status: str = "pending"
+  indexed: int = 0
+  skipped: int = 0
+  retries: int = 0
+  elapsed: float = 0.0
+  error: str = ""
+
+
+def index_target(
+  target: SearchTarget,
+  chunks: list[ChunkDocument],
+  *,
+  governor: UpstashGovernor,
+  drop: bool,
+  resume: bool,
+) -> TargetResult:
+  """Drop (optionally) and upsert one target. Never raises; the outcome is in the result."""
+  result = TargetResult(target=target)
+  started = time.monotonic()
+
+  completed: list[str] = []
+  if resume:
+    completed = sorted(load_checkpoint(target.label))
+    done = set(completed)
+    chunks = [chunk for chunk in chunks if chunk.id not in done]
+    result.skipped = len(done)
+
+  def count_retry() -> None:
+    result.retries += 1
+
+  def save_progress() -> None:
+    # Saved per batch: Ctrl-C lands in the main thread, and a killed run never reaches `finally`.
+    save_checkpoint(target.label, completed)
+
+  try:
+    if drop and not resume:
+      drop_index(upstash_url=target.url, upstash_token=target.token, index_name=target.index_name, governor=governor)
+    result.indexed = upsert_chunks(
+      upstash_url=target.url,
+      upstash_token=target.token,
+      index_name=target.index_name,
+      chunks=chunks,
+      governor=governor,
+      completed=completed,
+      label=target.label,
+      on_retry=count_retry,
+      on_batch=save_progress,
+    )
+    clear_checkpoint(target.label)
+    result.status = "ok"
+  except QuotaExceededError as exc:
+    result.indexed = len(completed) - result.skipped
+    result.status = "stopped"
+    result.error = str(exc)
+  except Exception as exc:  # noqa: BLE001
+    result.indexed = len(completed) - result.skipped
+    result.status = "failed"
+    result.error = str(exc)
+  finally:
+    # Also replaces a stale checkpoint when the run failed before its first batch landed.
+    if result.status != "ok":
+      save_checkpoint(target.label, completed)
+
+  # Any attempted write may have changed results, even when the run stopped part-way.
+  if chunks or (drop and not resume):
+    record_index_generation(target.label)
+
+  result.elapsed = time.monotonic() - started
+  return result
+
+
+def fan_out_upsert(
+  targets: list[SearchTarget],
+  chunks: list[ChunkDocument],
+  *,
+  governors: dict[str, UpstashGovernor],
+  drop: bool,
+  resume: bool,
+) -> list[TargetResult]:
+  """Write one chunk stream to every target concurrently, one worker per target."""
+  with ThreadPoolExecutor(max_workers=max(len(targets), 1)) as executor:
+    futures = [
+      executor.submit(index_target, target, chunks, governor=governors[target.url], drop=drop, resume=resume)
+      for target in targets
+    ]
+    return [future.result() for future in futures]
+
+
+def format_target_summary(results: list[TargetResult]) -> str:
+  lines = [f"  {'Target':<30} {'Status':<8} {'Indexed':>8} {'Skipped':>8} {'Retries':>8} {'Seconds':>8}"]
+  for result in results:
+    lines.append(
+      f"  {result.target.label:<30} {result.status:<8} {result.indexed:>8} {result.skipped:>8} "
+      f"{result.retries:>8} {result.elapsed:>8.1f}"
+    )
+    if result.error:
+      lines.append(f"    {result.error}")
+  return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Post-index warm-up + latency verification
+# ---------------------------------------------------------------------------
+
+WARMUP_CONCURRENCY: Final[int] = 8
+WARMUP_MAX_P95_MS: Final[float] = 1500.0
+WARMUP_MIN_HIT_RATE: Final[float] = 1.0
+WARMUP_TOP_PATHS: Final[int] = 3
+
+# Mirror performSearch in src/actions/search/domain.ts so the warm-up exercises
+# the same query shape users send: 8 results over-fetched 6x, reranked.
+WARMUP_SEARCH_LIMIT: Final[int] = 48
+WARMUP_RERANKING: Final[bool] = True
+WARMUP_SEMANTIC_WEIGHT: Final[float] = 0.5
+
+
+@dataclass(slots=True, frozen=True)
+class WarmupQuery:
+  query: str
+  expected_path: str = ""
+
+
+@dataclass(slots=True, frozen=True)
+class WarmupHit:
+  query: str
+  latency_ms: float
+  paths: tuple[str, ...]
+  expected_path: str = ""
+  error: str = ""
+
+  @property
+  def found(self) -> bool:
+    if self.error or not self.paths:
+      return False
+    return not self.expected_path or self.expected_path in self.paths
+
+
+def load_warmup_queries(path: Path) -> list[WarmupQuery]:
+  """Read one query per line, or JSONL objects with `query` and optional `expected_path`."""
+  queries: list[WarmupQuery] = []
+  for line_number, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+    stripped = line.strip()
+    if not stripped or stripped.startswith("#"):
+      continue
+    if stripped.startswith("{"):
+      try:
+        data = json.loads(stripped)
+      except ValueError as exc:
+        raise ValueError(f"{path}:{line_number}: invalid JSON ({exc})") from exc
+      query = str(data.get("query") or "").strip()
+      if not query:
+        raise ValueError(f"{path}:{line_number}: missing 'query'")
+      queries.append(WarmupQuery(query=query, expected_path=str(data.get("expected_path") or "").strip()))
+    else:
+      queries.append(WarmupQuery(query=stripped))
+
+  if not queries:
+    raise ValueError(f"No warm-up queries found in {path}")
+  return queries
+
+
+def unique_result_paths(results: list[object]) -> tuple[str, ...]:
+  """Page paths in rank order, collapsing chunks of the same page like the responder does."""
+  paths: list[str] = []
+  for result in results:
+    metadata = getattr(result, "metadata", None) or {}
+    path = str(metadata.get("path") or getattr(result, "id", "") or "").split("#", 1)[0].rstrip("/")
+    if path and path not in paths:
+      paths.append(path)
+  return tuple(paths)
+
+
+def warm_up_target(
+  target: SearchTarget,
+  queries: list[WarmupQuery],
+  *,
+  governor: UpstashGovernor,
+  concurrency: int = WARMUP_CONCURRENCY,
+) -> list[WarmupHit]:
+  """Run every warm-up query against `target` concurrently, timing each round trip."""
+  client = search_client(target.url, target.token)
+  index = client.index(target.index_name)
+
+  def run_query(query: WarmupQuery) -> WarmupHit:
+    # Time the search round trip only: the governor waits for a token before calling timed_search,
+    # so throttling under a tight --budget does not count against the latency gate.
+    latencies: list[float] = []
+
+    def timed_search(*args: object, **kwargs: object) -> object:
+      started = time.perf_counter()
+      try:
+        return index.search(*args, **kwargs)
+      finally:
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    try:
+      results = governor.call(
+        timed_search,
+        query.query,
+        limit=WARMUP_SEARCH_LIMIT,
+        reranking=WARMUP_RERANKING,
+        semantic_weight=WARMUP_SEMANTIC_WEIGHT,
+      )
+    except Exception as exc:  # noqa: BLE001
+      return WarmupHit(
+        query=query.query,
+        latency_ms=latencies[-1] if latencies else 0.0,
+        paths=(),
+        expected_path=query.expected_path,
+        error=str(exc),
+      )
+    return WarmupHit(
+      query=query.query,
+      # After rate-limit retries, the attempt that answered.
+      latency_ms=latencies[-1],
+      paths=unique_result_paths(results),
+      expected_path=query.expected_path,
+    )
+
+  with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+    return list(executor.map(run_query, queries))
+
+
+def evaluate_warmup(hits: list[WarmupHit], *, max_p95_ms: float, min_hit_rate: float) -> list[str]:
+  """Return human-readable threshold violations; empty when the warm-up passed."""
+  if not hits:
+    return []
+
+  problems: list[str] = []
+  p95 = percentile([hit.latency_ms for hit in hits], 95)
+  if p95 > max_p95_ms:
+    problems.append(f"p95 latency {p95:.0f}ms exceeds {max_p95_ms:.0f}ms")
+
+  found = sum(1 for hit in hits if hit.found)
+  hit_rate = found / len(hits)
+  if hit_rate < min_hit_rate:
+    missing = ", ".join(repr(hit.query) for hit in hits if not hit.found)
+    problems.append(f"only {found}/{len(hits)} queries returned their expected page (missing: {missing})")
+
+  return problems
+
+
+def format_warmup_report(hits: list[WarmupHit]) -> str:
+  latencies = [hit.latency_ms for hit in hits]
+  lines = [f"  p50 {percentile(latencies, 50):.0f}ms  p95 {percentile(latencies, 95):.0f}ms  ({len(hits)} queries)"]
+  for hit in hits:
+    marker = "ok  " if hit.found else "MISS"
+    detail = hit.error or ", ".join(hit.paths[:WARMUP_TOP_PATHS]) or "(no results)"
+    lines.append(f"  {marker} {hit.latency_ms:>7.0f}ms  {hit.query:<40}  {detail}")
+  return "\n".join(lines)
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
 
-def main() -> int:
+def main(argv: list[str] | None = None) -> int:
   parser = argparse.ArgumentParser(description="Section-chunked Upstash Search indexer.")
   parser.add_argument("--no-drop", action="store_true", help="Skip dropping the index before upserting.")
   parser.add_argument("--dry-run", action="store_true", help="Discover pages and print summary without writing to Upstash.")
   parser.add_argument("--collection", action="append", dest="collections", help="Only index specific collection(s). Can be repeated.")
-  args = parser.parse_args()
+  parser.add_argument("--budget", type=int, default=None, help=f"Daily document quota. Stops, checkpoints and exits with status {EXIT_CHECKPOINTED} before exceeding it.")
+  parser.add_argument("--requests-per-second", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help=f"Maximum Upstash requests per second. Defaults to {DEFAULT_REQUESTS_PER_SECOND:g}.")
+  parser.add_argument("--resume", action="store_true", help="Skip chunks recorded in the last checkpoint (implies --no-drop).")
+  parser.add_argument("--warmup-queries", type=Path, default=None, help="Run these queries (text or JSONL) against each target after indexing and verify latency/results.")
+  parser.add_argument("--warmup-concurrency", type=int, default=WARMUP_CONCURRENCY, help=f"Concurrent warm-up queries per target. Defaults to {WARMUP_CONCURRENCY}.")
+  parser.add_argument("--warmup-max-p95-ms", type=float, default=WARMUP_MAX_P95_MS, help=f"Fail when warm-up p95 latency exceeds this. Defaults to {WARMUP_MAX_P95_MS:g}.")
+  parser.add_argument("--warmup-min-hit-rate", type=float, default=WARMUP_MIN_HIT_RATE, help="Fail when fewer than this fraction of warm-up queries find their page. Defaults to 1.0.")
+  parser.add_argument("--files", nargs="+", type=Path, default=None, help="Only index these content files (implies --no-drop).")
+  parser.add_argument("--target", action="append", dest="targets", metavar="INDEX[@PREFIX]", help="Index to write to; PREFIX selects <PREFIX>_UPSTASH_SEARCH_REST_URL/_TOKEN credentials. Can be repeated.")
+  args = parser.parse_args(argv)
 
   try:
     load_environment()
-    upstash_url, upstash_token, index_name = resolve_upstash_credentials()
+    targets = resolve_search_targets(args.targets)
+    # Parsed before any write, so a bad queries file cannot leave a half-verified index behind.
+    queries = load_warmup_queries(args.warmup_queries) if args.warmup_queries else []
   except Exception as exc:  # noqa: BLE001
     print(f"[search:reindex] {exc}", file=sys.stderr)
     return 1
 
-  pages = discover_pages(args.collections)
+  pages = discover_pages_from_files(args.files, args.collections) if args.files else discover_pages(args.collections)
   chunks = chunk_pages(pages)
   collections_count = len(set(p.collection for p in pages))
   print(f"[search:reindex] Discovered {len(pages)} pages \u2192 {len(chunks)} chunks across {collections_count} collection(s).")
@@ -422,22 +1105,50 @@ def main() -> int:
     print(f"\n[search:reindex] Dry run complete. {len(pages)} pages \u2192 {len(chunks)} chunks would be indexed.")
     return 0
 
-  try:
-    if not args.no_drop:
-      drop_index(upstash_url=upstash_url, upstash_token=upstash_token, index_name=index_name)
-
-    count = upsert_chunks(
-      upstash_url=upstash_url,
-      upstash_token=upstash_token,
-      index_name=index_name,
-      chunks=chunks,
-    )
-    print(f"[search:reindex] Done. Indexed {count} chunks ({len(pages)} pages) into '{index_name}'.")
-    return 0
-  except Exception as exc:  # noqa: BLE001
-    print(f"[search:reindex] {exc}", file=sys.stderr)
+  governors: dict[str, UpstashGovernor] = {}
+  for target in targets:
+    if target.url not in governors:
+      usage_file = STATE_DIR / f"usage-{target.credentials.lower()}.json" if target.credentials else USAGE_FILE
+      governors[target.url] = UpstashGovernor(
+        requests_per_second=args.requests_per_second,
+        daily_document_budget=args.budget,
+        usage_path=usage_file,
+      )
+
+  results = fan_out_upsert(targets, chunks, governors=governors, drop=not (args.no_drop or args.files), resume=args.resume)
+
+  print(f"\n[search:reindex] Summary ({len(pages)} pages, {len(chunks)} chunks):")
+  print(format_target_summary(results))
+  for governor in governors.values():
+    print(f"[search:reindex] Usage today: {governor.usage.documents} documents, {governor.usage.requests} requests.")
+
+  stopped = any(result.status == "stopped" for result in results)
+  if stopped:
+    print(f"[search:reindex] Budget reached; checkpoint saved to {CHECKPOINT_FILE.relative_to(REPO_ROOT)}. Re-run with --resume.")
+
+  if any(result.status == "failed" for result in results):
+    print(f"[search:reindex] Progress saved to {CHECKPOINT_FILE.relative_to(REPO_ROOT)}. Re-run with --resume to continue.")
     return 1
 
+  if queries:
+    warmup_failed = False
+    for result in results:
+      if result.status != "ok":
+        continue
+      target = result.target
+      hits = warm_up_target(target, queries, governor=governors[target.url], concurrency=args.warmup_concurrency)
+      problems = evaluate_warmup(hits, max_p95_ms=args.warmup_max_p95_ms, min_hit_rate=args.warmup_min_hit_rate)
+      print(f"\n[search:reindex] Warm-up for '{target.label}':")
+      print(format_warmup_report(hits))
+      for problem in problems:
+        print(f"[search:reindex] [{target.label}] Warm-up check failed: {problem}", file=sys.stderr)
+      warmup_failed = warmup_failed or bool(problems)
+
+    if warmup_failed:
+      return 1
+
+  return EXIT_CHECKPOINTED if stopped else 0
+
 
 if __name__ == "__main__":
   raise SystemExit(main())
@@ -3,26 +3,70 @@
 This script imports page discovery and section chunking from
 scripts/search-index.py so content selection, Markdown/MDX-to-plain-text
 extraction, and chunk sizing stay in sync with the actual indexer.
+
+Chunk sizes are checked against --limit in UTF-8 bytes, which is what the
+Upstash limit counts. With --report (or --json) it instead prints the size
+distribution of every chunk, in characters and UTF-8 bytes, per collection.
+
+--files and --staged restrict the check to the given content files (or those
+staged in git), so it is fast enough to run as a pre-commit hook. --staged
+reads each file as staged in the index, not the working tree, so a partially
+staged file is checked as it will be committed:
+
+  python3 scripts/search_content_lengths.py --staged --strict
 """
 from __future__ import annotations
 
 import argparse
 import importlib.util
+import json
+import subprocess
 import sys
-from dataclasses import dataclass
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
 from types import ModuleType
 from typing import Final
 
 
 CONTENT_LENGTH_LIMIT: Final[int] = 4096
+HISTOGRAM_BUCKET_WIDTH: Final[int] = 512
+ALL_COLLECTIONS: Final[str] = "(all)"
 SEARCH_INDEX_SCRIPT: Final[Path] = Path(__file__).with_name("search-index.py")
+REPO_ROOT: Final[Path] = Path(__file__).resolve().parents[1]
 
 
 @dataclass(slots=True, frozen=True)
 class OversizedContentRow:
+  content_path: str
+  byte_length: int
+
+
+@dataclass(slots=True, frozen=True)
+class ChunkSize:
+  collection: str
   content_path: str
   char_length: int
+  byte_length: int
+
+
+@dataclass(slots=True)
+class SizeDistribution:
+  collection: str
+  count: int
+  char_p50: int
+  char_p90: int
+  char_p99: int
+  char_max: int
+  byte_p50: int
+  byte_p90: int
+  byte_p99: int
+  byte_max: int
+  mean_utilisation: float
+  p90_utilisation: float
+  over_limit: int
+  histogram: list[int] = field(default_factory=list)
 
 
 def load_search_index_module() -> ModuleType:
@@ -36,25 +80,195 @@ def load_search_index_module() -> ModuleType:
   return module
 
 
+def list_staged_files() -> list[Path]:
+  """Content files added, copied, modified or renamed in the git index."""
+  result = subprocess.run(
+    ["git", "diff", "--cached", "--name-only", "--diff-filter=ACMR", "--", "src/content"],
+    cwd=REPO_ROOT,
+    check=True,
+    text=True,
+    stdout=subprocess.PIPE,
+  )
+  return [REPO_ROOT / line for line in result.stdout.splitlines() if line.strip()]
+
+
+def read_staged_text(path: Path) -> str:
+  """Contents of `path` as staged in the git index (`git show :<path>`)."""
+  relative = path.resolve().relative_to(REPO_ROOT).as_posix()
+  result = subprocess.run(
+    ["git", "show", f":{relative}"],
+    cwd=REPO_ROOT,
+    check=True,
+    stdout=subprocess.PIPE,
+  )
+  return result.stdout.decode("utf-8")
+
+
+def discover_selected_pages(
+  search_index: ModuleType,
+  *,
+  collections: list[str] | None,
+  files: list[Path] | None,
+  read_text: Callable[[Path], str] | None = None,
+) -> list[object]:
+  if files is None:
+    return search_index.discover_pages(collections)
+  return search_index.discover_pages_from_files(files, collections, read_text)
+
+
 def collect_oversized_content_rows(
   *,
   collections: list[str] | None = None,
   limit: int = CONTENT_LENGTH_LIMIT,
+  files: list[Path] | None = None,
+  read_text: Callable[[Path], str] | None = None,
 ) -> list[OversizedContentRow]:
   search_index = load_search_index_module()
-  pages = search_index.discover_pages(collections)
+  pages = discover_selected_pages(search_index, collections=collections, files=files, read_text=read_text)
 
   rows: list[OversizedContentRow] = []
   for page in pages:
     chunks = search_index.chunk_page(page)
     for chunk in chunks:
-      total = len(chunk.title) + len(chunk.section_heading) + len(chunk.section_content)
-      if total > limit:
+      _, byte_length = measure_chunk(chunk)
+      if byte_length > limit:
         rows.append(OversizedContentRow(
           content_path=f"{chunk.source_path} [{chunk.id}]",
-          char_length=total,
+          byte_length=byte_length,
         ))
-  return sorted(rows, key=lambda row: (-row.char_length, row.content_path))
+  return sorted(rows, key=lambda row: (-row.byte_length, row.content_path))
+
+
+def measure_chunk(chunk: object) -> tuple[int, int]:
+  """Return (characters, UTF-8 bytes) for the indexed text fields of a chunk."""
+  text = f"{chunk.title}{chunk.section_heading}{chunk.section_content}"
+  return len(text), len(text.encode("utf-8"))
+
+
+def collect_chunk_sizes(
+  *,
+  collections: list[str] | None = None,
+  files: list[Path] | None = None,
+  read_text: Callable[[Path], str] | None = None,
+) -> list[ChunkSize]:
+  """Measure every chunk in one pass over the discovered pages."""
+  search_index = load_search_index_module()
+  sizes: list[ChunkSize] = []
+  for page in discover_selected_pages(search_index, collections=collections, files=files, read_text=read_text):
+    for chunk in search_index.chunk_page(page):
+      char_length, byte_length = measure_chunk(chunk)
+      sizes.append(ChunkSize(
+        collection=chunk.collection,
+        content_path=f"{chunk.source_path} [{chunk.id}]",
+        char_length=char_length,
+        byte_length=byte_length,
+      ))
+  return sizes
+
+
+def nearest_rank(ordered: list[int], pct: float) -> int:
+  """Nearest-rank percentile of a sorted list, so the result is an observed length."""
+  if not ordered:
+    return 0
+  rank = max(int(-(-len(ordered) * pct // 100)), 1)
+  return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarise_sizes(
+  collection: str,
+  sizes: list[ChunkSize],
+  *,
+  limit: int,
+  bucket_width: int,
+) -> SizeDistribution:
+  chars = sorted(size.char_length for size in sizes)
+  byte_lengths = sorted(size.byte_length for size in sizes)
+  utilisation = [length / limit for length in byte_lengths]
+
+  # One bucket per `bucket_width` bytes up to the limit, plus an overflow bucket.
+  bucket_count = -(-limit // bucket_width)
+  histogram = [0] * (bucket_count + 1)
+  for length in byte_lengths:
+    histogram[min(length // bucket_width, bucket_count)] += 1
+
+  return SizeDistribution(
+    collection=collection,
+    count=len(sizes),
+    char_p50=nearest_rank(chars, 50),
+    char_p90=nearest_rank(chars, 90),
+    char_p99=nearest_rank(chars, 99),
+    char_max=chars[-1] if chars else 0,
+    byte_p50=nearest_rank(byte_lengths, 50),
+    byte_p90=nearest_rank(byte_lengths, 90),
+    byte_p99=nearest_rank(byte_lengths, 99),
+    byte_max=byte_lengths[-1] if byte_lengths else 0,
+    mean_utilisation=round(sum(utilisation) / len(utilisation), 4) if utilisation else 0.0,
+    p90_utilisation=round(nearest_rank(byte_lengths, 90) / limit, 4),
+    over_limit=sum(1 for length in byte_lengths if length > limit),
+    histogram=histogram,
+  )
+
+
+def build_size_report(
+  sizes: list[ChunkSize],
+  *,
+  limit: int = CONTENT_LENGTH_LIMIT,
+  bucket_width: int = HISTOGRAM_BUCKET_WIDTH,
+) -> list[SizeDistribution]:
+  """Per-collection distributions, followed by one row covering every chunk."""
+  by_collection: dict[str, list[ChunkSize]] = {}
+  for size in sizes:
+    by_collection.setdefault(size.collection, []).append(size)
+
+  report = [
+    summarise_sizes(name, members, limit=limit, bucket_width=bucket_width)
+    for name, members in sorted(by_collection.items())
+  ]
+  report.append(summarise_sizes(ALL_COLLECTIONS, sizes, limit=limit, bucket_width=bucket_width))
+  return report
+
+
+def size_report_to_json(report: list[SizeDistribution], *, limit: int, bucket_width: int) -> str:
+  payload = {
+    "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    "limit_bytes": limit,
+    "bucket_width_bytes": bucket_width,
+    "collections": [asdict(row) for row in report],
+  }
+  return json.dumps(payload, indent=2)
+
+
+def format_size_report(report: list[SizeDistribution], *, limit: int, bucket_width: int) -> str:
+  headers = ["Collection", "Chunks", "Chars p50/p90/p99/max", "Bytes p50/p90/p99/max", "Util mean/p90", "Over"]
+  rows = [
+    [
+      row.collection,
+      str(row.count),
+      f"{row.char_p50}/{row.char_p90}/{row.char_p99}/{row.char_max}",
+      f"{row.byte_p50}/{row.byte_p90}/{row.byte_p99}/{row.byte_max}",
+      f"{row.mean_utilisation:.0%}/{row.p90_utilisation:.0%}",
+      str(row.over_limit),
+    ]
+    for row in report
+  ]
+  widths = [max(len(header), *(len(row[i]) for row in rows)) for i, header in enumerate(headers)]
+
+  lines = ["  ".join(header.ljust(widths[i]) if i == 0 else header.rjust(widths[i]) for i, header in enumerate(headers))]
+  lines.append("  ".join("-" * width for width in widths))
+  lines.extend(
+    "  ".join(value.ljust(widths[i]) if i == 0 else value.rjust(widths[i]) for i, value in enumerate(row))
+    for row in rows
+  )
+
+  overall = report[-1]
+  peak = max(overall.histogram, default=0) or 1
+  lines.append("")
+  lines.append(f"UTF-8 byte histogram ({overall.count} chunks, limit {limit}):")
+  for index, count in enumerate(overall.histogram):
+    start = index * bucket_width
+    label = f"{start:>5}-{min(start + bucket_width, limit) - 1:<5}" if start < limit else f">{limit - 1:<10}"
+    lines.append(f"  {label} {count:>5} {'#' * round(40 * count / peak)}")
+  return "\n".join(lines)
 
 
 def format_oversized_content_table(rows: list[OversizedContentRow]) -> str:
@@ -62,25 +276,67 @@ def format_oversized_content_table(rows: list[OversizedContentRow]) -> str:
     return "No indexed chunks exceed the content limit."
 
   path_header = "Content Path"
-  length_header = "Character Length"
+  length_header = "UTF-8 Bytes"
   path_width = max(len(path_header), *(len(row.content_path) for row in rows))
-  length_width = max(len(length_header), *(len(str(row.char_length)) for row in rows))
+  length_width = max(len(length_header), *(len(str(row.byte_length)) for row in rows))
 
   header = f"{path_header:<{path_width}}  {length_header:>{length_width}}"
   separator = f"{'-' * path_width}  {'-' * length_width}"
   lines = [header, separator]
-  lines.extend(f"{row.content_path:<{path_width}}  {row.char_length:>{length_width}}" for row in rows)
+  lines.extend(f"{row.content_path:<{path_width}}  {row.byte_length:>{length_width}}" for row in rows)
   return "\n".join(lines)
 
 
-def main() -> int:
-  parser = argparse.ArgumentParser(description="Report indexed section chunks over the Upstash character limit.")
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="Report indexed section chunks over the Upstash size limit (UTF-8 bytes).")
   parser.add_argument("--collection", action="append", dest="collections", help="Only inspect specific collection(s). Can be repeated.")
-  parser.add_argument("--limit", type=int, default=CONTENT_LENGTH_LIMIT, help=f"Maximum allowed character length. Defaults to {CONTENT_LENGTH_LIMIT}.")
-  args = parser.parse_args()
+  parser.add_argument(
+    "--limit",
+    type=int,
+    default=CONTENT_LENGTH_LIMIT,
+    help=f"Maximum chunk size in UTF-8 bytes. Defaults to {CONTENT_LENGTH_LIMIT}.",
+  )
+  parser.add_argument("--report", action="store_true", help="Print character/UTF-8 byte size distributions per collection instead of oversized chunks.")
+  parser.add_argument("--json", action="store_true", help="Print the size report as JSON (implies --report).")
+  parser.add_argument("--bucket-width", type=int, default=HISTOGRAM_BUCKET_WIDTH, help=f"Histogram bucket width in bytes. Defaults to {HISTOGRAM_BUCKET_WIDTH}.")
+  selection = parser.add_mutually_exclusive_group()
+  selection.add_argument("--files", nargs="+", type=Path, help="Only chunk these content files instead of scanning every collection.")
+  selection.add_argument("--staged", action="store_true", help="Only chunk content files staged in git, reading the staged version rather than the working tree.")
+  parser.add_argument("--strict", action="store_true", help="Exit with status 1 when any chunk is over the limit, also with --report/--json (for pre-commit hooks).")
+  args = parser.parse_args(argv)
+
+  files: list[Path] | None = args.files
+  read_text = read_staged_text if args.staged else None
+  if args.staged:
+    try:
+      files = list_staged_files()
+    except (OSError, subprocess.CalledProcessError) as exc:
+      print(f"[search:content-length] Could not list staged files: {exc}", file=sys.stderr)
+      return 1
+    if not files:
+      print("No staged content files to check.")
+      return 0
+
+  if args.report or args.json:
+    try:
+      report = build_size_report(
+        collect_chunk_sizes(collections=args.collections, files=files, read_text=read_text),
+        limit=args.limit,
+        bucket_width=args.bucket_width,
+      )
+    except Exception as exc:  # noqa: BLE001
+      print(f"[search:content-length] {exc}", file=sys.stderr)
+      return 1
+
+    if args.json:
+      print(size_report_to_json(report, limit=args.limit, bucket_width=args.bucket_width))
+    else:
+      print(format_size_report(report, limit=args.limit, bucket_width=args.bucket_width))
+    # The last row covers every chunk, so --strict means the same thing in both modes.
+    return 1 if report[-1].over_limit and args.strict else 0
 
   try:
-    rows = collect_oversized_content_rows(collections=args.collections, limit=args.limit)
+    rows = collect_oversized_content_rows(collections=args.collections, limit=args.limit, files=files, read_text=read_text)
   except Exception as exc:  # noqa: BLE001
     print(f"[search:content-length] {exc}", file=sys.stderr)
     return 1
@@ -88,11 +344,11 @@ def main() -> int:
   print(format_oversized_content_table(rows))
 
   if rows:
-    print(f"\nFound {len(rows)} chunk(s) over {args.limit} characters.")
+    print(f"\nFound {len(rows)} chunk(s) over {args.limit} bytes.")
   else:
-    print(f"\nAll indexed chunks are within the {args.limit}-character limit.")
+    print(f"\nAll indexed chunks are within the {args.limit}-byte limit.")
 
-  return 0
+  return 1 if rows and args.strict else 0
 
 
 if __name__ == "__main__":
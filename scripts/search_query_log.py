@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import math
+import re
+import sys
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Final, TextIO
+
+try:
+  from scripts.search_relevancy import format_grid, get_value
+except ModuleNotFoundError:  # run as `python3 scripts/search_query_log.py`
+  from search_relevancy import format_grid, get_value
+
+
+DEFAULT_TOP: Final[int] = 20
+DEFAULT_CAPACITY: Final[int] = 10_000
+# Latency buckets grow by 2%, so every reported percentile is within 2% of the true value.
+LATENCY_BUCKET_GROWTH: Final[float] = 1.02
+QUERY_KEYS: Final[tuple[str, ...]] = ('query', 'q')
+RESULT_COUNT_KEYS: Final[tuple[str, ...]] = ('result_count', 'results', 'hits')
+LATENCY_KEYS: Final[tuple[str, ...]] = ('latency_ms', 'duration_ms')
+TERM_RE: Final[re.Pattern[str]] = re.compile(r'[a-z0-9][a-z0-9+#.\-]*')
+STOPWORDS: Final[frozenset[str]] = frozenset(
+  {'a', 'an', 'and', 'are', 'at', 'for', 'from', 'how', 'in', 'is', 'of', 'on', 'or', 'the', 'to', 'vs', 'what', 'with'}
+)
+
+
+class HeavyHitters:
+  """Misra-Gries frequent-item counter holding at most `capacity` keys.
+
+  Counts are exact until more than `capacity` distinct keys arrive. After that each count
+  may be low by at most `undercount`, and any key seen more than total / capacity times is
+  guaranteed to still be tracked.
+  """
+
+  __slots__ = ('capacity', 'counts', 'undercount')
+
+  def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+    self.capacity = max(capacity, 1)
+    self.counts: dict[str, int] = {}
+    self.undercount = 0
+
+  def add(self, key: str) -> None:
+    if key in self.counts:
+      self.counts[key] += 1
+      return
+    if len(self.counts) < self.capacity:
+      self.counts[key] = 1
+      return
+
+    # Full: decrement every counter (the new key included), dropping those that reach zero.
+    self.undercount += 1
+    for tracked in list(self.counts):
+      self.counts[tracked] -= 1
+      if not self.counts[tracked]:
+        del self.counts[tracked]
+
+  def top(self, n: int) -> list[tuple[str, int]]:
+    return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+class LatencyHistogram:
+  """Log-bucketed latency histogram; memory grows with the latency range, not the sample count."""
+
+  __slots__ = ('buckets', 'count', 'total', 'minimum', 'maximum')
+
+  def __init__(self) -> None:
+    self.buckets: dict[int, int] = {}
+    self.count = 0
+    self.total = 0.0
+    self.minimum = math.inf
+    self.maximum = 0.0
+
+  def add(self, value_ms: float) -> None:
+    value_ms = max(value_ms, 0.0)
+    bucket = math.ceil(math.log(value_ms, LATENCY_BUCKET_GROWTH)) if value_ms >= 1 else 0
+    self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+    self.count += 1
+    self.total += value_ms
+    self.minimum = min(self.minimum, value_ms)
+    self.maximum = max(self.maximum, value_ms)
+
+  @property
+  def mean(self) -> float:
+    return self.total / self.count if self.count else 0.0
+
+  def percentile(self, pct: float) -> float:
+    """Upper bound of the bucket holding the nearest-rank `pct` sample, clamped to the observed range."""
+    if not self.count:
+      return 0.0
+    rank = max(math.ceil(self.count * pct / 100), 1)
+    seen = 0
+    for bucket in sorted(self.buckets):
+      seen += self.buckets[bucket]
+      if seen >= rank:
+        upper = LATENCY_BUCKET_GROWTH**bucket if bucket else 1.0
+        return min(max(upper, self.minimum), self.maximum)
+    return self.maximum
+
+
+@dataclass(slots=True)
+class QueryLogStats:
+  capacity: int = DEFAULT_CAPACITY
+  total: int = 0
+  skipped: int = 0
+  zero_results: int = 0
+  queries: HeavyHitters = field(init=False)
+  zero_result_queries: HeavyHitters = field(init=False)
+  terms: HeavyHitters = field(init=False)
+  latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+  def __post_init__(self) -> None:
+    self.queries = HeavyHitters(self.capacity)
+    self.zero_result_queries = HeavyHitters(self.capacity)
+    self.terms = HeavyHitters(self.capacity)
+
+  @property
+  def approximate(self) -> bool:
+    return bool(self.queries.undercount or self.zero_result_queries.undercount or self.terms.undercount)
+
+
+def normalize_query(query: str) -> str:
+  return ' '.join(query.lower().split())
+
+
+def query_terms(query: str) -> list[str]:
+  return [term for term in TERM_RE.findall(query) if term not in STOPWORDS]
+
+
+def first_value(record: Any, keys: tuple[str, ...]) -> Any:
+  for key in keys:
+    value = get_value(record, key)
+    if value is not None:
+      return value
+  return None
+
+
+def result_count(record: Any) -> int | None:
+  value = first_value(record, RESULT_COUNT_KEYS)
+  if isinstance(value, list):
+    return len(value)
+  if isinstance(value, bool) or not isinstance(value, int | float):
+    return None
+  return int(value)
+
+
+def ingest_record(stats: QueryLogStats, record: Any) -> bool:
+  raw_query = first_value(record, QUERY_KEYS)
+  query = normalize_query(raw_query) if isinstance(raw_query, str) else ''
+  if not query:
+    return False
+
+  stats.total += 1
+  stats.queries.add(query)
+  for term in query_terms(query):
+    stats.terms.add(term)
+
+  if result_count(record) == 0:
+    stats.zero_results += 1
+    stats.zero_result_queries.add(query)
+
+  latency = first_value(record, LATENCY_KEYS)
+  if isinstance(latency, int | float) and not isinstance(latency, bool):
+    stats.latency.add(float(latency))
+  return True
+
+
+def iter_log_lines(paths: list[Path], stdin: TextIO = sys.stdin) -> Iterator[str]:
+  """Yield lines one at a time from each log (`-` is stdin, `.gz` is decompressed on the fly).
+
+  Invalid UTF-8 is replaced rather than raised, so a corrupt line is counted as skipped.
+  """
+  for path in paths:
+    if str(path) == '-':
+      yield from stdin
+      continue
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as handle:
+      yield from handle
+
+
+def analyse_lines(lines: Iterable[str], *, capacity: int = DEFAULT_CAPACITY) -> QueryLogStats:
+  stats = QueryLogStats(capacity=capacity)
+  for line in lines:
+    stripped = line.strip()
+    if not stripped:
+      continue
+    try:
+      record = json.loads(stripped)
+    except ValueError:
+      stats.skipped += 1
+      continue
+    if not ingest_record(stats, record):
+      stats.skipped += 1
+  return stats
+
+
+def format_counts(title: str, key_header: str, items: list[tuple[str, int]], total: int) -> str:
+  if not items:
+    return f'{title}: none'
+  rows = [[key, str(count), f'{count / total:.1%}' if total else '-'] for key, count in items]
+  return f'{title}:\n{format_grid([key_header, "Count", "Share"], rows)}'
+
+
+def format_report(stats: QueryLogStats, *, top: int) -> str:
+  zero_share = stats.zero_results / stats.total if stats.total else 0.0
+  lines = [
+    f'{stats.total} queries ({len(stats.queries.counts)} distinct tracked), {stats.skipped} lines skipped.',
+    f'Zero-result queries: {stats.zero_results} ({zero_share:.1%}).',
+  ]
+  if stats.latency.count:
+    latency = stats.latency
+    lines.append(
+      f'Latency ms ({latency.count} samples): mean {latency.mean:.1f}, p50 {latency.percentile(50):.1f}, '
+      f'p90 {latency.percentile(90):.1f}, p95 {latency.percentile(95):.1f}, '
+      f'p99 {latency.percentile(99):.1f}, max {latency.maximum:.1f}'
+    )
+  if stats.approximate:
+    lines.append(f'Counts are approximate: more than {stats.capacity} distinct keys were seen (see --capacity).')
+
+  lines.extend(
+    [
+      '',
+      format_counts(f'Top {top} queries', 'Query', stats.queries.top(top), stats.total),
+      '',
+      format_counts(f'Top {top} zero-result queries', 'Query', stats.zero_result_queries.top(top), stats.zero_results),
+      '',
+      format_counts(f'Top {top} terms', 'Term', stats.terms.top(top), sum(stats.terms.counts.values())),
+    ]
+  )
+  return '\n'.join(lines)
+
+
+def report_to_json(stats: QueryLogStats, *, top: int) -> str:
+  latency = stats.latency
+  payload: dict[str, Any] = {
+    'total': stats.total,
+    'skipped': stats.skipped,
+    'zero_results': stats.zero_results,
+    'approximate': stats.approximate,
+    'latency_ms': {
+      'count': latency.count,
+      'mean': round(latency.mean, 3),
+      'p50': round(latency.percentile(50), 3),
+      'p90': round(latency.percentile(90), 3),
+      'p95': round(latency.percentile(95), 3),
+      'p99': round(latency.percentile(99), 3),
+      'max': round(latency.maximum, 3),
+    },
+    'top_queries': [{'query': query, 'count': count} for query, count in stats.queries.top(top)],
+    'zero_result_queries': [{'query': query, 'count': count} for query, count in stats.zero_result_queries.top(top)],
+    'top_terms': [{'term': term, 'count': count} for term, count in stats.terms.top(top)],
+  }
+  return json.dumps(payload, indent=2)
+
+
+def export_top_queries(path: Path, items: list[tuple[str, int]]) -> None:
+  """Write a query set that `search_relevancy.py --queries-file` and `search-index.py --warmup-queries` accept."""
+  if path.suffix == '.jsonl':
+    content = ''.join(json.dumps({'query': query, 'count': count}) + '\n' for query, count in items)
+  else:
+    content = ''.join(f'{query}\n' for query, _count in items)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_text(content, encoding='utf-8')
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+    description='Stream JSONL search query logs and report hot queries, zero-result queries, latency and terms.',
+    epilog=(
+      'Each line is a JSON object with `query` (or `q`), and optionally `result_count`/`results`/`hits` '
+      '(a count or list) and `latency_ms`/`duration_ms`. Use `-` to read stdin; .gz files are decompressed.'
+    ),
+  )
+  parser.add_argument('logs', nargs='+', type=Path, help='JSONL query logs.')
+  parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='Rows per ranking.')
+  parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help='Distinct keys tracked per counter.')
+  parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+  parser.add_argument(
+    '--export',
+    type=Path,
+    default=None,
+    help='Write the top queries to this .txt or .jsonl file for cache warming or relevancy test sets.',
+  )
+  parser.add_argument('--export-zero-results', action='store_true', help='Export zero-result queries instead of top queries.')
+  return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+  args = parse_args(argv or sys.argv[1:])
+
+  try:
+    stats = analyse_lines(iter_log_lines(args.logs), capacity=args.capacity)
+  except OSError as exc:
+    print(f'[search:query-log] {exc}', file=sys.stderr)
+    return 1
+
+  print(report_to_json(stats, top=args.top) if args.json else format_report(stats, top=args.top))
+
+  if args.export:
+    counter = stats.zero_result_queries if args.export_zero_results else stats.queries
+    export_top_queries(args.export, counter.top(args.top))
+    print(f'[search:query-log] Exported {min(args.top, len(counter.counts))} queries to {args.export}', file=sys.stderr)
+  return 0
+
+
+if __name__ == '__main__':
+  raise SystemExit(main())
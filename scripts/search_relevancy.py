@@ -1,18 +1,53 @@
 from __future__ import annotations
 
 import argparse
+import atexit
+import json
+import math
 import os
 import sys
-from dataclasses import dataclass
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Final
 
 from dotenv import load_dotenv
 from upstash_search import Search
 
+try:
+  from scripts.search_stats import percentile
+  from scripts.upstash_cassette import cassette_from_env, create_client
+except ModuleNotFoundError:  # run as `python3 scripts/search_relevancy.py`
+  from search_stats import percentile
+  from upstash_cassette import cassette_from_env, create_client
 
+
+REPO_ROOT: Final[Path] = Path(__file__).resolve().parents[1]
 DEFAULT_INDEX_NAME: Final[str] = 'default'
 DEFAULT_LIMIT: Final[int] = 10
+DEFAULT_CONCURRENCY: Final[int] = 8
+DEFAULT_SEMANTIC_WEIGHT: Final[float] = 0.5
+
+# Page aggregation mirrors production: domain.ts asks Upstash for 6x the page count and
+# responder.ts keeps one hit per canonical path, dropping scores below 0.01.
+FUSION_MODES: Final[tuple[str, ...]] = ('max', 'sum', 'rrf')
+RRF_K: Final[int] = 60
+MIN_RELEVANCY_SCORE: Final[float] = 0.01
+PAGE_OVERFETCH_FACTOR: Final[int] = 6
+UPSTASH_MAX_LIMIT: Final[int] = 100
+
+# --cache keeps raw hits on disk; entries expire after the TTL or when search-index.py
+# records a newer generation for the index in GENERATION_FILE.
+CACHE_FILE: Final[Path] = REPO_ROOT / '.cache' / 'search-relevancy' / 'results.json'
+GENERATION_FILE: Final[Path] = REPO_ROOT / '.cache' / 'search-index' / 'generations.json'
+DEFAULT_CACHE_TTL_SECONDS: Final[float] = 24 * 60 * 60
+DEFAULT_CACHE_MAX_ENTRIES: Final[int] = 2000
+CACHED_CONTENT_KEYS: Final[tuple[str, ...]] = ('title', 'name', 'path', 'url')
 
 
 @dataclass(slots=True)
@@ -22,10 +57,41 @@ class SearchRelevancyRow:
   score: float
 
 
+@dataclass(slots=True, frozen=True)
+class RelevancyQuery:
+  query: str
+  expected_paths: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class BatchQueryResult:
+  query: str
+  rows: list[SearchRelevancyRow] = field(default_factory=list)
+  error: str = ''
+  needed_limit: int | None = None
+
+
+@dataclass(slots=True)
+class PageSearchResult:
+  rows: list[SearchRelevancyRow]
+  pages: int
+  fetch_limit: int
+  chunks: int
+  fetches: int
+  # Chunk depth at which `pages` distinct pages were found; None when the index ran out first.
+  needed_limit: int | None
+
+  @property
+  def overfetch(self) -> float | None:
+    return None if self.needed_limit is None else self.needed_limit / self.pages
+
+
 def load_environment() -> None:
-  repo_root = Path(__file__).resolve().parents[1]
-  env_path = repo_root / '.env.development'
+  env_path = REPO_ROOT / '.env.development'
   if not env_path.exists():
+    cassette = cassette_from_env()
+    if cassette is not None and cassette.replay:
+      return
     raise ValueError('Missing .env.development. Create it locally before using this script.')
 
   load_dotenv(dotenv_path=env_path)
@@ -137,36 +203,1178 @@ def format_results_table(rows: list[SearchRelevancyRow], *, show_path: bool = Tr
   return '\n'.join([separator, header, separator, *body, separator])
 
 
-def run_search(*, query: str, limit: int, index_name: str | None = None, reranking: bool = False) -> list[SearchRelevancyRow]:
-  url, token, default_index_name = resolve_upstash_credentials()
-  client = Search(url=url, token=token)
+def read_index_generation(index_name: str, path: Path | None = None) -> str:
+  """Return the generation search-index.py last recorded for `index_name`, or '' if it never ran here."""
+  try:
+    generations = json.loads((path or GENERATION_FILE).read_text(encoding='utf-8'))
+  except (OSError, ValueError):
+    return ''
+  return str(generations.get(index_name) or '') if isinstance(generations, dict) else ''
+
+
+def slim_result(result: Any) -> dict[str, Any]:
+  """Keep only the fields the row builders read, so cache entries stay small."""
+  content = get_value(result, 'content') or {}
+  return {
+    'id': get_value(result, 'id'),
+    'score': get_value(result, 'score'),
+    'content': {key: get_value(content, key) for key in CACHED_CONTENT_KEYS if get_value(content, key) is not None},
+    'metadata': get_value(result, 'metadata') or {},
+  }
+
+
+class ResultCache:
+  """On-disk LRU of raw search hits with a TTL, invalidated per index generation."""
+
+  def __init__(
+    self,
+    path: Path | None = None,
+    *,
+    ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+    max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    clock: Callable[[], float] = time.time,
+  ) -> None:
+    self.path = path or CACHE_FILE
+    self.ttl_seconds = ttl_seconds
+    self.max_entries = max(max_entries, 1)
+    self.clock = clock
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    try:
+      stored = json.loads(self.path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+      stored = {}
+    entries = stored.get('entries') if isinstance(stored, dict) else None
+    if isinstance(entries, dict):
+      for key, entry in sorted(entries.items(), key=lambda item: item[1].get('used_at', 0)):
+        self._entries[key] = entry
+
+  @staticmethod
+  def key(*, index_name: str, query: str, limit: int, reranking: bool, semantic_weight: float) -> str:
+    return json.dumps([index_name, query, limit, reranking, semantic_weight])
+
+  def get(self, key: str, generation: str) -> list[dict[str, Any]] | None:
+    now = self.clock()
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None or entry.get('generation') != generation or now - entry.get('stored_at', 0) > self.ttl_seconds:
+        self._entries.pop(key, None)
+        self.misses += 1
+        return None
+      entry['used_at'] = now
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return entry['results']
+
+  def put(self, key: str, generation: str, results: list[Any]) -> None:
+    now = self.clock()
+    with self._lock:
+      self._entries[key] = {
+        'generation': generation,
+        'stored_at': now,
+        'used_at': now,
+        'results': [slim_result(result) for result in results],
+      }
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def save(self) -> None:
+    with self._lock:
+      payload = json.dumps({'entries': self._entries})
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = self.path.with_suffix('.tmp')
+    temporary.write_text(payload, encoding='utf-8')
+    temporary.replace(self.path)
+
+
+class CachedIndex:
+  def __init__(self, index: Any, name: str, cache: ResultCache, generation: str) -> None:
+    self._index = index
+    self._name = name
+    self._cache = cache
+    self._generation = generation
+
+  def search(
+    self,
+    query: str,
+    *,
+    limit: int,
+    reranking: bool = False,
+    semantic_weight: float = DEFAULT_SEMANTIC_WEIGHT,
+  ) -> list[Any]:
+    key = ResultCache.key(
+      index_name=self._name,
+      query=query,
+      limit=limit,
+      reranking=reranking,
+      semantic_weight=semantic_weight,
+    )
+    cached = self._cache.get(key, self._generation)
+    if cached is not None:
+      return cached
+    results = self._index.search(query, limit=limit, reranking=reranking, semantic_weight=semantic_weight)
+    self._cache.put(key, self._generation, results)
+    return results
+
+
+class CachedSearchClient:
+  """Wraps a Search client so `index(name).search(...)` is served from a ResultCache when possible."""
+
+  def __init__(self, client: Search, cache: ResultCache, generation_file: Path | None = None) -> None:
+    self._client = client
+    self._cache = cache
+    self._generation_file = generation_file
+
+  def index(self, name: str) -> CachedIndex:
+    return CachedIndex(self._client.index(name), name, self._cache, read_index_generation(name, self._generation_file))
+
+
+def report_cache(cache: ResultCache) -> None:
+  cache.save()
+  print(f'[search:relevancy] Result cache: {cache.hits} hits, {cache.misses} misses ({cache.path})', file=sys.stderr)
+
+
+def create_search_client(*, cache_ttl: float | None = None) -> tuple[Search | CachedSearchClient, str]:
+  """Return a client and the default index name. The client keeps one pooled HTTP connection set.
+
+  When UPSTASH_CASSETTE_RECORD or UPSTASH_CASSETTE_REPLAY is set, traffic goes through that cassette;
+  replay needs no credentials. `cache_ttl` opts into the on-disk result cache, saved at exit.
+  """
+  cassette = cassette_from_env()
+  if cassette is not None and cassette.replay:
+    default_index_name = (os.environ.get('UPSTASH_SEARCH_INDEX_NAME') or '').strip() or DEFAULT_INDEX_NAME
+    client = create_client('', '', cassette)
+  else:
+    url, token, default_index_name = resolve_upstash_credentials()
+    client = create_client(url, token, cassette)
+
+  if cache_ttl is None:
+    return client, default_index_name
+
+  cache = ResultCache(ttl_seconds=cache_ttl)
+  atexit.register(report_cache, cache)
+  return CachedSearchClient(client, cache), default_index_name
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+  parser.add_argument(
+    '--cache',
+    action='store_true',
+    help='Reuse results from .cache/search-relevancy until they expire or the index is re-indexed.',
+  )
+  parser.add_argument(
+    '--cache-ttl',
+    type=float,
+    default=DEFAULT_CACHE_TTL_SECONDS,
+    help='Seconds a cached result stays valid with --cache.',
+  )
+
+
+def cache_ttl_from_args(args: argparse.Namespace) -> float | None:
+  return args.cache_ttl if args.cache else None
+
+
+def run_search(
+  *,
+  query: str,
+  limit: int,
+  index_name: str | None = None,
+  reranking: bool = False,
+  semantic_weight: float = DEFAULT_SEMANTIC_WEIGHT,
+  client: Search | None = None,
+) -> list[SearchRelevancyRow]:
+  default_index_name = DEFAULT_INDEX_NAME
+  if client is None:
+    client, default_index_name = create_search_client()
   raw_results = client.index(index_name or default_index_name).search(
     query,
     limit=limit,
     reranking=reranking,
-    semantic_weight=0.5,
+    semantic_weight=semantic_weight,
   )
   return collect_search_relevancy_rows(raw_results)
 
 
-def parse_args(argv: list[str]) -> argparse.Namespace:
+def aggregate_pages(rows: list[SearchRelevancyRow], *, fusion: str = 'max') -> list[SearchRelevancyRow]:
+  """Collapse chunk hits into one row per canonical page, ordered by the fused score.
+
+  `max` keeps the best chunk score (what responder.ts shows), `sum` adds chunk scores, and
+  `rrf` adds 1 / (RRF_K + rank) for each chunk's position in the raw result list.
+  """
+  if fusion not in FUSION_MODES:
+    raise ValueError(f"Unknown fusion '{fusion}'. Expected one of: {', '.join(FUSION_MODES)}")
+
+  best: dict[str, SearchRelevancyRow] = {}
+  fused: dict[str, float] = {}
+  for rank, row in enumerate(rows, start=1):
+    if row.score < MIN_RELEVANCY_SCORE:
+      continue
+    path = canonical_page_path(row.path)
+    contribution = 1 / (RRF_K + rank) if fusion == 'rrf' else row.score
+    if path not in best or row.score > best[path].score:
+      best[path] = row
+    fused[path] = max(fused.get(path, 0.0), contribution) if fusion == 'max' else fused.get(path, 0.0) + contribution
+
+  # sorted() is stable, so ties keep the order Upstash returned the pages in.
+  ordered = sorted(best, key=lambda path: -fused[path])
+  return [SearchRelevancyRow(title=best[path].title, path=path, score=round(fused[path], 6)) for path in ordered]
+
+
+def pages_filled_at(rows: list[SearchRelevancyRow], pages: int) -> int | None:
+  """Return how many chunk hits it took to see `pages` distinct pages, or None if they never did."""
+  seen: set[str] = set()
+  for depth, row in enumerate(rows, start=1):
+    if row.score < MIN_RELEVANCY_SCORE:
+      continue
+    seen.add(canonical_page_path(row.path))
+    if len(seen) >= pages:
+      return depth
+  return None
+
+
+def run_page_search(
+  *,
+  query: str,
+  pages: int,
+  fusion: str = 'max',
+  index_name: str | None = None,
+  reranking: bool = False,
+  semantic_weight: float = DEFAULT_SEMANTIC_WEIGHT,
+  client: Search | None = None,
+) -> PageSearchResult:
+  """Fetch enough chunks to fill `pages` pages, doubling the Upstash limit until they fit or it caps out."""
+  default_index_name = DEFAULT_INDEX_NAME
+  if client is None:
+    client, default_index_name = create_search_client()
+  index = client.index(index_name or default_index_name)
+
+  limit = min(max(pages, 1) * PAGE_OVERFETCH_FACTOR, UPSTASH_MAX_LIMIT)
+  fetches = 0
+  while True:
+    raw_results = index.search(query, limit=limit, reranking=reranking, semantic_weight=semantic_weight)
+    fetches += 1
+    rows = collect_search_relevancy_rows(raw_results)
+    needed_limit = pages_filled_at(rows, pages)
+    if needed_limit is not None or len(raw_results) < limit or limit >= UPSTASH_MAX_LIMIT:
+      break
+    limit = min(limit * 2, UPSTASH_MAX_LIMIT)
+
+  return PageSearchResult(
+    rows=aggregate_pages(rows, fusion=fusion)[:pages],
+    pages=pages,
+    fetch_limit=limit,
+    chunks=len(raw_results),
+    fetches=fetches,
+    needed_limit=needed_limit,
+  )
+
+
+def format_overfetch(result: PageSearchResult) -> str:
+  fetched = f'{result.chunks} chunks (limit {result.fetch_limit}, {result.fetches} fetch{"es" if result.fetches != 1 else ""})'
+  if result.overfetch is None:
+    return f'{len(result.rows)} of {result.pages} pages from {fetched}; the index ran out of matching pages.'
+  return (
+    f'{result.pages} pages from {fetched}; filled by chunk {result.needed_limit} '
+    f'({result.overfetch:.1f}x over-fetch, production uses {PAGE_OVERFETCH_FACTOR}x).'
+  )
+
+
+def format_overfetch_summary(results: list[BatchQueryResult], pages: int) -> str:
+  filled = [result.needed_limit for result in results if result.needed_limit is not None]
+  short = sum(1 for result in results if not result.error and result.needed_limit is None)
+  if not filled:
+    return f'Over-fetch: no query filled {pages} pages ({short} ran out of matching pages).'
+  factors = [limit / pages for limit in filled]
+  return (
+    f'Over-fetch to fill {pages} pages: p50 {percentile(factors, 50):.1f}x, '
+    f'p90 {percentile(factors, 90):.1f}x, max {max(factors):.1f}x '
+    f'(production uses {PAGE_OVERFETCH_FACTOR}x; {short} queries ran out of matching pages).'
+  )
+
+
+def load_queries_file(path: Path) -> list[RelevancyQuery]:
+  """Read one query per line, or JSONL objects with `query` and optional `expected_paths`."""
+  queries: list[RelevancyQuery] = []
+
+  for line_number, line in enumerate(path.read_text(encoding='utf-8').splitlines(), start=1):
+    stripped = line.strip()
+    if not stripped or stripped.startswith('#'):
+      continue
+
+    if not stripped.startswith('{'):
+      queries.append(RelevancyQuery(query=stripped))
+      continue
+
+    try:
+      data = json.loads(stripped)
+    except ValueError as exc:
+      raise ValueError(f'{path}:{line_number}: invalid JSON ({exc})') from exc
+
+    query = str(get_value(data, 'query') or '').strip()
+    if not query:
+      raise ValueError(f"{path}:{line_number}: missing 'query'")
+
+    expected = get_value(data, 'expected_paths') or get_value(data, 'expected_path') or []
+    if isinstance(expected, str):
+      expected = [expected]
+    queries.append(RelevancyQuery(query=query, expected_paths=tuple(str(item).strip() for item in expected if str(item).strip())))
+
+  return queries
+
+
+def run_batch(
+  queries: list[RelevancyQuery],
+  *,
+  client: Search,
+  limit: int,
+  index_name: str,
+  reranking: bool = False,
+  semantic_weight: float = DEFAULT_SEMANTIC_WEIGHT,
+  concurrency: int = DEFAULT_CONCURRENCY,
+  fusion: str | None = None,
+) -> list[BatchQueryResult]:
+  """Run every query through one shared client on a bounded thread pool, preserving input order.
+
+  With `fusion`, each query is aggregated to pages and `limit` counts pages instead of chunks.
+  """
+
+  def run_one(item: RelevancyQuery) -> BatchQueryResult:
+    try:
+      if fusion:
+        page_result = run_page_search(
+          query=item.query,
+          pages=limit,
+          fusion=fusion,
+          index_name=index_name,
+          reranking=reranking,
+          semantic_weight=semantic_weight,
+          client=client,
+        )
+        return BatchQueryResult(query=item.query, rows=page_result.rows, needed_limit=page_result.needed_limit)
+      rows = run_search(
+        query=item.query,
+        limit=limit,
+        index_name=index_name,
+        reranking=reranking,
+        semantic_weight=semantic_weight,
+        client=client,
+      )
+    except Exception as exc:  # noqa: BLE001
+      return BatchQueryResult(query=item.query, error=str(exc))
+    return BatchQueryResult(query=item.query, rows=rows)
+
+  with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+    return list(executor.map(run_one, queries))
+
+
+def format_batch_table(results: list[BatchQueryResult], *, show_path: bool = True) -> str:
+  query_header = 'Query'
+  title_header = 'Result Title'
+  path_header = 'Path'
+  score_header = 'Relevancy Score'
+
+  lines: list[tuple[str, str, str, str]] = []
+  for result in results:
+    if result.error:
+      lines.append((result.query, f'(error: {result.error})', '', ''))
+    elif not result.rows:
+      lines.append((result.query, '(no results)', '', ''))
+    for index, row in enumerate(result.rows):
+      lines.append((result.query if index == 0 else '', row.title, row.path, format_score(row.score)))
+
+  query_width = max([len(query_header), *(len(line[0]) for line in lines)])
+  title_width = max([len(title_header), *(len(line[1]) for line in lines)])
+  path_width = max([len(path_header), *(len(line[2]) for line in lines)])
+  score_width = max([len(score_header), *(len(line[3]) for line in lines)])
+
+  if show_path:
+    separator = f'+-{'-' * query_width}-+-{'-' * title_width}-+-{'-' * path_width}-+-{'-' * score_width}-+'
+    header = (
+      f'| {query_header.ljust(query_width)} | {title_header.ljust(title_width)} | '
+      f'{path_header.ljust(path_width)} | {score_header.rjust(score_width)} |'
+    )
+    body = [
+      f'| {query.ljust(query_width)} | {title.ljust(title_width)} | {path.ljust(path_width)} | {score.rjust(score_width)} |'
+      for query, title, path, score in lines
+    ]
+    return '\n'.join([separator, header, separator, *body, separator])
+
+  separator = f'+-{'-' * query_width}-+-{'-' * title_width}-+-{'-' * score_width}-+'
+  header = f'| {query_header.ljust(query_width)} | {title_header.ljust(title_width)} | {score_header.rjust(score_width)} |'
+  body = [
+    f'| {query.ljust(query_width)} | {title.ljust(title_width)} | {score.rjust(score_width)} |'
+    for query, title, _path, score in lines
+  ]
+  return '\n'.join([separator, header, separator, *body, separator])
+
+
+def format_batch_jsonl(results: list[BatchQueryResult]) -> str:
+  lines = []
+  for result in results:
+    payload: dict[str, Any] = {'query': result.query, 'results': [asdict(row) for row in result.rows]}
+    if result.error:
+      payload['error'] = result.error
+    lines.append(json.dumps(payload))
+  return '\n'.join(lines)
+
+
+@dataclass(slots=True, frozen=True)
+class SearchConfig:
+  reranking: bool
+  semantic_weight: float
+  limit: int = DEFAULT_LIMIT
+
+  @property
+  def label(self) -> str:
+    return f"reranking={'on' if self.reranking else 'off'} semantic_weight={self.semantic_weight:g} limit={self.limit}"
+
+
+@dataclass(slots=True)
+class BenchSummary:
+  reranking: bool
+  semantic_weight: float
+  limit: int
+  requests: int
+  errors: int
+  error_rate: float
+  p50_ms: float
+  p95_ms: float
+  p99_ms: float
+  throughput_rps: float
+  wall_seconds: float
+
+
+def build_search_configs(*, reranking_modes: list[bool], semantic_weights: list[float], limits: list[int]) -> list[SearchConfig]:
+  return [
+    SearchConfig(reranking=reranking, semantic_weight=weight, limit=limit)
+    for reranking in reranking_modes
+    for weight in semantic_weights
+    for limit in limits
+  ]
+
+
+def time_query(
+  *,
+  client: Search,
+  index_name: str,
+  config: SearchConfig,
+  query: str,
+  clock: Callable[[], float] = time.perf_counter,
+) -> tuple[float, list[SearchRelevancyRow] | None, str]:
+  """Run one query and return (latency in ms, rows or None on error, error message)."""
+  started = clock()
+  try:
+    rows = run_search(
+      query=query,
+      limit=config.limit,
+      index_name=index_name,
+      reranking=config.reranking,
+      semantic_weight=config.semantic_weight,
+      client=client,
+    )
+  except Exception as exc:  # noqa: BLE001
+    return (clock() - started) * 1000, None, str(exc)
+  return (clock() - started) * 1000, rows, ''
+
+
+def benchmark_config(
+  queries: list[RelevancyQuery],
+  *,
+  client: Search,
+  index_name: str,
+  config: SearchConfig,
+  repeat: int = 1,
+  concurrency: int = DEFAULT_CONCURRENCY,
+  warmup: int = 0,
+  clock: Callable[[], float] = time.perf_counter,
+) -> BenchSummary:
+  """Replay `queries` `repeat` times after `warmup` discarded requests and summarise latency."""
+  workload = [item.query for item in queries] * max(repeat, 1)
+  warmup_queries = [queries[index % len(queries)].query for index in range(warmup)] if queries else []
+
+  def run_one(query: str) -> tuple[float, list[SearchRelevancyRow] | None, str]:
+    return time_query(client=client, index_name=index_name, config=config, query=query, clock=clock)
+
+  with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+    list(executor.map(run_one, warmup_queries))
+    started = clock()
+    samples = list(executor.map(run_one, workload))
+    wall_seconds = clock() - started
+
+  latencies = [latency for latency, rows, _error in samples if rows is not None]
+  errors = len(samples) - len(latencies)
+  return BenchSummary(
+    reranking=config.reranking,
+    semantic_weight=config.semantic_weight,
+    limit=config.limit,
+    requests=len(samples),
+    errors=errors,
+    error_rate=round(errors / len(samples), 4) if samples else 0.0,
+    p50_ms=round(percentile(latencies, 50), 2),
+    p95_ms=round(percentile(latencies, 95), 2),
+    p99_ms=round(percentile(latencies, 99), 2),
+    throughput_rps=round(len(samples) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    wall_seconds=round(wall_seconds, 3),
+  )
+
+
+def format_grid(headers: list[str], rows: list[list[str]]) -> str:
+  """Right-aligned box table used by the bench and sweep reports."""
+  widths = [max(len(header), *(len(row[index]) for row in rows)) for index, header in enumerate(headers)]
+  separator = '+-' + '-+-'.join('-' * width for width in widths) + '-+'
+  header = '| ' + ' | '.join(header.rjust(widths[index]) for index, header in enumerate(headers)) + ' |'
+  body = ['| ' + ' | '.join(value.rjust(widths[index]) for index, value in enumerate(row)) + ' |' for row in rows]
+  return '\n'.join([separator, header, separator, *body, separator])
+
+
+def format_bench_table(summaries: list[BenchSummary]) -> str:
+  headers = ['Reranking', 'Semantic Weight', 'Limit', 'Requests', 'Errors', 'p50 ms', 'p95 ms', 'p99 ms', 'Req/s']
+  rows = [
+    [
+      'on' if summary.reranking else 'off',
+      f'{summary.semantic_weight:g}',
+      str(summary.limit),
+      str(summary.requests),
+      f'{summary.errors} ({summary.error_rate:.1%})',
+      f'{summary.p50_ms:.1f}',
+      f'{summary.p95_ms:.1f}',
+      f'{summary.p99_ms:.1f}',
+      f'{summary.throughput_rps:.1f}',
+    ]
+    for summary in summaries
+  ]
+  return format_grid(headers, rows)
+
+
+def parse_float_list(value: str) -> list[float]:
+  return [float(item) for item in value.split(',') if item.strip()]
+
+
+def parse_int_list(value: str) -> list[int]:
+  return [int(item) for item in value.split(',') if item.strip()]
+
+
+def parse_reranking_modes(value: str) -> list[bool]:
+  return {'off': [False], 'on': [True], 'both': [False, True]}[value]
+
+
+def parse_bench_args(argv: list[str]) -> argparse.Namespace:
   parser = argparse.ArgumentParser(
-    description='Query Upstash Search and print article relevancy scores in a table.'
+    prog='search_relevancy.py --bench',
+    description='Replay a query set against Upstash Search and report latency percentiles per configuration.',
   )
-  parser.add_argument('query', help='Search query. Wrap multi-word queries in quotes.')
+  parser.add_argument('--queries-file', type=Path, required=True, help='Query set (.txt or .jsonl).')
+  parser.add_argument('--repeat', type=int, default=3, help='Times to replay the query set per configuration.')
+  parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallel in-flight queries.')
+  parser.add_argument('--warmup', type=int, default=5, help='Discarded requests before timing each configuration.')
+  parser.add_argument('--reranking', choices=('off', 'on', 'both'), default='both', help='Reranking modes to benchmark.')
+  parser.add_argument('--semantic-weights', type=parse_float_list, default=[DEFAULT_SEMANTIC_WEIGHT], help='Comma-separated semantic_weight values.')
   parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Maximum Upstash results to request.')
   parser.add_argument('--index-name', default=None, help='Override the Upstash index name.')
+  parser.add_argument('--output', type=Path, default=None, help='Write the results as JSON to this path.')
+  return parser.parse_args(argv)
+
+
+def bench_main(argv: list[str]) -> int:
+  args = parse_bench_args(argv)
+
+  try:
+    load_environment()
+    queries = load_queries_file(args.queries_file)
+    client, default_index_name = create_search_client()
+  except Exception as exc:  # noqa: BLE001
+    print(f'[search:relevancy] {exc}', file=sys.stderr)
+    return 1
+
+  if not queries:
+    print(f'[search:relevancy] No queries found in {args.queries_file}', file=sys.stderr)
+    return 1
+
+  index_name = args.index_name or default_index_name
+  configs = build_search_configs(
+    reranking_modes=parse_reranking_modes(args.reranking),
+    semantic_weights=args.semantic_weights,
+    limits=[args.limit],
+  )
+
+  summaries: list[BenchSummary] = []
+  for config in configs:
+    print(f'[search:relevancy] Benchmarking {config.label}...', file=sys.stderr)
+    summaries.append(benchmark_config(
+      queries,
+      client=client,
+      index_name=index_name,
+      config=config,
+      repeat=args.repeat,
+      concurrency=args.concurrency,
+      warmup=args.warmup,
+    ))
+
+  print(format_bench_table(summaries))
+
+  if args.output:
+    payload = {
+      'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+      'index': index_name,
+      'queries': len(queries),
+      'repeat': args.repeat,
+      'concurrency': args.concurrency,
+      'warmup': args.warmup,
+      'results': [asdict(summary) for summary in summaries],
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(payload, indent=2) + '\n', encoding='utf-8')
+    print(f'[search:relevancy] Wrote {args.output}', file=sys.stderr)
+
+  return 0
+
+
+def canonical_page_path(path: str) -> str:
+  """Collapse chunk ids and trailing slashes to the page path, like responder.ts does."""
+  return path.split('#', 1)[0].split('?', 1)[0].rstrip('/') or '/'
+
+
+def ranked_page_paths(rows: list[SearchRelevancyRow]) -> list[str]:
+  paths: list[str] = []
+  for row in rows:
+    path = canonical_page_path(row.path)
+    if path not in paths:
+      paths.append(path)
+  return paths
+
+
+def ndcg_at_k(ranked: list[str], expected: set[str], k: int) -> float:
+  """Binary-relevance nDCG@k over page paths."""
+  if not expected:
+    return 0.0
+  dcg = sum(1 / math.log2(position + 2) for position, path in enumerate(ranked[:k]) if path in expected)
+  ideal = sum(1 / math.log2(position + 2) for position in range(min(len(expected), k)))
+  return dcg / ideal if ideal else 0.0
+
+
+def reciprocal_rank(ranked: list[str], expected: set[str]) -> float:
+  for position, path in enumerate(ranked, start=1):
+    if path in expected:
+      return 1 / position
+  return 0.0
+
+
+@dataclass(slots=True)
+class SweepSummary:
+  reranking: bool
+  semantic_weight: float
+  limit: int
+  queries: int
+  errors: int
+  ndcg: float
+  mrr: float
+  p50_ms: float
+  p95_ms: float
+  meets_target: bool = False
+
+
+def run_sweep(
+  queries: list[RelevancyQuery],
+  *,
+  client: Search,
+  index_name: str,
+  configs: list[SearchConfig],
+  k: int = DEFAULT_LIMIT,
+  concurrency: int = DEFAULT_CONCURRENCY,
+) -> list[SweepSummary]:
+  """Evaluate every (configuration, labelled query) pair on one thread pool."""
+  pairs = [(config, item) for config in configs for item in queries]
+
+  def run_one(pair: tuple[SearchConfig, RelevancyQuery]) -> tuple[float, list[SearchRelevancyRow] | None, str]:
+    config, item = pair
+    return time_query(client=client, index_name=index_name, config=config, query=item.query)
+
+  with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+    samples = list(executor.map(run_one, pairs))
+
+  summaries: list[SweepSummary] = []
+  for config_index, config in enumerate(configs):
+    config_samples = samples[config_index * len(queries):(config_index + 1) * len(queries)]
+    ndcgs: list[float] = []
+    reciprocal_ranks: list[float] = []
+    latencies: list[float] = []
+    errors = 0
+
+    for item, (latency, rows, _error) in zip(queries, config_samples):
+      if rows is None:
+        errors += 1
+        ndcgs.append(0.0)
+        reciprocal_ranks.append(0.0)
+        continue
+      expected = {canonical_page_path(path) for path in item.expected_paths}
+      ranked = ranked_page_paths(rows)
+      ndcgs.append(ndcg_at_k(ranked, expected, k))
+      reciprocal_ranks.append(reciprocal_rank(ranked, expected))
+      latencies.append(latency)
+
+    summaries.append(SweepSummary(
+      reranking=config.reranking,
+      semantic_weight=config.semantic_weight,
+      limit=config.limit,
+      queries=len(queries),
+      errors=errors,
+      ndcg=round(sum(ndcgs) / len(ndcgs), 4) if ndcgs else 0.0,
+      mrr=round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4) if reciprocal_ranks else 0.0,
+      p50_ms=round(percentile(latencies, 50), 2),
+      p95_ms=round(percentile(latencies, 95), 2),
+    ))
+
+  return summaries
+
+
+def pick_cheapest(summaries: list[SweepSummary], *, min_ndcg: float = 0.0, min_mrr: float = 0.0) -> SweepSummary | None:
+  """Cheapest configuration meeting the quality bar: no reranking first, then smallest limit, then latency."""
+  passing = [summary for summary in summaries if summary.errors == 0 and summary.ndcg >= min_ndcg and summary.mrr >= min_mrr]
+  for summary in summaries:
+    summary.meets_target = summary in passing
+  if not passing:
+    return None
+  return min(passing, key=lambda summary: (summary.reranking, summary.limit, summary.p50_ms))
+
+
+def format_sweep_table(summaries: list[SweepSummary], *, k: int, cheapest: SweepSummary | None = None) -> str:
+  headers = [' ', 'Reranking', 'Semantic Weight', 'Limit', f'nDCG@{k}', 'MRR', 'p50 ms', 'p95 ms', 'Errors']
+  rows = [
+    [
+      '*' if summary is cheapest else ('+' if summary.meets_target else ''),
+      'on' if summary.reranking else 'off',
+      f'{summary.semantic_weight:g}',
+      str(summary.limit),
+      f'{summary.ndcg:.3f}',
+      f'{summary.mrr:.3f}',
+      f'{summary.p50_ms:.1f}',
+      f'{summary.p95_ms:.1f}',
+      str(summary.errors),
+    ]
+    for summary in summaries
+  ]
+  return format_grid(headers, rows)
+
+
+def parse_sweep_args(argv: list[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+    prog='search_relevancy.py --sweep',
+    description='Evaluate a grid of search parameters against a labelled query set (JSONL with expected_paths).',
+  )
+  parser.add_argument('--queries-file', type=Path, required=True, help='Labelled query set (.jsonl with expected_paths).')
+  parser.add_argument('--semantic-weights', type=parse_float_list, default=[0.0, 0.25, 0.5, 0.75, 1.0], help='Comma-separated semantic_weight values.')
+  parser.add_argument('--reranking', choices=('off', 'on', 'both'), default='both', help='Reranking modes to evaluate.')
+  parser.add_argument('--limits', type=parse_int_list, default=[DEFAULT_LIMIT], help='Comma-separated result limits.')
+  parser.add_argument('--k', type=int, default=DEFAULT_LIMIT, help='Cut-off for nDCG@k.')
+  parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallel in-flight queries.')
+  parser.add_argument('--min-ndcg', type=float, default=0.0, help='Quality bar used to pick the cheapest configuration.')
+  parser.add_argument('--min-mrr', type=float, default=0.0, help='Quality bar used to pick the cheapest configuration.')
+  parser.add_argument('--index-name', default=None, help='Override the Upstash index name.')
+  parser.add_argument('--output', type=Path, default=None, help='Write the results as JSON to this path.')
+  # No --cache, as with bench: cached hits would make the latency columns and the cheapest-config tie-break meaningless.
+  return parser.parse_args(argv)
+
+
+def sweep_main(argv: list[str]) -> int:
+  args = parse_sweep_args(argv)
+
+  try:
+    load_environment()
+    queries = [item for item in load_queries_file(args.queries_file) if item.expected_paths]
+    client, default_index_name = create_search_client()
+  except Exception as exc:  # noqa: BLE001
+    print(f'[search:relevancy] {exc}', file=sys.stderr)
+    return 1
+
+  if not queries:
+    print(f'[search:relevancy] No labelled queries (with expected_paths) in {args.queries_file}', file=sys.stderr)
+    return 1
+
+  index_name = args.index_name or default_index_name
+  configs = build_search_configs(
+    reranking_modes=parse_reranking_modes(args.reranking),
+    semantic_weights=args.semantic_weights,
+    limits=args.limits,
+  )
+  print(f'[search:relevancy] Sweeping {len(configs)} configurations x {len(queries)} queries...', file=sys.stderr)
+
+  summaries = run_sweep(queries, client=client, index_name=index_name, configs=configs, k=args.k, concurrency=args.concurrency)
+  cheapest = pick_cheapest(summaries, min_ndcg=args.min_ndcg, min_mrr=args.min_mrr)
+
+  print(format_sweep_table(summaries, k=args.k, cheapest=cheapest))
+  if cheapest:
+    print(f'\nCheapest configuration meeting the bar (*): {SearchConfig(cheapest.reranking, cheapest.semantic_weight, cheapest.limit).label}')
+  else:
+    print('\nNo configuration meets the quality bar.')
+
+  if args.output:
+    payload = {
+      'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+      'index': index_name,
+      'queries': len(queries),
+      'k': args.k,
+      'results': [asdict(summary) for summary in summaries],
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(payload, indent=2) + '\n', encoding='utf-8')
+    print(f'[search:relevancy] Wrote {args.output}', file=sys.stderr)
+
+  return 0
+
+
+# Golden-ranking snapshots store only ranked page paths (no scores), one path per
+# line, so a snapshot diff in git shows exactly which pages moved.
+SNAPSHOT_VERSION: Final[int] = 1
+DEFAULT_MIN_TAU: Final[float] = 0.8
+DEFAULT_MIN_OVERLAP: Final[float] = 0.8
+
+
+@dataclass(slots=True)
+class RankingSnapshot:
+  reranking: bool
+  semantic_weight: float
+  limit: int
+  k: int
+  rankings: dict[str, list[str]] = field(default_factory=dict)
+
+  @property
+  def config(self) -> SearchConfig:
+    return SearchConfig(reranking=self.reranking, semantic_weight=self.semantic_weight, limit=self.limit)
+
+
+@dataclass(slots=True)
+class RankingDiff:
+  query: str
+  tau: float
+  overlap: float
+  shifts: dict[str, int] = field(default_factory=dict)
+  dropped: list[str] = field(default_factory=list)
+  added: list[str] = field(default_factory=list)
+
+  def regressed(self, *, min_tau: float, min_overlap: float) -> bool:
+    return self.tau < min_tau or self.overlap < min_overlap
+
+
+def take_snapshot(
+  queries: list[RelevancyQuery],
+  *,
+  client: Search,
+  index_name: str,
+  config: SearchConfig,
+  k: int,
+  concurrency: int = DEFAULT_CONCURRENCY,
+) -> RankingSnapshot:
+  results = run_batch(
+    queries,
+    client=client,
+    limit=config.limit,
+    index_name=index_name,
+    reranking=config.reranking,
+    semantic_weight=config.semantic_weight,
+    concurrency=concurrency,
+  )
+  failed = [result.query for result in results if result.error]
+  if failed:
+    raise RuntimeError(f"Search failed for {len(failed)} queries: {', '.join(failed)}")
+
+  return RankingSnapshot(
+    reranking=config.reranking,
+    semantic_weight=config.semantic_weight,
+    limit=config.limit,
+    k=k,
+    rankings={result.query: ranked_page_paths(result.rows)[:k] for result in results},
+  )
+
+
+def snapshot_to_json(snapshot: RankingSnapshot) -> str:
+  payload = {
+    'version': SNAPSHOT_VERSION,
+    'config': {
+      'reranking': snapshot.reranking,
+      'semantic_weight': snapshot.semantic_weight,
+      'limit': snapshot.limit,
+      'k': snapshot.k,
+    },
+    'rankings': dict(sorted(snapshot.rankings.items())),
+  }
+  return json.dumps(payload, indent=2, ensure_ascii=False) + '\n'
+
+
+def load_snapshot(path: Path) -> RankingSnapshot:
+  data = json.loads(path.read_text(encoding='utf-8'))
+  if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+    raise ValueError(f'{path} is not a version {SNAPSHOT_VERSION} ranking snapshot')
+  config = data.get('config') or {}
+  return RankingSnapshot(
+    reranking=bool(config.get('reranking')),
+    semantic_weight=float(config.get('semantic_weight', DEFAULT_SEMANTIC_WEIGHT)),
+    limit=int(config.get('limit') or DEFAULT_LIMIT),
+    k=int(config.get('k') or DEFAULT_LIMIT),
+    rankings={str(query): [str(path) for path in paths] for query, paths in (data.get('rankings') or {}).items()},
+  )
+
+
+def kendall_tau(before: list[str], after: list[str]) -> float:
+  """Kendall tau over the items both rankings share; 1.0 when fewer than two are shared."""
+  after_positions = {path: position for position, path in enumerate(after)}
+  shared = [path for path in before if path in after_positions]
+  if len(shared) < 2:
+    return 1.0
+
+  concordant = discordant = 0
+  for i, first in enumerate(shared):
+    for second in shared[i + 1:]:
+      if after_positions[first] < after_positions[second]:
+        concordant += 1
+      else:
+        discordant += 1
+  return (concordant - discordant) / (concordant + discordant)
+
+
+def top_k_overlap(before: list[str], after: list[str], k: int) -> float:
+  expected = before[:k]
+  if not expected:
+    return 1.0 if not after[:k] else 0.0
+  return len(set(expected) & set(after[:k])) / len(expected)
+
+
+def diff_ranking(query: str, before: list[str], after: list[str], k: int) -> RankingDiff:
+  after_positions = {path: position for position, path in enumerate(after[:k])}
+  before_positions = {path: position for position, path in enumerate(before[:k])}
+  return RankingDiff(
+    query=query,
+    tau=round(kendall_tau(before[:k], after[:k]), 4),
+    overlap=round(top_k_overlap(before, after, k), 4),
+    shifts={
+      path: after_positions[path] - position
+      for path, position in before_positions.items()
+      if path in after_positions and after_positions[path] != position
+    },
+    dropped=[path for path in before[:k] if path not in after_positions],
+    added=[path for path in after[:k] if path not in before_positions],
+  )
+
+
+def diff_snapshots(golden: RankingSnapshot, current: RankingSnapshot) -> list[RankingDiff]:
+  k = min(golden.k, current.k)
+  return [
+    diff_ranking(query, before, current.rankings.get(query, []), k)
+    for query, before in sorted(golden.rankings.items())
+  ]
+
+
+def format_ranking_diffs(diffs: list[RankingDiff], *, min_tau: float, min_overlap: float) -> str:
+  lines: list[str] = []
+  for diff in diffs:
+    status = 'REGRESSED' if diff.regressed(min_tau=min_tau, min_overlap=min_overlap) else 'ok'
+    lines.append(f'{status:<9} tau={diff.tau:+.3f} overlap={diff.overlap:.0%}  {diff.query}')
+    for path, shift in sorted(diff.shifts.items(), key=lambda item: -abs(item[1])):
+      lines.append(f"            {'down' if shift > 0 else 'up':<4} {abs(shift):>2}  {path}")
+    lines.extend(f'            -        {path}' for path in diff.dropped)
+    lines.extend(f'            +        {path}' for path in diff.added)
+
+  regressions = sum(1 for diff in diffs if diff.regressed(min_tau=min_tau, min_overlap=min_overlap))
+  mean_tau = sum(diff.tau for diff in diffs) / len(diffs) if diffs else 1.0
+  mean_overlap = sum(diff.overlap for diff in diffs) / len(diffs) if diffs else 1.0
+  lines.append('')
+  lines.append(
+    f'{regressions} of {len(diffs)} queries regressed '
+    f'(mean tau {mean_tau:+.3f}, mean top-k overlap {mean_overlap:.0%}; '
+    f'thresholds tau>={min_tau:g}, overlap>={min_overlap:.0%}).'
+  )
+  return '\n'.join(lines)
+
+
+def parse_snapshot_args(argv: list[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+    prog='search_relevancy.py --snapshot',
+    description='Record ranked page paths for a query set as a golden snapshot.',
+  )
+  parser.add_argument('--queries-file', type=Path, required=True, help='Query set (.txt or .jsonl).')
+  parser.add_argument('--output', type=Path, required=True, help='Snapshot file to write.')
+  parser.add_argument('--k', type=int, default=DEFAULT_LIMIT, help='Number of ranked pages to keep per query.')
+  parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Maximum Upstash results to request.')
+  parser.add_argument('--reranking', action='store_true', help='Enable Upstash reranking.')
+  parser.add_argument('--semantic-weight', type=float, default=DEFAULT_SEMANTIC_WEIGHT, help='semantic_weight to query with.')
+  parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallel in-flight queries.')
+  parser.add_argument('--index-name', default=None, help='Override the Upstash index name.')
+  add_cache_arguments(parser)
+  return parser.parse_args(argv)
+
+
+def snapshot_main(argv: list[str]) -> int:
+  args = parse_snapshot_args(argv)
+
+  try:
+    load_environment()
+    queries = load_queries_file(args.queries_file)
+    client, default_index_name = create_search_client(cache_ttl=cache_ttl_from_args(args))
+    snapshot = take_snapshot(
+      queries,
+      client=client,
+      index_name=args.index_name or default_index_name,
+      config=SearchConfig(reranking=args.reranking, semantic_weight=args.semantic_weight, limit=args.limit),
+      k=args.k,
+      concurrency=args.concurrency,
+    )
+  except Exception as exc:  # noqa: BLE001
+    print(f'[search:relevancy] {exc}', file=sys.stderr)
+    return 1
+
+  args.output.parent.mkdir(parents=True, exist_ok=True)
+  args.output.write_text(snapshot_to_json(snapshot), encoding='utf-8')
+  print(f'[search:relevancy] Recorded {len(snapshot.rankings)} rankings to {args.output}')
+  return 0
+
+
+def parse_diff_args(argv: list[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+    prog='search_relevancy.py --diff',
+    description='Compare current rankings (or a second snapshot) against a golden snapshot.',
+  )
+  parser.add_argument('snapshot', type=Path, help='Golden snapshot file.')
+  parser.add_argument('--against', type=Path, default=None, help='Compare with this snapshot instead of querying Upstash.')
+  parser.add_argument('--min-tau', type=float, default=DEFAULT_MIN_TAU, help='Kendall tau below this is a regression.')
+  parser.add_argument('--min-overlap', type=float, default=DEFAULT_MIN_OVERLAP, help='Top-k overlap below this is a regression.')
+  parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallel in-flight queries.')
+  parser.add_argument('--index-name', default=None, help='Override the Upstash index name.')
+  add_cache_arguments(parser)
+  return parser.parse_args(argv)
+
+
+def diff_main(argv: list[str]) -> int:
+  args = parse_diff_args(argv)
+
+  try:
+    golden = load_snapshot(args.snapshot)
+    if args.against:
+      current = load_snapshot(args.against)
+    else:
+      load_environment()
+      client, default_index_name = create_search_client(cache_ttl=cache_ttl_from_args(args))
+      current = take_snapshot(
+        [RelevancyQuery(query=query) for query in golden.rankings],
+        client=client,
+        index_name=args.index_name or default_index_name,
+        config=golden.config,
+        k=golden.k,
+        concurrency=args.concurrency,
+      )
+  except Exception as exc:  # noqa: BLE001
+    print(f'[search:relevancy] {exc}', file=sys.stderr)
+    return 1
+
+  diffs = diff_snapshots(golden, current)
+  print(format_ranking_diffs(diffs, min_tau=args.min_tau, min_overlap=args.min_overlap))
+  regressed = any(diff.regressed(min_tau=args.min_tau, min_overlap=args.min_overlap) for diff in diffs)
+  return 1 if regressed else 0
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+    description='Query Upstash Search and print article relevancy scores in a table.',
+    epilog=(
+      'Other modes, selected by a first argument of --bench (latency benchmark), --sweep (parameter grid), '
+      '--snapshot (record golden rankings) or --diff (compare against a snapshot); '
+      'run e.g. `search_relevancy.py --bench --help`. A positional argument is always a search query. '
+      'Set UPSTASH_CASSETTE_RECORD or UPSTASH_CASSETTE_REPLAY to record or replay Upstash traffic.'
+    ),
+  )
+  parser.add_argument('query', nargs='?', help='Search query. Wrap multi-word queries in quotes.')
+  parser.add_argument('--queries-file', type=Path, default=None, help='Run every query in a .txt (one per line) or .jsonl file.')
+  parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallel queries in --queries-file mode.')
+  parser.add_argument('--format', choices=('table', 'jsonl'), default='table', help='Output format for --queries-file mode.')
+  parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Maximum Upstash results (or pages with --aggregate).')
+  parser.add_argument('--index-name', default=None, help='Override the Upstash index name.')
   parser.add_argument('--reranking', action='store_true', help='Enable Upstash reranking for the query.')
+  parser.add_argument(
+    '--aggregate',
+    choices=FUSION_MODES,
+    default=None,
+    help='Collapse chunk hits into pages with this score fusion; --limit then counts pages.',
+  )
   parser.add_argument('--hide-path', action='store_true', help='Hide the path column from the output table.')
-  return parser.parse_args(argv)
+  add_cache_arguments(parser)
+  args = parser.parse_args(argv)
+  if bool(args.query) == bool(args.queries_file):
+    parser.error('provide either a query or --queries-file')
+  return args
+
+
+def run_batch_mode(args: argparse.Namespace) -> int:
+  try:
+    load_environment()
+    queries = load_queries_file(args.queries_file)
+    client, default_index_name = create_search_client(cache_ttl=cache_ttl_from_args(args))
+  except Exception as exc:  # noqa: BLE001
+    print(f'[search:relevancy] {exc}', file=sys.stderr)
+    return 1
+
+  results = run_batch(
+    queries,
+    client=client,
+    limit=args.limit,
+    index_name=args.index_name or default_index_name,
+    reranking=args.reranking,
+    concurrency=args.concurrency,
+    fusion=args.aggregate,
+  )
+
+  if args.format == 'jsonl':
+    print(format_batch_jsonl(results))
+  else:
+    print(format_batch_table(results, show_path=not args.hide_path))
+    if args.aggregate:
+      print(format_overfetch_summary(results, args.limit))
+
+  errors = sum(1 for result in results if result.error)
+  if errors:
+    print(f'[search:relevancy] {errors} of {len(results)} queries failed.', file=sys.stderr)
+    return 1
+  return 0
+
+
+# Flags rather than bare words, so searching for "bench" or "diff" still runs a query.
+MODES: Final[dict[str, Callable[[list[str]], int]]] = {
+  '--bench': bench_main,
+  '--sweep': sweep_main,
+  '--snapshot': snapshot_main,
+  '--diff': diff_main,
+}
 
 
 def main(argv: list[str] | None = None) -> int:
-  args = parse_args(argv or sys.argv[1:])
+  if argv is None:
+    argv = sys.argv[1:]
+  if argv and argv[0] in MODES:
+    return MODES[argv[0]](argv[1:])
+
+  args = parse_args(argv)
 
+  if args.queries_file:
+    return run_batch_mode(args)
+
+  page_result: PageSearchResult | None = None
   try:
     load_environment()
-    rows = run_search(query=args.query, limit=args.limit, index_name=args.index_name, reranking=args.reranking)
+    client, default_index_name = create_search_client(cache_ttl=cache_ttl_from_args(args))
+    index_name = args.index_name or default_index_name
+    if args.aggregate:
+      page_result = run_page_search(
+        query=args.query,
+        pages=args.limit,
+        fusion=args.aggregate,
+        index_name=index_name,
+        reranking=args.reranking,
+        client=client,
+      )
+      rows = page_result.rows
+    else:
+      rows = run_search(query=args.query, limit=args.limit, index_name=index_name, reranking=args.reranking, client=client)
   except Exception as exc:  # noqa: BLE001
     print(f'[search:relevancy] {exc}', file=sys.stderr)
     return 1
@@ -176,6 +1384,8 @@ def main(argv: list[str] | None = None) -> int:
     return 0
 
   print(format_results_table(rows, show_path=not args.hide_path))
+  if page_result is not None:
+    print(format_overfetch(page_result))
   return 0
 
 
@@ -0,0 +1,20 @@
+"""
+Summary statistics shared by the search scripts.
+
+search-index.py reports warm-up latency and search_relevancy.py reports benchmark,
+sweep and over-fetch figures; both import `percentile` from here so their numbers
+are computed the same way.
+"""
+
+from __future__ import annotations
+
+
+def percentile(values: list[float], pct: float) -> float:
+  """Linear-interpolated percentile (`pct` in 0-100); 0.0 for an empty list."""
+  if not values:
+    return 0.0
+  ordered = sorted(values)
+  rank = (len(ordered) - 1) * min(max(pct, 0.0), 100.0) / 100
+  low = int(rank)
+  high = min(low + 1, len(ordered) - 1)
+  return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
@@ -1,9 +1,19 @@
+import json
+import subprocess
+from pathlib import Path
 from types import SimpleNamespace
 
 from scripts.search_content_lengths import (
+  ChunkSize,
   OversizedContentRow,
+  build_size_report,
+  collect_chunk_sizes,
   collect_oversized_content_rows,
   format_oversized_content_table,
+  format_size_report,
+  main,
+  read_staged_text,
+  size_report_to_json,
 )
 
 
@@ -15,6 +25,13 @@ def test_collect_oversized_content_rows_filters_and_sorts(monkeypatch) -> None:
     section_heading='',
     section_content='x' * 100,
   )
+  accented_chunk = SimpleNamespace(
+    source_path='src/content/articles/cafe/index.mdx',
+    id='/articles/cafe#chunk-0',
+    title='Cafe',
+    section_heading='',
+    section_content='\u00e9' * 2100,
+  )
   large_chunk = SimpleNamespace(
     source_path='src/content/articles/long/index.mdx',
     id='/articles/long#chunk-0',
@@ -36,7 +53,7 @@ def test_collect_oversized_content_rows_filters_and_sorts(monkeypatch) -> None:
     SimpleNamespace(id='p3'),
   ]
 
-  chunk_map = {'p1': [small_chunk], 'p2': [large_chunk], 'p3': [medium_chunk]}
+  chunk_map = {'p1': [small_chunk, accented_chunk], 'p2': [large_chunk], 'p3': [medium_chunk]}
 
   monkeypatch.setattr(
     'scripts.search_content_lengths.load_search_index_module',
@@ -49,25 +66,139 @@ def test_collect_oversized_content_rows_filters_and_sorts(monkeypatch) -> None:
   rows = collect_oversized_content_rows(limit=4096)
 
   # large_chunk: len('Long') + len('Heading') + 5000 = 5011
+  # accented_chunk: 2104 characters, but 4 + 2 * 2100 = 4204 UTF-8 bytes
   # medium_chunk: len('Service') + len('Details') + 4100 = 4114
   assert rows == [
-    OversizedContentRow(content_path='src/content/articles/long/index.mdx [/articles/long#chunk-0]', char_length=5011),
-    OversizedContentRow(content_path='src/content/services/svc/index.md [/services/svc#chunk-0]', char_length=4114),
+    OversizedContentRow(content_path='src/content/articles/long/index.mdx [/articles/long#chunk-0]', byte_length=5011),
+    OversizedContentRow(content_path='src/content/articles/cafe/index.mdx [/articles/cafe#chunk-0]', byte_length=4204),
+    OversizedContentRow(content_path='src/content/services/svc/index.md [/services/svc#chunk-0]', byte_length=4114),
   ]
 
 
 def test_format_oversized_content_table_renders_expected_columns() -> None:
   table = format_oversized_content_table(
     [
-      OversizedContentRow(content_path='src/content/articles/long/index.mdx [/articles/long#chunk-0]', char_length=5000),
+      OversizedContentRow(content_path='src/content/articles/long/index.mdx [/articles/long#chunk-0]', byte_length=5000),
     ]
   )
 
   assert 'Content Path' in table
-  assert 'Character Length' in table
+  assert 'UTF-8 Bytes' in table
   assert 'src/content/articles/long/index.mdx' in table
   assert '5000' in table
 
 
 def test_format_oversized_content_table_handles_empty_rows() -> None:
-  assert format_oversized_content_table([]) == 'No indexed chunks exceed the content limit.'
\ No newline at end of file
+  assert format_oversized_content_table([]) == 'No indexed chunks exceed the content limit.'
+
+def test_collect_chunk_sizes_measures_utf8_bytes(monkeypatch) -> None:
+  chunk = SimpleNamespace(
+    source_path='src/content/articles/cafe/index.mdx',
+    id='/articles/cafe#chunk-0',
+    title='Café',
+    section_heading='',
+    section_content='naïve — ok',
+    collection='articles',
+  )
+
+  monkeypatch.setattr(
+    'scripts.search_content_lengths.load_search_index_module',
+    lambda: SimpleNamespace(
+      discover_pages=lambda collections=None: [SimpleNamespace(id='p1')],
+      chunk_page=lambda page: [chunk],
+    ),
+  )
+
+  assert collect_chunk_sizes() == [
+    ChunkSize(
+      collection='articles',
+      content_path='src/content/articles/cafe/index.mdx [/articles/cafe#chunk-0]',
+      char_length=14,
+      byte_length=18,
+    )
+  ]
+
+
+def test_build_size_report_computes_percentiles_histogram_and_utilisation() -> None:
+  sizes = [ChunkSize(collection='articles', content_path=f'a{n}', char_length=n * 100, byte_length=n * 100) for n in range(1, 11)]
+  sizes.append(ChunkSize(collection='services', content_path='s', char_length=900, byte_length=1200))
+
+  report = build_size_report(sizes, limit=1000, bucket_width=500)
+
+  assert [row.collection for row in report] == ['articles', 'services', '(all)']
+  articles, services, overall = report
+  assert (articles.count, articles.byte_p50, articles.byte_p90, articles.byte_p99, articles.byte_max) == (10, 500, 900, 1000, 1000)
+  assert articles.mean_utilisation == 0.55
+  assert articles.over_limit == 0
+  assert articles.histogram == [4, 5, 1]
+  assert (services.char_max, services.byte_max, services.over_limit) == (900, 1200, 1)
+  assert overall.count == 11
+  assert overall.histogram == [4, 5, 2]
+
+
+def test_size_report_renders_text_and_json() -> None:
+  report = build_size_report(
+    [ChunkSize(collection='articles', content_path='a', char_length=10, byte_length=12)],
+    limit=1024,
+    bucket_width=512,
+  )
+
+  text = format_size_report(report, limit=1024, bucket_width=512)
+  assert 'Bytes p50/p90/p99/max' in text
+  assert 'UTF-8 byte histogram (1 chunks, limit 1024)' in text
+
+  payload = json.loads(size_report_to_json(report, limit=1024, bucket_width=512))
+  assert payload['limit_bytes'] == 1024
+  assert payload['collections'][0]['byte_p99'] == 12
+
+
+def test_collect_oversized_content_rows_only_chunks_selected_files(monkeypatch) -> None:
+  chunk = SimpleNamespace(
+    source_path='src/content/articles/long/index.mdx',
+    id='/articles/long#chunk-0',
+    title='Long',
+    section_heading='',
+    section_content='x' * 5000,
+  )
+  seen: dict[str, object] = {}
+
+  def discover_pages_from_files(files, collections=None, read_text=None):
+    seen['files'] = files
+    return [SimpleNamespace(id='p1')]
+
+  monkeypatch.setattr(
+    'scripts.search_content_lengths.load_search_index_module',
+    lambda: SimpleNamespace(
+      discover_pages=lambda collections=None: (_ for _ in ()).throw(AssertionError('full scan')),
+      discover_pages_from_files=discover_pages_from_files,
+      chunk_page=lambda page: [chunk],
+    ),
+  )
+
+  files = [Path('src/content/articles/long/index.mdx')]
+  rows = collect_oversized_content_rows(limit=4096, files=files)
+
+  assert seen['files'] == files
+  assert [row.byte_length for row in rows] == [5004]
+
+
+def test_read_staged_text_reads_the_index_not_the_working_tree(monkeypatch, tmp_path: Path) -> None:
+  subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+  page = tmp_path / 'src' / 'content' / 'articles' / 'a' / 'index.mdx'
+  page.parent.mkdir(parents=True)
+  page.write_text('staged\n', encoding='utf-8')
+  subprocess.run(['git', 'add', 'src/content'], cwd=tmp_path, check=True)
+  page.write_text('unstaged edit\n', encoding='utf-8')
+  monkeypatch.setattr('scripts.search_content_lengths.REPO_ROOT', tmp_path.resolve())
+
+  assert read_staged_text(page) == 'staged\n'
+
+
+def test_strict_report_fails_when_any_chunk_is_over_the_limit(monkeypatch, capsys) -> None:
+  sizes = [ChunkSize(collection='articles', content_path='a', char_length=10, byte_length=5000)]
+  monkeypatch.setattr('scripts.search_content_lengths.collect_chunk_sizes', lambda **kwargs: sizes)
+
+  assert main(['--report']) == 0
+  assert main(['--report', '--strict']) == 1
+  assert main(['--json', '--strict', '--limit', '8192']) == 0
+  assert '"over_limit": 0' in capsys.readouterr().out
@@ -0,0 +1,386 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+
+def load_search_index_module() -> ModuleType:
+  module_path = Path(__file__).with_name('search-index.py')
+  spec = importlib.util.spec_from_file_location('search_index_under_test', module_path)
+  assert spec and spec.loader
+  module = importlib.util.module_from_spec(spec)
+  sys.modules[spec.name] = module
+  spec.loader.exec_module(module)
+  return module
+
+
+search_index = load_search_index_module()
+
+
+class FakeClock:
+  def __init__(self) -> None:
+    self.now = 0.0
+    self.sleeps: list[float] = []
+
+  def __call__(self) -> float:
+    return self.now
+
+  def sleep(self, seconds: float) -> None:
+    self.sleeps.append(seconds)
+    self.now += seconds
+
+
+def make_chunk(chunk_id: str) -> object:
+  return search_index.ChunkDocument(
+    id=chunk_id,
+    path=chunk_id.split('#', 1)[0],
+    title='Title',
+    section_heading='',
+    section_content='Body',
+    collection='articles',
+    source_path='src/content/articles/a/index.mdx',
+  )
+
+
+def test_token_bucket_waits_once_burst_is_spent() -> None:
+  clock = FakeClock()
+  bucket = search_index.TokenBucket(rate=2.0, capacity=2.0, clock=clock, sleep=clock.sleep)
+
+  bucket.acquire()
+  bucket.acquire()
+  assert clock.sleeps == []
+
+  bucket.acquire()
+  assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_warm_up_latency_excludes_token_bucket_waits(monkeypatch: pytest.MonkeyPatch) -> None:
+  clock = FakeClock()
+  monkeypatch.setattr(search_index.time, 'perf_counter', clock)
+
+  def search(query: str, **_kwargs) -> list[SimpleNamespace]:
+    clock.now += 0.05
+    return [SimpleNamespace(id='/articles/a#chunk-0', metadata={'path': '/articles/a'})]
+
+  monkeypatch.setattr(
+    search_index,
+    'Search',
+    lambda url, token: SimpleNamespace(index=lambda name: SimpleNamespace(search=search)),
+  )
+  # One request per second with a burst of one: the second and third queries wait a full second each.
+  governor = search_index.UpstashGovernor(requests_per_second=1.0, clock=clock, sleep=clock.sleep)
+  target = search_index.SearchTarget(index_name='default', url='https://us.upstash.io', token='t')
+  queries = [search_index.WarmupQuery(query=f'q{n}') for n in range(3)]
+
+  hits = search_index.warm_up_target(target, queries, governor=governor, concurrency=1)
+
+  assert sum(clock.sleeps) > 1.5
+  assert [hit.latency_ms for hit in hits] == [pytest.approx(50.0)] * 3
+
+
+def test_governor_persists_daily_usage_and_enforces_budget(tmp_path: Path) -> None:
+  usage_path = tmp_path / 'usage.json'
+  governor = search_index.UpstashGovernor(daily_document_budget=10, usage_path=usage_path, today=lambda: '2026-01-01')
+
+  assert governor.call(lambda: 'ok', documents=6) == 'ok'
+
+  reloaded = search_index.UpstashGovernor(daily_document_budget=10, usage_path=usage_path, today=lambda: '2026-01-01')
+  assert reloaded.usage.documents == 6
+  assert reloaded.remaining_documents() == 4
+
+  with pytest.raises(search_index.QuotaExceededError):
+    reloaded.call(lambda: 'nope', documents=5)
+
+  next_day = search_index.UpstashGovernor(daily_document_budget=10, usage_path=usage_path, today=lambda: '2026-01-02')
+  assert next_day.remaining_documents() == 10
+
+
+def test_governor_retries_rate_limit_errors_and_surfaces_quota_errors() -> None:
+  clock = FakeClock()
+  governor = search_index.UpstashGovernor(sleep=clock.sleep)
+  attempts: list[int] = []
+
+  def flaky() -> str:
+    attempts.append(1)
+    if len(attempts) < 3:
+      raise search_index.UpstashError('ERR too many requests')
+    return 'ok'
+
+  assert governor.call(flaky) == 'ok'
+  assert clock.sleeps == [2.0, 4.0]
+  assert governor.usage.requests == 1
+
+  def exhausted() -> None:
+    raise search_index.UpstashError('ERR max daily requests limit exceeded')
+
+  with pytest.raises(search_index.QuotaExceededError):
+    governor.call(exhausted)
+
+
+def test_upsert_chunks_records_completed_ids_until_budget_is_hit(monkeypatch: pytest.MonkeyPatch) -> None:
+  upserted: list[list[str]] = []
+  fake_index = SimpleNamespace(upsert=lambda documents: upserted.append([doc['id'] for doc in documents]))
+  monkeypatch.setattr(search_index, 'Search', lambda url, token: SimpleNamespace(index=lambda name: fake_index))
+  monkeypatch.setattr(search_index, 'UPSERT_BATCH_SIZE', 2)
+
+  chunks = [make_chunk(f'/articles/a#chunk-{n}') for n in range(5)]
+  governor = search_index.UpstashGovernor(daily_document_budget=3)
+  completed: list[str] = []
+
+  with pytest.raises(search_index.QuotaExceededError):
+    search_index.upsert_chunks(
+      upstash_url='https://search.upstash.io',
+      upstash_token='token',
+      index_name='default',
+      chunks=chunks,
+      governor=governor,
+      completed=completed,
+    )
+
+  assert upserted == [['/articles/a#chunk-0', '/articles/a#chunk-1']]
+  assert completed == ['/articles/a#chunk-0', '/articles/a#chunk-1']
+
+
+def test_checkpoint_round_trip_is_scoped_to_index(tmp_path: Path) -> None:
+  path = tmp_path / 'checkpoint.json'
+  search_index.save_checkpoint('default', ['/articles/a#chunk-0'], path=path)
+
+  assert search_index.load_checkpoint('default', path=path) == {'/articles/a#chunk-0'}
+  assert search_index.load_checkpoint('staging', path=path) == set()
+
+  search_index.save_checkpoint('staging', ['/articles/b#chunk-0'], path=path)
+  search_index.clear_checkpoint('default', path=path)
+  assert search_index.load_checkpoint('default', path=path) == set()
+  assert search_index.load_checkpoint('staging', path=path) == {'/articles/b#chunk-0'}
+
+  search_index.clear_checkpoint('staging', path=path)
+  assert not path.exists()
+
+
+def test_resolve_search_targets_reads_prefixed_credentials(monkeypatch: pytest.MonkeyPatch) -> None:
+  monkeypatch.setenv('UPSTASH_SEARCH_REST_URL', 'https://us.upstash.io')
+  monkeypatch.setenv('UPSTASH_SEARCH_REST_TOKEN', 'us-token')
+  monkeypatch.setenv('UPSTASH_SEARCH_INDEX_NAME', 'default')
+  monkeypatch.setenv('EU_UPSTASH_SEARCH_REST_URL', 'https://eu.upstash.io')
+  monkeypatch.setenv('EU_UPSTASH_SEARCH_REST_TOKEN', 'eu-token')
+
+  assert [target.label for target in search_index.resolve_search_targets(None)] == ['default']
+
+  targets = search_index.resolve_search_targets(['staging', 'default@eu'])
+  assert [target.label for target in targets] == ['staging', 'default@EU']
+  assert targets[0].url == 'https://us.upstash.io'
+  assert (targets[1].url, targets[1].token) == ('https://eu.upstash.io', 'eu-token')
+
+  with pytest.raises(ValueError, match='APAC_UPSTASH_SEARCH_REST_URL'):
+    search_index.resolve_search_targets(['default@apac'])
+
+
+def test_fan_out_upsert_writes_every_target_and_retries_failed_batches(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+  monkeypatch.setattr(search_index, 'CHECKPOINT_FILE', tmp_path / 'checkpoint.json')
+  monkeypatch.setattr(search_index, 'GENERATION_FILE', tmp_path / 'generations.json')
+  monkeypatch.setattr(search_index, 'BATCH_RETRY_DELAY_SECONDS', 0.0)
+
+  upserted: dict[tuple[str, str], list[str]] = {}
+  failures = {'staging': 1}
+
+  def make_client(url: str, token: str) -> SimpleNamespace:
+    def make_index(name: str) -> SimpleNamespace:
+      def upsert(documents: list[dict]) -> None:
+        if failures.get(name):
+          failures[name] -= 1
+          raise RuntimeError('connection reset')
+        upserted.setdefault((url, name), []).extend(doc['id'] for doc in documents)
+
+      return SimpleNamespace(upsert=upsert)
+
+    return SimpleNamespace(index=make_index)
+
+  monkeypatch.setattr(search_index, 'Search', make_client)
+
+  targets = [
+    search_index.SearchTarget(index_name='default', url='https://us.upstash.io', token='t'),
+    search_index.SearchTarget(index_name='staging', url='https://us.upstash.io', token='t'),
+    search_index.SearchTarget(index_name='default', url='https://eu.upstash.io', token='t', credentials='EU'),
+  ]
+  chunks = [make_chunk(f'/articles/a#chunk-{n}') for n in range(3)]
+  governors = {
+    'https://us.upstash.io': search_index.UpstashGovernor(),
+    'https://eu.upstash.io': search_index.UpstashGovernor(),
+  }
+
+  results = search_index.fan_out_upsert(targets, chunks, governors=governors, drop=False, resume=False)
+
+  assert [(result.target.label, result.status, result.indexed, result.retries) for result in results] == [
+    ('default', 'ok', 3, 0),
+    ('staging', 'ok', 3, 1),
+    ('default@EU', 'ok', 3, 0),
+  ]
+  assert len(upserted) == 3
+  assert governors['https://us.upstash.io'].usage.documents == 6
+  assert 'default@EU' in search_index.format_target_summary(results)
+  assert set(json.loads((tmp_path / 'generations.json').read_text(encoding='utf-8'))) == {'default', 'staging', 'default@EU'}
+
+
+def test_index_target_checkpoints_each_batch_and_keeps_progress_on_failure(
+  monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+  checkpoint = tmp_path / 'checkpoint.json'
+  monkeypatch.setattr(search_index, 'CHECKPOINT_FILE', checkpoint)
+  monkeypatch.setattr(search_index, 'GENERATION_FILE', tmp_path / 'generations.json')
+  monkeypatch.setattr(search_index, 'BATCH_RETRY_DELAY_SECONDS', 0.0)
+  monkeypatch.setattr(search_index, 'UPSERT_BATCH_SIZE', 2)
+  saved_before_second_batch: list[set[str]] = []
+
+  def upsert(documents: list[dict]) -> None:
+    if documents[0]['id'].endswith('chunk-2'):
+      # A process killed here must still find the first batch in the checkpoint.
+      saved_before_second_batch.append(search_index.load_checkpoint('default'))
+      raise RuntimeError('connection reset')
+
+  monkeypatch.setattr(search_index, 'Search', lambda url, token: SimpleNamespace(index=lambda name: SimpleNamespace(upsert=upsert)))
+  target = search_index.SearchTarget(index_name='default', url='https://us.upstash.io', token='t')
+  chunks = [make_chunk(f'/articles/a#chunk-{n}') for n in range(4)]
+
+  result = search_index.index_target(target, chunks, governor=search_index.UpstashGovernor(), drop=False, resume=False)
+
+  first_batch = {'/articles/a#chunk-0', '/articles/a#chunk-1'}
+  assert (result.status, result.indexed) == ('failed', 2)
+  assert saved_before_second_batch[0] == first_batch
+  assert search_index.load_checkpoint('default') == first_batch
+
+
+def test_main_rejects_bad_warmup_queries_before_writing(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+  monkeypatch.setattr(search_index, 'load_environment', lambda: None)
+  monkeypatch.setenv('UPSTASH_SEARCH_REST_URL', 'https://us.upstash.io')
+  monkeypatch.setenv('UPSTASH_SEARCH_REST_TOKEN', 'us-token')
+  monkeypatch.setenv('UPSTASH_SEARCH_INDEX_NAME', 'default')
+  writes: list[str] = []
+  fake_index = SimpleNamespace(upsert=lambda documents: writes.append('upsert'), reset=lambda: writes.append('reset'))
+  monkeypatch.setattr(search_index, 'Search', lambda url, token: SimpleNamespace(index=lambda name: fake_index))
+  monkeypatch.setattr(search_index, 'discover_pages', lambda collections=None: pytest.fail('indexing started'))
+  queries = tmp_path / 'queries.jsonl'
+  queries.write_text('{"expected_path": "/articles/a"}\n', encoding='utf-8')
+
+  assert search_index.main(['--warmup-queries', str(queries)]) == 1
+  assert writes == []
+
+
+def test_main_exits_with_checkpointed_status_when_budget_stops_a_run(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+  monkeypatch.setattr(search_index, 'load_environment', lambda: None)
+  monkeypatch.setenv('UPSTASH_SEARCH_REST_URL', 'https://us.upstash.io')
+  monkeypatch.setenv('UPSTASH_SEARCH_REST_TOKEN', 'us-token')
+  monkeypatch.setenv('UPSTASH_SEARCH_INDEX_NAME', 'default')
+  for name, filename in [('CHECKPOINT_FILE', 'checkpoint.json'), ('GENERATION_FILE', 'generations.json'), ('USAGE_FILE', 'usage.json')]:
+    monkeypatch.setattr(search_index, name, tmp_path / filename)
+  monkeypatch.setattr(search_index, 'REPO_ROOT', tmp_path)
+  monkeypatch.setattr(search_index, 'UPSERT_BATCH_SIZE', 1)
+  monkeypatch.setattr(search_index, 'discover_pages', lambda collections=None: [])
+  monkeypatch.setattr(search_index, 'chunk_pages', lambda pages: [make_chunk(f'/articles/a#chunk-{n}') for n in range(3)])
+  upserted: list[str] = []
+  fake_index = SimpleNamespace(upsert=lambda documents: upserted.extend(doc['id'] for doc in documents))
+  monkeypatch.setattr(search_index, 'Search', lambda url, token: SimpleNamespace(index=lambda name: fake_index))
+
+  assert search_index.main(['--no-drop', '--budget', '2']) == search_index.EXIT_CHECKPOINTED
+  assert search_index.load_checkpoint('default') == set(upserted) and len(upserted) == 2
+
+  assert search_index.main(['--no-drop', '--resume']) == 0
+  assert len(upserted) == 3
+
+
+def test_load_warmup_queries_accepts_text_and_jsonl(tmp_path: Path) -> None:
+  path = tmp_path / 'queries.txt'
+  path.write_text(
+    '# top queries\n'
+    'typescript\n'
+    '\n'
+    '{"query": "platform migration", "expected_path": "/case-studies/platform-migration"}\n',
+    encoding='utf-8',
+  )
+
+  assert search_index.load_warmup_queries(path) == [
+    search_index.WarmupQuery(query='typescript'),
+    search_index.WarmupQuery(query='platform migration', expected_path='/case-studies/platform-migration'),
+  ]
+
+
+def test_warm_up_target_collapses_chunks_and_flags_regressions(monkeypatch: pytest.MonkeyPatch) -> None:
+  seen: list[dict] = []
+
+  def search(query: str, **kwargs) -> list[SimpleNamespace]:
+    seen.append(kwargs)
+    if query == 'empty':
+      return []
+    return [
+      SimpleNamespace(id='/articles/a#chunk-1', metadata={'path': '/articles/a'}),
+      SimpleNamespace(id='/articles/a#chunk-0', metadata={'path': '/articles/a'}),
+      SimpleNamespace(id='/articles/b#chunk-0', metadata={'path': '/articles/b'}),
+    ]
+
+  monkeypatch.setattr(
+    search_index,
+    'Search',
+    lambda url, token: SimpleNamespace(index=lambda name: SimpleNamespace(search=search)),
+  )
+
+  target = search_index.SearchTarget(index_name='default', url='https://us.upstash.io', token='t')
+  queries = [
+    search_index.WarmupQuery(query='typescript', expected_path='/articles/b'),
+    search_index.WarmupQuery(query='empty'),
+  ]
+
+  hits = search_index.warm_up_target(target, queries, governor=search_index.UpstashGovernor(), concurrency=2)
+
+  assert hits[0].paths == ('/articles/a', '/articles/b')
+  assert hits[0].found is True
+  assert hits[1].found is False
+  assert all(kwargs['reranking'] is True and kwargs['semantic_weight'] == 0.5 for kwargs in seen)
+
+  problems = search_index.evaluate_warmup(hits, max_p95_ms=10_000, min_hit_rate=1.0)
+  assert len(problems) == 1
+  assert "'empty'" in problems[0]
+
+  slow = [search_index.WarmupHit(query='q', latency_ms=2000.0, paths=('/articles/a',))]
+  assert search_index.evaluate_warmup(slow, max_p95_ms=1500, min_hit_rate=1.0) == ['p95 latency 2000ms exceeds 1500ms']
+
+
+def test_discover_pages_from_files_maps_files_to_collections(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+  content_root = tmp_path / 'src' / 'content'
+  monkeypatch.setattr(search_index, 'REPO_ROOT', tmp_path)
+  monkeypatch.setattr(search_index, 'CONTENT_ROOT', content_root)
+
+  article = content_root / 'articles' / 'hello' / 'index.mdx'
+  deep_dive = content_root / 'articles' / 'hello' / 'pdf.mdx'
+  draft = content_root / 'services' / 'draft' / 'index.md'
+  author = content_root / 'authors' / 'kevin' / 'index.md'
+  for path, frontmatter in [
+    (article, 'title: Hello'),
+    (deep_dive, 'title: Hello Deep Dive'),
+    (draft, 'title: Draft\nisDraft: true'),
+    (author, 'title: Kevin'),
+  ]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f'---\n{frontmatter}\n---\nBody\n', encoding='utf-8')
+
+  assert search_index.collection_for_file(deep_dive).name == 'deep-dive'
+  assert search_index.collection_for_file(author) is None
+
+  pages = search_index.discover_pages_from_files([article, deep_dive, draft, author, article, tmp_path / 'missing.mdx'])
+  assert [(page.collection, page.path) for page in pages] == [
+    ('articles', '/articles/hello'),
+    ('deep-dive', '/deep-dive/hello'),
+  ]
+
+  only_articles = search_index.discover_pages_from_files([article, deep_dive], collections=['articles'])
+  assert [page.path for page in only_articles] == ['/articles/hello']
+
+  staged = search_index.discover_pages_from_files(
+    [article, content_root / 'articles' / 'deleted' / 'index.mdx'],
+    read_text=lambda path: f'---\ntitle: Staged {path.parent.name}\n---\nBody\n',
+  )
+  assert [(page.path, page.title) for page in staged] == [
+    ('/articles/hello', 'Staged hello'),
+    ('/articles/deleted', 'Staged deleted'),
+  ]
@@ -0,0 +1,87 @@
+import gzip
+import json
+from pathlib import Path
+
+from scripts.search_query_log import (
+  HeavyHitters,
+  LatencyHistogram,
+  analyse_lines,
+  export_top_queries,
+  format_report,
+  iter_log_lines,
+  main,
+  report_to_json,
+)
+
+
+def test_heavy_hitters_is_exact_under_capacity_and_bounded_over_it() -> None:
+  counter = HeavyHitters(capacity=2)
+  for key in ['a', 'a', 'a', 'b', 'c', 'a', 'd']:
+    counter.add(key)
+
+  assert len(counter.counts) <= 2
+  assert counter.top(1) == [('a', 3)]
+  assert counter.undercount == 1  # 'a' was seen four times: 3 + undercount
+
+
+def test_latency_histogram_percentiles_stay_within_bucket_error() -> None:
+  histogram = LatencyHistogram()
+  for value in range(1, 1001):
+    histogram.add(float(value))
+
+  assert abs(histogram.percentile(50) - 500) <= 500 * 0.02
+  assert abs(histogram.percentile(99) - 990) <= 990 * 0.02
+  assert histogram.percentile(100) == 1000
+  assert histogram.mean == 500.5
+
+
+def test_analyse_lines_reports_hot_and_zero_result_queries(tmp_path: Path) -> None:
+  records = [
+    {'query': 'Astro Islands', 'result_count': 4, 'latency_ms': 120},
+    {'q': 'astro  islands', 'hits': [{}, {}], 'latency_ms': 80},
+    {'query': 'kubernetes operators', 'results': 0, 'latency_ms': 300},
+    {'query': 'kubernetes operators', 'result_count': 0},
+    {'title': 'no query here'},
+  ]
+  lines = [json.dumps(record) for record in records] + ['not json', '']
+  log_path = tmp_path / 'queries.jsonl.gz'
+  with gzip.open(log_path, 'wt', encoding='utf-8') as handle:
+    handle.write('\n'.join(lines))
+
+  stats = analyse_lines(iter_log_lines([log_path]))
+
+  assert stats.total == 4
+  assert stats.skipped == 2
+  assert stats.zero_results == 2
+  assert stats.queries.top(2) == [('astro islands', 2), ('kubernetes operators', 2)]
+  assert stats.zero_result_queries.top(5) == [('kubernetes operators', 2)]
+  assert ('astro', 2) in stats.terms.top(5)
+  assert stats.latency.count == 3
+  assert 'Zero-result queries: 2 (50.0%)' in format_report(stats, top=5)
+  assert json.loads(report_to_json(stats, top=1))['top_queries'] == [{'query': 'astro islands', 'count': 2}]
+
+
+def test_main_exports_top_queries_as_a_query_set(tmp_path: Path, capsys) -> None:
+  log_path = tmp_path / 'queries.jsonl'
+  log_path.write_text(
+    '\n'.join(json.dumps({'query': query}) for query in ['astro', 'astro', 'vercel']), encoding='utf-8'
+  )
+  export_path = tmp_path / 'top.jsonl'
+
+  assert main([str(log_path), '--top', '1', '--export', str(export_path)]) == 0
+  assert export_path.read_text(encoding='utf-8') == '{"query": "astro", "count": 2}\n'
+  assert 'Top 1 queries' in capsys.readouterr().out
+
+  export_top_queries(tmp_path / 'top.txt', [('astro', 2), ('vercel', 1)])
+  assert (tmp_path / 'top.txt').read_text(encoding='utf-8') == 'astro\nvercel\n'
+
+
+def test_invalid_utf8_lines_are_skipped_not_fatal(tmp_path: Path) -> None:
+  log_path = tmp_path / 'bad.jsonl'
+  log_path.write_bytes(b'{"query":"a"}\n\xff\xfe\n')
+  gz_path = tmp_path / 'bad.jsonl.gz'
+  gz_path.write_bytes(gzip.compress(log_path.read_bytes()))
+
+  stats = analyse_lines(iter_log_lines([log_path, gz_path]))
+
+  assert (stats.total, stats.skipped) == (2, 2)
@@ -1,4 +1,51 @@
-from scripts.search_relevancy import SearchRelevancyRow, collect_search_relevancy_rows, format_results_table
+import json
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.search_relevancy import (
+  MODES,
+  BatchQueryResult,
+  CachedSearchClient,
+  RankingSnapshot,
+  RelevancyQuery,
+  ResultCache,
+  SearchConfig,
+  SearchRelevancyRow,
+  aggregate_pages,
+  benchmark_config,
+  build_search_configs,
+  collect_search_relevancy_rows,
+  diff_main,
+  diff_ranking,
+  diff_snapshots,
+  format_ranking_diffs,
+  kendall_tau,
+  load_snapshot,
+  snapshot_to_json,
+  take_snapshot,
+  top_k_overlap,
+  format_batch_jsonl,
+  format_overfetch,
+  format_overfetch_summary,
+  format_batch_table,
+  format_results_table,
+  format_bench_table,
+  format_sweep_table,
+  ndcg_at_k,
+  pick_cheapest,
+  ranked_page_paths,
+  reciprocal_rank,
+  run_sweep,
+  load_queries_file,
+  main,
+  parse_args,
+  run_batch,
+  run_page_search,
+  run_search,
+)
 
 
 def test_collect_search_relevancy_rows_preserves_all_scored_results() -> None:
@@ -63,4 +110,333 @@ def test_format_results_table_can_hide_path_column() -> None:
 
   assert 'Result Title' in table
   assert 'Path' not in table
-  assert '/articles/one' not in table
\ No newline at end of file
+  assert '/articles/one' not in table
+
+def test_load_queries_file_reads_text_and_jsonl(tmp_path: Path) -> None:
+  path = tmp_path / 'queries.jsonl'
+  path.write_text(
+    '# relevancy set\n'
+    'typescript\n'
+    '{"query": "migration", "expected_paths": ["/case-studies/platform-migration"]}\n'
+    '{"query": "testing", "expected_path": "/articles/testing"}\n',
+    encoding='utf-8',
+  )
+
+  assert load_queries_file(path) == [
+    RelevancyQuery(query='typescript'),
+    RelevancyQuery(query='migration', expected_paths=('/case-studies/platform-migration',)),
+    RelevancyQuery(query='testing', expected_paths=('/articles/testing',)),
+  ]
+
+
+def test_run_batch_reuses_one_client_and_preserves_order() -> None:
+  index_names: list[str] = []
+  threads: set[int] = set()
+  lock = threading.Lock()
+
+  def search(query: str, **_kwargs):
+    with lock:
+      threads.add(threading.get_ident())
+    if query == 'broken':
+      raise RuntimeError('boom')
+    return [{'content': {'title': query.title()}, 'metadata': {'path': f'/articles/{query}'}, 'score': 0.5}]
+
+  def index(name: str):
+    index_names.append(name)
+    return SimpleNamespace(search=search)
+
+  client = SimpleNamespace(index=index)
+  queries = [RelevancyQuery(query=name) for name in ['alpha', 'broken', 'gamma']]
+
+  results = run_batch(queries, client=client, limit=5, index_name='default', concurrency=2)
+
+  assert [result.query for result in results] == ['alpha', 'broken', 'gamma']
+  assert results[0].rows == [SearchRelevancyRow(title='Alpha', path='/articles/alpha', score=0.5)]
+  assert results[1].error == 'boom'
+  assert set(index_names) == {'default'}
+  assert 1 <= len(threads) <= 2
+
+
+def test_batch_formatters_render_every_query() -> None:
+  results = [
+    BatchQueryResult(query='alpha', rows=[SearchRelevancyRow(title='Alpha', path='/articles/alpha', score=0.5)]),
+    BatchQueryResult(query='empty'),
+    BatchQueryResult(query='broken', error='boom'),
+  ]
+
+  table = format_batch_table(results)
+  assert 'Query' in table
+  assert '/articles/alpha' in table
+  assert '(no results)' in table
+  assert '(error: boom)' in table
+  assert '/articles/alpha' not in format_batch_table(results, show_path=False)
+
+  lines = [json.loads(line) for line in format_batch_jsonl(results).splitlines()]
+  assert lines[0] == {'query': 'alpha', 'results': [{'title': 'Alpha', 'path': '/articles/alpha', 'score': 0.5}]}
+  assert lines[2]['error'] == 'boom'
+
+
+def test_build_search_configs_crosses_every_dimension() -> None:
+  configs = build_search_configs(reranking_modes=[False, True], semantic_weights=[0.25, 0.75], limits=[10])
+  assert [(config.reranking, config.semantic_weight) for config in configs] == [
+    (False, 0.25),
+    (False, 0.75),
+    (True, 0.25),
+    (True, 0.75),
+  ]
+
+
+def test_benchmark_config_discards_warmup_and_summarises_latency() -> None:
+  calls: list[tuple[str, bool, float]] = []
+  ticks = iter(range(10_000))
+
+  def clock() -> float:
+    return next(ticks) / 100
+
+  def search(query: str, *, limit: int, reranking: bool, semantic_weight: float):
+    calls.append((query, reranking, semantic_weight))
+    if query == 'broken':
+      raise RuntimeError('boom')
+    return []
+
+  client = SimpleNamespace(index=lambda name: SimpleNamespace(search=search))
+  queries = [RelevancyQuery(query='alpha'), RelevancyQuery(query='broken')]
+
+  summary = benchmark_config(
+    queries,
+    client=client,
+    index_name='default',
+    config=SearchConfig(reranking=True, semantic_weight=0.25),
+    repeat=2,
+    concurrency=1,
+    warmup=3,
+    clock=clock,
+  )
+
+  assert len(calls) == 3 + 4
+  assert all(reranking is True and weight == 0.25 for _query, reranking, weight in calls)
+  assert (summary.requests, summary.errors, summary.error_rate) == (4, 2, 0.5)
+  assert summary.p50_ms == 10.0
+  assert summary.throughput_rps > 0
+  assert '50.0%' in format_bench_table([summary])
+
+
+def test_main_dispatches_bench_mode(monkeypatch) -> None:
+  seen: list[list[str]] = []
+  monkeypatch.setitem(MODES, '--bench', lambda argv: seen.append(argv) or 0)
+
+  assert main(['--bench', '--queries-file', 'q.txt']) == 0
+  assert seen == [['--queries-file', 'q.txt']]
+
+
+def test_main_searches_for_mode_names(monkeypatch) -> None:
+  monkeypatch.setitem(MODES, '--bench', lambda argv: pytest.fail('dispatched to bench'))
+
+  def load_environment() -> None:
+    raise RuntimeError('stop before searching')
+
+  monkeypatch.setattr('scripts.search_relevancy.load_environment', load_environment)
+
+  assert main(['bench']) == 1
+  assert parse_args(['bench']).query == 'bench'
+
+
+def test_ranking_metrics_use_page_paths() -> None:
+  rows = [
+    SearchRelevancyRow(title='A', path='/articles/a#chunk-1', score=0.9),
+    SearchRelevancyRow(title='A', path='/articles/a#chunk-0', score=0.8),
+    SearchRelevancyRow(title='B', path='/articles/b/', score=0.7),
+  ]
+  ranked = ranked_page_paths(rows)
+
+  assert ranked == ['/articles/a', '/articles/b']
+  assert reciprocal_rank(ranked, {'/articles/b'}) == 0.5
+  assert ndcg_at_k(ranked, {'/articles/a'}, 10) == 1.0
+  assert round(ndcg_at_k(ranked, {'/articles/b'}, 10), 4) == 0.6309
+  assert ndcg_at_k(ranked, {'/articles/b'}, 1) == 0.0
+
+
+def test_run_sweep_scores_each_configuration_and_picks_cheapest() -> None:
+  def search(query: str, *, limit: int, reranking: bool, semantic_weight: float):
+    # Reranking puts the expected page first; without it the page is second.
+    order = ['/articles/right', '/articles/wrong'] if reranking else ['/articles/wrong', '/articles/right']
+    return [{'content': {'title': path}, 'metadata': {'path': path}, 'score': 0.5} for path in order]
+
+  client = SimpleNamespace(index=lambda name: SimpleNamespace(search=search))
+  queries = [RelevancyQuery(query='q', expected_paths=('/articles/right',))]
+  configs = build_search_configs(reranking_modes=[False, True], semantic_weights=[0.5], limits=[10])
+
+  summaries = run_sweep(queries, client=client, index_name='default', configs=configs, k=10, concurrency=2)
+
+  assert [(summary.reranking, summary.mrr) for summary in summaries] == [(False, 0.5), (True, 1.0)]
+  assert pick_cheapest(summaries, min_mrr=0.5) is summaries[0]
+  assert pick_cheapest(summaries, min_mrr=0.9) is summaries[1]
+  assert pick_cheapest(summaries, min_ndcg=1.1) is None
+  assert 'nDCG@10' in format_sweep_table(summaries, k=10, cheapest=summaries[1])
+
+
+def test_sweep_rejects_result_cache(capsys) -> None:
+  # Cached hits report near-zero latency, which would skew the cost comparison.
+  with pytest.raises(SystemExit) as excinfo:
+    main(['--sweep', '--queries-file', 'queries.jsonl', '--cache'])
+
+  assert excinfo.value.code == 2
+  assert '--cache' in capsys.readouterr().err
+
+
+def test_kendall_tau_and_overlap_compare_rankings() -> None:
+  assert kendall_tau(['a', 'b', 'c'], ['a', 'b', 'c']) == 1.0
+  assert kendall_tau(['a', 'b', 'c'], ['c', 'b', 'a']) == -1.0
+  assert kendall_tau(['a', 'b'], ['a', 'x']) == 1.0
+  assert top_k_overlap(['a', 'b', 'c', 'd'], ['a', 'c', 'x', 'y'], 4) == 0.5
+
+  diff = diff_ranking('q', ['a', 'b', 'c'], ['b', 'a', 'x'], 3)
+
+  assert diff.shifts == {'a': 1, 'b': -1}
+  assert diff.dropped == ['c']
+  assert diff.added == ['x']
+  assert diff.regressed(min_tau=0.8, min_overlap=0.5)
+
+
+def test_take_snapshot_records_page_paths_and_round_trips(tmp_path: Path) -> None:
+  def search(query: str, *, limit: int, reranking: bool, semantic_weight: float):
+    paths = ['/articles/one#intro', '/articles/one', '/articles/two/', '/articles/three']
+    return [{'content': {'title': path}, 'metadata': {'path': path}, 'score': 0.5} for path in paths]
+
+  client = SimpleNamespace(index=lambda name: SimpleNamespace(search=search))
+  snapshot = take_snapshot(
+    [RelevancyQuery(query='zeta'), RelevancyQuery(query='alpha')],
+    client=client,
+    index_name='default',
+    config=SearchConfig(reranking=True, semantic_weight=0.5, limit=10),
+    k=2,
+  )
+
+  assert snapshot.rankings == {'zeta': ['/articles/one', '/articles/two'], 'alpha': ['/articles/one', '/articles/two']}
+
+  path = tmp_path / 'golden.json'
+  path.write_text(snapshot_to_json(snapshot), encoding='utf-8')
+  assert list(json.loads(path.read_text(encoding='utf-8'))['rankings']) == ['alpha', 'zeta']
+  assert load_snapshot(path) == snapshot
+
+
+def test_diff_main_compares_two_snapshots_offline(tmp_path: Path, capsys) -> None:
+  golden = RankingSnapshot(reranking=True, semantic_weight=0.5, limit=10, k=3, rankings={
+    'stable': ['/a', '/b', '/c'],
+    'moved': ['/a', '/b', '/c'],
+  })
+  current = RankingSnapshot(reranking=True, semantic_weight=0.5, limit=10, k=3, rankings={
+    'stable': ['/a', '/b', '/c'],
+    'moved': ['/c', '/b', '/x'],
+  })
+  (tmp_path / 'golden.json').write_text(snapshot_to_json(golden), encoding='utf-8')
+  (tmp_path / 'current.json').write_text(snapshot_to_json(current), encoding='utf-8')
+
+  diffs = diff_snapshots(golden, current)
+  assert [diff.query for diff in diffs] == ['moved', 'stable']
+  assert 'REGRESSED' in format_ranking_diffs(diffs, min_tau=0.8, min_overlap=0.8)
+
+  exit_code = diff_main([str(tmp_path / 'golden.json'), '--against', str(tmp_path / 'current.json')])
+
+  assert exit_code == 1
+  assert '1 of 2 queries regressed' in capsys.readouterr().out
+
+
+def test_aggregate_pages_fuses_chunk_scores_per_page() -> None:
+  rows = [
+    SearchRelevancyRow(title='A intro', path='/articles/a#chunk-0', score=0.9),
+    SearchRelevancyRow(title='B', path='/articles/b/', score=0.8),
+    SearchRelevancyRow(title='B setup', path='/articles/b#chunk-1', score=0.7),
+    SearchRelevancyRow(title='Noise', path='/articles/noise', score=0.001),
+  ]
+
+  assert [(row.path, row.score, row.title) for row in aggregate_pages(rows, fusion='max')] == [
+    ('/articles/a', 0.9, 'A intro'),
+    ('/articles/b', 0.8, 'B'),
+  ]
+  assert [(row.path, row.score) for row in aggregate_pages(rows, fusion='sum')] == [('/articles/b', 1.5), ('/articles/a', 0.9)]
+  assert [row.path for row in aggregate_pages(rows, fusion='rrf')] == ['/articles/b', '/articles/a']
+
+
+def test_run_page_search_over_fetches_until_pages_fill() -> None:
+  limits: list[int] = []
+  # Every page has ten chunks, so two pages need twenty hits.
+  chunks = [
+    {'content': {'title': f'Page {page}'}, 'metadata': {'path': f'/articles/{page}#chunk-{chunk}'}, 'score': 1 - page / 10}
+    for page in range(5)
+    for chunk in range(10)
+  ]
+
+  def search(query: str, *, limit: int, reranking: bool, semantic_weight: float):
+    limits.append(limit)
+    return chunks[:limit]
+
+  client = SimpleNamespace(index=lambda name: SimpleNamespace(search=search))
+
+  result = run_page_search(query='q', pages=3, client=client, index_name='default')
+
+  assert limits == [18, 36]
+  assert [row.path for row in result.rows] == ['/articles/0', '/articles/1', '/articles/2']
+  assert result.needed_limit == 21
+  assert '7.0x over-fetch' in format_overfetch(result)
+
+  results = run_batch([RelevancyQuery(query='q')], client=client, limit=3, index_name='default', fusion='max')
+  assert results[0].needed_limit == 21
+  assert 'max 7.0x' in format_overfetch_summary(results, 3)
+
+
+def test_cached_search_client_reuses_results_until_ttl_or_new_generation(tmp_path: Path) -> None:
+  calls: list[str] = []
+  now = [1000.0]
+
+  def search(query: str, *, limit: int, reranking: bool, semantic_weight: float):
+    calls.append(query)
+    return [
+      SimpleNamespace(
+        id='/articles/a#chunk-0',
+        score=0.9,
+        content={'title': 'A', 'sectionContent': 'x' * 4000},
+        metadata={'path': '/articles/a'},
+      )
+    ]
+
+  client = SimpleNamespace(index=lambda name: SimpleNamespace(search=search))
+  cache_path = tmp_path / 'results.json'
+  generation_path = tmp_path / 'generations.json'
+
+  def cached_client() -> CachedSearchClient:
+    return CachedSearchClient(client, ResultCache(cache_path, ttl_seconds=60, clock=lambda: now[0]), generation_path)
+
+  first_cache = ResultCache(cache_path, ttl_seconds=60, clock=lambda: now[0])
+  first = CachedSearchClient(client, first_cache, generation_path)
+  rows = run_search(query='astro', limit=5, index_name='default', client=first)
+  assert run_search(query='astro', limit=5, index_name='default', client=first) == rows
+  assert run_search(query='astro', limit=6, index_name='default', client=first) == rows
+  assert calls == ['astro', 'astro']
+  first_cache.save()
+  assert 'sectionContent' not in cache_path.read_text(encoding='utf-8')
+
+  # A fresh process reads the cache from disk.
+  assert run_search(query='astro', limit=5, index_name='default', client=cached_client()) == rows
+  assert calls == ['astro', 'astro']
+
+  now[0] += 120
+  run_search(query='astro', limit=5, index_name='default', client=cached_client())
+  assert len(calls) == 3
+
+  now[0] -= 120
+  generation_path.write_text(json.dumps({'default': '2026-01-01T00:00:00+00:00'}), encoding='utf-8')
+  run_search(query='astro', limit=5, index_name='default', client=cached_client())
+  assert len(calls) == 4
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+  cache = ResultCache(tmp_path / 'results.json', max_entries=2, clock=lambda: 0.0)
+  for key in ['a', 'b']:
+    cache.put(key, '', [])
+  assert cache.get('a', '') == []
+  cache.put('c', '', [])
+
+  assert cache.get('b', '') is None
+  assert cache.get('a', '') == []
+  assert cache.get('c', '') == []
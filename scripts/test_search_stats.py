@@ -0,0 +1,11 @@
+import pytest
+
+from scripts.search_stats import percentile
+
+
+def test_percentile_interpolates_between_ranks() -> None:
+  assert percentile([], 95) == 0.0
+  assert percentile([5.0], 95) == 5.0
+  assert percentile([10.0, 20.0, 30.0, 40.0], 50) == pytest.approx(25.0)
+  assert percentile([10.0, 20.0, 30.0, 40.0], 100) == 40.0
+  assert percentile([float(n) for n in range(1, 101)], 95) == pytest.approx(95.05)
@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from scripts.search_relevancy import SearchRelevancyRow, run_search
+from scripts.upstash_cassette import (
+  RECORD_ENV,
+  REPLAY_ENV,
+  Cassette,
+  CassetteMissError,
+  CassetteTransport,
+  cassette_from_env,
+  create_client,
+)
+
+
+def search_response(paths: list[str]) -> dict[str, object]:
+  return {
+    'result': [
+      {'id': f'{path}#chunk-0', 'content': {'title': path}, 'metadata': {'path': path}, 'score': 0.5}
+      for path in paths
+    ]
+  }
+
+
+def test_recorded_search_replays_without_network(tmp_path: Path) -> None:
+  cassette_path = tmp_path / 'search.jsonl'
+  calls: list[dict[str, object]] = []
+
+  def upstream(request: httpx.Request) -> httpx.Response:
+    payload = json.loads(request.content)
+    calls.append(payload)
+    assert request.headers['Authorization'] == 'Bearer secret'
+    return httpx.Response(200, json=search_response([f"/articles/{payload['query']}"]))
+
+  recorder = create_client(
+    'https://us.upstash.io', 'secret', Cassette(cassette_path, replay=False), upstream=httpx.MockTransport(upstream)
+  )
+  recorded = run_search(query='astro', limit=5, index_name='default', client=recorder)
+
+  assert len(calls) == 1
+  assert 'secret' not in cassette_path.read_text(encoding='utf-8')
+
+  replay = Cassette(cassette_path, replay=True)
+  replayer = create_client('', '', replay)
+
+  assert len(replay) == 1
+  assert run_search(query='astro', limit=5, index_name='default', client=replayer) == recorded
+  assert run_search(query='astro', limit=5, index_name='default', client=replayer) == [
+    SearchRelevancyRow(title='/articles/astro', path='/articles/astro', score=0.5)
+  ]
+  assert len(calls) == 1
+
+  with pytest.raises(CassetteMissError):
+    run_search(query='astro', limit=10, index_name='default', client=replayer)
+
+
+def test_cassette_replays_response_bodies_byte_for_byte(tmp_path: Path) -> None:
+  cassette_path = tmp_path / 'raw.jsonl'
+  bodies = {
+    '/search/default': (200, 'application/json', b'{"result": [],  "note": "caf\xc3\xa9"}'),
+    '/upsert/default': (502, 'text/html', b'<html>Bad gateway</html>'),
+  }
+
+  def upstream(request: httpx.Request) -> httpx.Response:
+    status, content_type, content = bodies[request.url.path]
+    return httpx.Response(status, headers={'content-type': content_type}, content=content)
+
+  def send_all(transport: CassetteTransport) -> list[tuple[int, str, bytes]]:
+    responses = [
+      transport.handle_request(httpx.Request('POST', f'https://us.upstash.io{path}', json={'query': 'x'}))
+      for path in bodies
+    ]
+    return [(response.status_code, response.headers['content-type'], response.content) for response in responses]
+
+  recorded = send_all(CassetteTransport(Cassette(cassette_path, replay=False), httpx.MockTransport(upstream)))
+  replayed = send_all(CassetteTransport(Cassette(cassette_path, replay=True)))
+
+  assert recorded == replayed == list(bodies.values())
+
+
+def test_cassette_from_env_shares_one_cassette_per_file(tmp_path: Path) -> None:
+  cassette_path = tmp_path / 'shared.jsonl'
+  cassette_path.write_text('', encoding='utf-8')
+  environ = {REPLAY_ENV: str(cassette_path)}
+
+  assert cassette_from_env({}) is None
+  assert cassette_from_env(environ) is cassette_from_env(environ)
+  with pytest.raises(ValueError):
+    cassette_from_env({RECORD_ENV: 'a.jsonl', REPLAY_ENV: 'b.jsonl'})
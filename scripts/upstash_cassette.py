@@ -0,0 +1,210 @@
+"""
+Record and replay Upstash Search HTTP traffic so search tooling can run offline.
+
+Set one of these before running `search_relevancy.py` or `search-index.py`:
+
+  UPSTASH_CASSETTE_RECORD=path.jsonl   forward requests to Upstash and append each
+                                       request/response pair to the cassette
+  UPSTASH_CASSETTE_REPLAY=path.jsonl   serve responses from the cassette; no network
+                                       access and no credentials are needed
+
+Interactions are keyed by method, URL path and a hash of the canonical JSON body, so a
+cassette recorded against one database replays against any URL. Response bodies are
+stored base64-encoded with their content type and replayed byte for byte, including
+non-JSON error pages. Identical requests replay their recorded responses in order and
+then keep returning the last one, which lets benchmarks repeat queries freely.
+Authorization headers are never written.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Final
+
+import httpx
+from upstash_search import Search
+
+
+RECORD_ENV: Final[str] = "UPSTASH_CASSETTE_RECORD"
+REPLAY_ENV: Final[str] = "UPSTASH_CASSETTE_REPLAY"
+REPLAY_URL: Final[str] = "https://upstash-replay.invalid"
+REPLAY_TOKEN: Final[str] = "replay"
+
+
+class CassetteMissError(LookupError):
+  """Raised in replay mode when a request was never recorded."""
+
+
+@dataclass(slots=True, frozen=True)
+class Interaction:
+  method: str
+  path: str
+  request: Any
+  status: int
+  content_type: str
+  # Base64 of the response body exactly as Upstash sent it.
+  body: str
+
+  @property
+  def key(self) -> str:
+    return request_key(self.method, self.path, self.request)
+
+  @property
+  def content(self) -> bytes:
+    return base64.b64decode(self.body)
+
+  def to_response(self, request: httpx.Request) -> httpx.Response:
+    headers = {"content-type": self.content_type} if self.content_type else None
+    return httpx.Response(self.status, headers=headers, content=self.content, request=request)
+
+
+def request_key(method: str, path: str, body: Any) -> str:
+  canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+  digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+  return f"{method.upper()} {path} {digest}"
+
+
+def decode_body(content: bytes) -> Any:
+  if not content:
+    return None
+  try:
+    return json.loads(content)
+  except ValueError:
+    return content.decode("utf-8", errors="replace")
+
+
+class Cassette:
+  """A JSONL file of interactions, opened for either recording or replay."""
+
+  def __init__(self, path: Path, *, replay: bool) -> None:
+    self.path = path
+    self.replay = replay
+    self._lock = threading.Lock()
+    self._recorded: dict[str, list[Interaction]] = defaultdict(list)
+    self._served: dict[str, int] = defaultdict(int)
+
+    if replay:
+      for line_number, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        if not line.strip():
+          continue
+        try:
+          interaction = Interaction(**json.loads(line))
+        except (TypeError, ValueError) as exc:
+          raise ValueError(f"{path}:{line_number}: invalid cassette entry ({exc})") from exc
+        self._recorded[interaction.key].append(interaction)
+    else:
+      path.parent.mkdir(parents=True, exist_ok=True)
+      path.write_text("", encoding="utf-8")
+
+  def __len__(self) -> int:
+    return sum(len(interactions) for interactions in self._recorded.values())
+
+  def record(self, interaction: Interaction) -> None:
+    line = json.dumps(asdict(interaction), ensure_ascii=False, sort_keys=True)
+    with self._lock:
+      self._recorded[interaction.key].append(interaction)
+      with self.path.open("a", encoding="utf-8") as handle:
+        handle.write(line + "\n")
+
+  def lookup(self, method: str, path: str, body: Any) -> Interaction:
+    key = request_key(method, path, body)
+    with self._lock:
+      interactions = self._recorded.get(key)
+      if not interactions:
+        raise CassetteMissError(
+          f"No recorded response for {method.upper()} {path} in {self.path}; re-record with {RECORD_ENV}."
+        )
+      index = min(self._served[key], len(interactions) - 1)
+      self._served[key] += 1
+      return interactions[index]
+
+
+class CassetteTransport(httpx.BaseTransport):
+  """httpx transport that records through `wrapped`, or replays when the cassette is in replay mode."""
+
+  def __init__(self, cassette: Cassette, wrapped: httpx.BaseTransport | None = None) -> None:
+    self.cassette = cassette
+    self.wrapped = wrapped
+
+  def handle_request(self, request: httpx.Request) -> httpx.Response:
+    body = decode_body(request.read())
+
+    if self.cassette.replay:
+      return self.cassette.lookup(request.method, request.url.path, body).to_response(request)
+
+    if self.wrapped is None:
+      raise RuntimeError("A recording cassette needs a transport to forward requests to.")
+    upstream = self.wrapped.handle_request(request)
+    try:
+      content = upstream.read()
+    finally:
+      upstream.close()
+    interaction = Interaction(
+      method=request.method,
+      path=request.url.path,
+      request=body,
+      status=upstream.status_code,
+      content_type=upstream.headers.get("content-type", ""),
+      body=base64.b64encode(content).decode("ascii"),
+    )
+    self.cassette.record(interaction)
+    # `content` is already decompressed, so only the content type carries over.
+    return interaction.to_response(request)
+
+  def close(self) -> None:
+    if self.wrapped is not None:
+      self.wrapped.close()
+
+
+_CASSETTES: dict[tuple[Path, bool], Cassette] = {}
+_CASSETTES_LOCK = threading.Lock()
+
+
+def cassette_from_env(environ: Mapping[str, str] | None = None) -> Cassette | None:
+  """Return the cassette selected by the environment, shared by every client in the process."""
+  environ = os.environ if environ is None else environ
+  record = environ.get(RECORD_ENV, "").strip()
+  replay = environ.get(REPLAY_ENV, "").strip()
+  if record and replay:
+    raise ValueError(f"Set only one of {RECORD_ENV} and {REPLAY_ENV}.")
+  if not record and not replay:
+    return None
+
+  key = (Path(replay or record).resolve(), bool(replay))
+  with _CASSETTES_LOCK:
+    if key not in _CASSETTES:
+      _CASSETTES[key] = Cassette(key[0], replay=key[1])
+    return _CASSETTES[key]
+
+
+def create_client(
+  url: str,
+  token: str,
+  cassette: Cassette | None = None,
+  *,
+  upstream: httpx.BaseTransport | None = None,
+) -> Search:
+  """Build a Search client, routing its HTTP traffic through `cassette` when one is given.
+
+  `upstream` is the transport a recording cassette forwards to; it defaults to a pooled HTTPTransport.
+  """
+  if cassette is None:
+    return Search(url=url, token=token)
+
+  # Replay failures are deterministic, so the SDK's sleep-and-retry loop would only add delay.
+  client = Search(url=url or REPLAY_URL, token=token or REPLAY_TOKEN, retries=0 if cassette.replay else 3)
+  requester = client._requester  # noqa: SLF001 - the SDK exposes no transport hook
+  wrapped = None if cassette.replay else (upstream or httpx.HTTPTransport())
+  requester._client = httpx.Client(  # noqa: SLF001
+    transport=CassetteTransport(cassette, wrapped),
+    timeout=requester._client.timeout,  # noqa: SLF001
+  )
+  return client